@@ -0,0 +1,90 @@
+import argparse
+import asyncio
+import logging
+import random
+import re
+
+from src.connection.async_client import BattleshipClient
+from src.game.ai import TargetingAI
+from src.game.board import Board
+from src.protocol.client_schemas import GameStartedNotification, TurnSwitchNotification, GameOverNotification, \
+    QuitNotification, ServerMessage
+
+# Shot results only reach players as the text of an info message.
+SHOT_RESULT = re.compile(r"^(?P<user>.*) fired at \((?P<x>-?\d+), (?P<y>-?\d+)\)\. (?P<result>Hit|Miss)!"
+                         r"(?: (?P<ship>\w+) has been sunk!)?$")
+SHIP_LENGTHS = {ship.name: ship.length for ship in Board().ships}
+
+
+class ComputerPlayer:
+    """Joins the lobby like any client and plays with the probability-density AI."""
+
+    def __init__(self, name, host='localhost', port=29999, think_time=0.0, rng=None):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.think_time = think_time
+        self.rng = rng or random.Random()
+
+    async def play_game(self):
+        """Plays one game and returns the winner's name."""
+        async with BattleshipClient(self.host, self.port) as client:
+            await client.set_name(self.name)
+            ai = None
+            async for event in client.events():
+                if isinstance(event, GameStartedNotification):
+                    ai = TargetingAI(rng=self.rng)
+                    board = Board()
+                    board.randomize_ships(self.rng)
+                    await client.submit_board(board)
+                elif isinstance(event, TurnSwitchNotification) and event.user == self.name:
+                    if self.think_time:
+                        await asyncio.sleep(self.think_time)
+                    await client.fire(*ai.next_shot())
+                elif isinstance(event, GameOverNotification):
+                    return event.winner
+                elif isinstance(event, QuitNotification):
+                    return self.name
+                elif type(event) is ServerMessage and ai is not None:
+                    self.record_shot(ai, event.message)
+        return None
+
+    def record_shot(self, ai, message):
+        match = SHOT_RESULT.match(message)
+        if match and match['user'] == self.name:
+            ship = match['ship']
+            ai.record(int(match['x']), int(match['y']), match['result'] == 'Hit', SHIP_LENGTHS.get(ship) if ship else None)
+
+    async def run(self, games):
+        played = 0
+        while not games or played < games:
+            winner = await self.play_game()
+            played += 1
+            logging.info(f"{self.name} finished game {played}: winner {winner}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Play Battleship against the computer, or fill the lobby with bots.')
+    parser.add_argument('-i', type=str, default='localhost', help='IP/DNS address of the server')
+    parser.add_argument('-p', type=int, default=29999, help='Port number of the server (default: 29999)')
+    parser.add_argument('-n', '--bots', type=int, default=1, help='Number of computer players (default: 1)')
+    parser.add_argument('--games', type=int, default=1, help='Games each bot plays, 0 to keep playing (default: 1)')
+    parser.add_argument('--think', type=float, default=0.5, help='Seconds to wait before each shot (default: 0.5)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for fleets and shot tie-breaking')
+    return parser.parse_args()
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    players = [ComputerPlayer(f"computer-{i + 1}" if args.bots > 1 else "computer", args.i, args.p, args.think,
+                              random.Random(rng.random())) for i in range(args.bots)]
+    await asyncio.gather(*(player.run(args.games) for player in players))
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
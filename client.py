@@ -1,3 +1,4 @@
+import queue
 import selectors
 import socket
 import argparse
@@ -8,35 +9,60 @@ from src.util.error_handler import ClientErrorHandler
 
 
 class BattleshipClient:
-    def __init__(self, host='localhost', port=29999):
+    def __init__(self, host='localhost', port=29999, spectate=None):
         self.server_address = (host, port)
         self.sel = selectors.DefaultSelector()
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setblocking(False)
         self.sock.connect_ex(self.server_address)
         self.connection = Connection(self.sel, self.sock, self.server_address)
-        self.sel.register(self.sock, selectors.EVENT_WRITE | selectors.EVENT_READ, data=self.connection)
-        self.game_menu = GameMenu(self.connection)
+        self.sel.register(self.sock, selectors.EVENT_READ, data=self.connection)
+        # Other threads write a byte here after queueing a send, so the loop can block in select().
+        self._wakeup_recv, self._wakeup_send = socket.socketpair()
+        self._wakeup_recv.setblocking(False)
+        self._wakeup_send.setblocking(False)
+        self.sel.register(self._wakeup_recv, selectors.EVENT_READ, data=None)
+        self.events = queue.Queue()
+        self.game_menu = GameMenu(self.connection, self.events, spectate, wakeup=self.wakeup)
+
+    def wakeup(self):
+        try:
+            self._wakeup_send.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Already pending, or the client is closing.
 
     def run(self):
         logging.info(f"Client connecting to {self.server_address}")
         try:
-            while True:
-                events = self.sel.select(timeout=0.1)
-                for key, mask in events:
-                    if mask & selectors.EVENT_READ:
-                        self.connection.process_events(mask)
-                        self.game_menu.handle_response()
-                    if mask & selectors.EVENT_WRITE:
-                        self.connection.process_events(mask)
+            while not self.connection.closed and not (self.game_menu.stop_threads and not self.connection.pending_bytes):
+                for key, mask in self.sel.select():
+                    if key.data is None:
+                        self._drain_wakeups()
+                        continue
+                    self.connection.process_events(mask)
+                    while self.connection.messages:
+                        self.events.put(self.connection.messages.popleft())
         except KeyboardInterrupt:
             logging.info("Client shutting down...")
         finally:
+            self.events.put(None)
+            # Let the dispatcher show the last messages (game over, quit) and the prompt flush them.
+            self.game_menu.message_thread.join(timeout=5)
+            self.game_menu.input_thread.join(timeout=5)
             self._close()
 
+    def _drain_wakeups(self):
+        try:
+            while self._wakeup_recv.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
     def _close(self):
-        self.sel.unregister(self.sock)
-        self.sock.close()
+        self.connection.close()
+        self.sel.unregister(self._wakeup_recv)
+        self._wakeup_recv.close()
+        self._wakeup_send.close()
         self.sel.close()
 
 
@@ -44,10 +70,11 @@ def parse_args():
     parser = argparse.ArgumentParser(description='Start the Battleship client.')
     parser.add_argument('-i', type=str, default='localhost', help='IP/DNS address of the server')
     parser.add_argument('-p', type=int, default=29999, help='Port number of the server to connect to (default: 29999)')
+    parser.add_argument('--spectate', type=int, default=None, metavar='GAME_ID', help='Watch a live game instead of playing')
     return parser.parse_args()
 
 
 if __name__ == "__main__":
     args = parse_args()
-    client = BattleshipClient(port=args.p, host=args.i)
+    client = BattleshipClient(port=args.p, host=args.i, spectate=args.spectate)
     client.run()
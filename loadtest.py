@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from collections import Counter
+
+from src.connection.framing import ReceiveBuffer, create_frame, FrameError
+from src.game.board import Board
+from src.protocol.codec import ENCODINGS, JSON, decode_message, encode_message
+from src.protocol.server_schemas import BoardRequest, MoveRequest, SetNameRequest, PongMessage
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class LoadStats:
+    def __init__(self):
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.moves = 0
+        self.latencies = []
+        self.errors = Counter()
+
+    def report(self, elapsed):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, len(latencies) * p // 100)] * 1000, 3) if latencies else 0.0
+
+        return {
+            "clients_started": self.started,
+            "clients_completed": self.completed,
+            "clients_failed": self.failed,
+            "games_completed": self.completed // 2,
+            "moves": self.moves,
+            "duration_secs": round(elapsed, 3),
+            "moves_per_sec": round(self.moves / elapsed, 1) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": percentile(50),
+                "p99": percentile(99),
+                "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            },
+            "errors": dict(self.errors),
+        }
+
+
+class LoadBot:
+    """Headless player that runs the full protocol once: welcome, set_name, board, moves, game_over."""
+
+    def __init__(self, name, host, port, stats, encoding=JSON, think_time=0.0, rng=None):
+        self.name = name
+        self.address = (host, port)
+        self.stats = stats
+        self.requested_encoding = encoding
+        self.encoding = JSON
+        self.think_time = think_time
+        self.rng = rng or random.Random()
+        self.targets = [(x, y) for x in range(10) for y in range(10)]
+        self.rng.shuffle(self.targets)
+        self.move_sent_at = None
+        self.reader = self.writer = None
+
+    async def run(self):
+        self.reader, self.writer = await asyncio.open_connection(*self.address)
+        try:
+            recv_buffer = ReceiveBuffer()
+            while True:
+                data = await self.reader.read(65536)
+                if not data:
+                    raise ConnectionError("server closed the connection")
+                recv_buffer.feed(data)
+                for payload in recv_buffer.frames():
+                    if await self.handle_message(decode_message(payload, self.name)):
+                        return
+        finally:
+            self.writer.close()
+
+    async def handle_message(self, msg):
+        """Reacts to one server message; returns True once the game is over."""
+        _type = msg.get('type')
+        if _type == 'welcome':
+            self.send(SetNameRequest(user=self.name, encoding=self.requested_encoding))
+        elif _type == 'set_name':
+            if not msg.get('success', True):
+                raise RuntimeError(f"set_name rejected for {self.name}")
+            self.encoding = msg.get('encoding', JSON)
+        elif _type == 'game_started':
+            board = Board()
+            if not board.randomize_ships(self.rng):
+                raise RuntimeError("could not place ships")
+            self.send(BoardRequest(user=self.name, board=board.serialize()))
+        elif _type == 'turn_switch':
+            self.record_latency()
+            if msg['user'] == self.name:
+                await self.make_move()
+        elif _type == 'ping':
+            self.send(PongMessage())
+        elif _type == 'error':
+            self.stats.errors["server_error"] += 1
+        elif _type in ('game_over', 'quit'):
+            self.record_latency()
+            return True
+        return False
+
+    async def make_move(self):
+        if self.think_time:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think_time))
+        if not self.targets:
+            raise RuntimeError("ran out of targets")
+        x, y = self.targets.pop()
+        self.move_sent_at = time.perf_counter()
+        self.send(MoveRequest(user=self.name, x=x, y=y))
+        self.stats.moves += 1
+
+    def record_latency(self):
+        if self.move_sent_at is not None:
+            self.stats.latencies.append(time.perf_counter() - self.move_sent_at)
+            self.move_sent_at = None
+
+    def send(self, msg):
+        self.writer.write(create_frame(encode_message(msg, self.encoding)))
+
+
+class LoadGenerator:
+    def __init__(self, host='localhost', port=29999, games=100, concurrency=200, rate=None, think_time=0.0,
+                 encoding=JSON, timeout=120.0, seed=None):
+        self.host = host
+        self.port = port
+        self.clients = games * 2
+        self.concurrency = max(2, concurrency - concurrency % 2)
+        self.rate = rate
+        self.think_time = think_time
+        self.encoding = encoding
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.stats = LoadStats()
+
+    async def run(self):
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = []
+        start = time.perf_counter()
+        for i in range(self.clients):
+            await slots.acquire()
+            if self.rate:
+                delay = start + i / self.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            bot = LoadBot(f"bot-{i:06d}", self.host, self.port, self.stats, self.encoding, self.think_time,
+                          random.Random(self.rng.random()))
+            tasks.append(asyncio.create_task(self.run_bot(bot, slots)))
+        await asyncio.gather(*tasks)
+        return self.stats.report(time.perf_counter() - start)
+
+    async def run_bot(self, bot, slots):
+        self.stats.started += 1
+        try:
+            await asyncio.wait_for(bot.run(), self.timeout)
+            self.stats.completed += 1
+        except asyncio.TimeoutError:
+            self.record_failure(bot, "timeout")
+        except (ConnectionError, OSError) as e:
+            self.record_failure(bot, "connection", e)
+        except (FrameError, ValueError) as e:
+            self.record_failure(bot, "protocol", e)
+        except Exception as e:
+            self.record_failure(bot, "other", e)
+        finally:
+            slots.release()
+
+    def record_failure(self, bot, kind, error=None):
+        self.stats.failed += 1
+        self.stats.errors[kind] += 1
+        logging.debug(f"{bot.name} failed ({kind}): {error}")
+
+
+def raise_fd_limit():
+    """Lifts the soft open-file limit to the hard limit so thousands of sockets can be opened."""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Drive headless games against a Battleship server.')
+    parser.add_argument('-i', type=str, default='localhost', help='IP/DNS address of the server')
+    parser.add_argument('-p', type=int, default=29999, help='Port number of the server (default: 29999)')
+    parser.add_argument('-n', '--games', type=int, default=100, help='Number of games to play (default: 100)')
+    parser.add_argument('-c', '--concurrency', type=int, default=200,
+                        help='Maximum number of connected clients at once (default: 200)')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Client arrivals per second (default: as fast as concurrency allows)')
+    parser.add_argument('--think', type=float, default=0.0,
+                        help='Mean think time before each move in seconds (default: 0)')
+    parser.add_argument('--encoding', choices=ENCODINGS, default=JSON, help='Wire encoding to request (default: json)')
+    parser.add_argument('--timeout', type=float, default=120.0, help='Seconds before a client is counted as stuck')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for shot order and think times')
+    parser.add_argument('-o', '--output', type=str, default=None, help='Write the JSON report to this file')
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    raise_fd_limit()
+    generator = LoadGenerator(args.i, args.p, args.games, args.concurrency, args.rate, args.think,
+                              args.encoding, args.timeout, args.seed)
+    report = asyncio.run(generator.run())
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    sys.exit(1 if report["clients_failed"] else 0)
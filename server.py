@@ -1,79 +1,235 @@
+import asyncio
 import socket
+import time
 import selectors
 import logging
 import argparse
+import signal
 
-from src.connection.connection import Connection
-from src.protocol.client_schemas import WelcomeMessage, ServerMessage
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+from src.connection.async_connection import AsyncConnection
+from src.connection.connection import BaseConnection, Connection
+from src.connection.frame_cache import CachedMessage
+from src.connection.metrics_endpoint import MetricsEndpoint, MetricsRequest, MetricsProtocol
+from src.connection.coordinator import CoordinatorLink, run_workers
+from src.connection.matchmaking import Matchmaker
+from src.connection.registry import ConnectionRegistry
+from pydantic import ValidationError
+
+from src.protocol.client_schemas import WelcomeMessage, ServerMessage, PingMessage, SpectateResponse, ErrorResponse
+from src.protocol.server_schemas import SpectateRequest, REQUEST_TYPES
 from src.connection.game_session import GameSession
+from src.game.board import Board
 from src.util.error_handler import ServerErrorHandler
+from src.util.logger import BackgroundHandler, configure_logging
+from src.util.metrics import REGISTRY
+from src.util.profiler import Profiler
+from src.util.timer_wheel import TimerWheel
+
+MATCHMAKER_POLL_INTERVAL = 1.0
+HEARTBEAT_INTERVAL = 15.0
+IDLE_TIMEOUT = 45.0
+TURN_TIMEOUT = 120.0
+PLACEMENT_TIMEOUT = 60.0
+ACCEPT_BATCH = 64
+
+WELCOME = CachedMessage(WelcomeMessage())
+WAITING = CachedMessage(ServerMessage(message="Waiting for more players to join..."))
+PING = CachedMessage(PingMessage())
+
+MESSAGES_RECEIVED = REGISTRY.counter('battleship_messages_received_total', 'Messages received from clients', label='type')
+GAMES_STARTED = REGISTRY.counter('battleship_games_started_total', 'Game sessions started')
+LOOP_TICK = REGISTRY.histogram('battleship_loop_tick_seconds',
+                               'Time spent handling one batch of ready events (a loop pass, or a callback on asyncio)')
+LOOP_LAG = REGISTRY.histogram('battleship_loop_lag_seconds', 'How late the timer wheel ran relative to its deadline')
 
-logging.basicConfig(level=logging.INFO)
+PROFILE_TARGETS = [
+    (GameSession, 'handle_move'),
+    (GameSession, 'handle_board'),
+    (GameSession, 'handle_view'),
+    (GameSession, 'handle_chat'),
+    (GameSession, 'handle_quit'),
+    (BaseConnection, '_process_request'),
+    (Connection, '_read'),
+    (Connection, '_write'),
+    (AsyncConnection, 'buffer_updated'),
+    (AsyncConnection, '_flush'),
+    (Board, 'mark_hit'),
+]
 
 
 class BattleshipServer:
-    def __init__(self, host='localhost', port=29999):
+    def __init__(self, host='localhost', port=29999, reuse_port=False, coordinator=None, metrics_port=None,
+                 profiler=None):
         self.sel = selectors.DefaultSelector()
         self.server_address = (host, port)
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         self.sock.bind(self.server_address)
-        self.sock.listen()
+        self.sock.listen(socket.SOMAXCONN)
         self.sock.setblocking(False)
         self.sel.register(self.sock, selectors.EVENT_READ, data=None)
 
-        self.clients = {}
-        self.pending_clients = []
+        self.clients = ConnectionRegistry()
+        self.matchmaker = Matchmaker()
         self.game_sessions = {}
+        self.live_games = {}  # game id -> session
+        self.spectating = {}  # spectator client id -> session
+        self.dirty_sessions = set()
+        self.timers = TimerWheel()
+        self.matchmaker_timer = None
+
+        self.coordinator = coordinator
+        if coordinator:
+            self.sel.register(coordinator.sock, selectors.EVENT_READ, data=coordinator)
+
+        self.metrics_port = metrics_port
+        self.profiler = profiler
+        self.metrics_endpoint = None
+        self.closed_bytes_received = 0
+        self.closed_bytes_sent = 0
+        self.register_metrics()
+
+    def register_metrics(self):
+        """Registers the gauges and totals that are read from server state when metrics are scraped."""
+        clients = self.clients
+        REGISTRY.callback('battleship_connections', 'Connected clients', 'gauge', lambda: len(clients))
+        REGISTRY.callback('battleship_game_sessions', 'Live game sessions', 'gauge', lambda: len(self.live_games))
+        REGISTRY.callback('battleship_spectators', 'Connections spectating a game', 'gauge',
+                          lambda: len(self.spectating))
+        REGISTRY.callback('battleship_matchmaking_queue', 'Players waiting for a match', 'gauge',
+                          lambda: len(self.matchmaker))
+        REGISTRY.callback('battleship_matches_total', 'Pairs made by the matchmaker', 'counter',
+                          lambda: self.matchmaker.matched)
+        REGISTRY.callback('battleship_timers', 'Timers pending in the timer wheel', 'gauge', lambda: len(self.timers))
+        REGISTRY.callback('battleship_pending_send_bytes', 'Bytes queued for sending across all connections', 'gauge',
+                          lambda: sum(client.pending_bytes for client in clients))
+        REGISTRY.callback('battleship_bytes_received_total', 'Bytes received from clients', 'counter',
+                          lambda: self.closed_bytes_received + sum(client.bytes_received for client in clients))
+        REGISTRY.callback('battleship_bytes_sent_total', 'Bytes sent to clients', 'counter',
+                          lambda: self.closed_bytes_sent + sum(client.bytes_sent for client in clients))
+        REGISTRY.callback('battleship_connection_bytes_received', 'Bytes received per live connection', 'gauge',
+                          lambda: {client.id: client.bytes_received for client in clients}, label='client', detailed=True)
+        REGISTRY.callback('battleship_connection_bytes_sent', 'Bytes sent per live connection', 'gauge',
+                          lambda: {client.id: client.bytes_sent for client in clients}, label='client', detailed=True)
+        REGISTRY.callback('battleship_log_records_dropped_total', 'Log records dropped because the log queue was full',
+                          'counter', lambda: sum(handler.dropped for handler in logging.getLogger().handlers
+                                                 if isinstance(handler, BackgroundHandler)))
 
     def run(self):
         logging.info(f"Server running on {self.server_address}")
+        if self.profiler:
+            self.profiler.install_signal()
+        if self.metrics_port is not None:
+            self.metrics_endpoint = MetricsEndpoint(self.sel, REGISTRY, port=self.metrics_port, timers=self.timers)
         try:
             while True:
-                for key, mask in self.sel.select(timeout=0.1):
+                timeout = self.timers.next_timeout()
+                deadline = None if timeout is None else time.monotonic() + timeout
+                events = self.sel.select(timeout=timeout)
+                tick_start = time.perf_counter()
+                for key, mask in events:
                     if key.data is None:
                         self.accept_connection(key.fileobj)
+                    elif key.data is self.coordinator:
+                        self.handle_coordinator_message()
+                    elif key.data is self.metrics_endpoint:
+                        self.metrics_endpoint.accept()
+                    elif isinstance(key.data, MetricsRequest):
+                        key.data.process_events(mask)
                     else:
-                        client_id = f"{key.data.addr[0]}:{key.data.addr[1]}"
-                        self.process_client_event(client_id, key.data, mask)
+                        self.process_client_event(key.data, mask)
+                if deadline is not None and time.monotonic() >= deadline:
+                    LOOP_LAG.observe(time.monotonic() - deadline)
+                self.timers.advance()
+                self.flush_sessions()
+                LOOP_TICK.observe(time.perf_counter() - tick_start)
         except KeyboardInterrupt:
             logging.info("Server shutting down...")
         finally:
             self.shutdown()
 
     def accept_connection(self, sock):
-        try:
-            conn, addr = sock.accept()
-            conn.setblocking(False)
+        # Drain a burst of pending connections per wakeup so the accept queue does not overflow.
+        for _ in range(ACCEPT_BATCH):
+            try:
+                conn, addr = sock.accept()
+                conn.setblocking(False)
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
-            # Avoid double registration
-            if conn.fileno() in [key.fd for key in self.sel.get_map().values()]:
-                logging.error(f"Socket {conn} (FD {conn.fileno()}) is already registered")
-                conn.close()
-                return
+                # Avoid double registration
+                if self.clients.get_by_fd(conn.fileno()):
+                    logging.error(f"Socket {conn} (FD {conn.fileno()}) is already registered")
+                    conn.close()
+                    continue
 
-            client_id = f"{addr[0]}:{addr[1]}"
-            connection = Connection(self.sel, conn, addr)
-            self.sel.register(conn, selectors.EVENT_READ, data=connection)
+                connection = Connection(self.sel, conn, addr)
+                self.sel.register(conn, selectors.EVENT_READ, data=connection)
+                self.register_client(connection)
+            except BlockingIOError:
+                return
+            except Exception as e:
+                logging.error(f"Error accepting connection: {e}")
+                return
 
-            self.clients[client_id] = connection
-            logging.info(f"Accepted connection from {addr}")
+    def register_client(self, connection):
+        self.clients.add(connection)
+        connection.limit_frames_until_named()
+        self.start_heartbeat(connection)
+        logging.info(f"Accepted connection from {connection.addr}")
 
-            # Send welcome message
-            logging.info(f"Sending welcome message to {client_id}")
-            connection.send(WelcomeMessage())
-        except Exception as e:
-            logging.error(f"Error accepting connection: {e}")
+        # Send welcome message
+        logging.info(f"Sending welcome message to {connection.id}")
+        connection.send(WELCOME)
 
-    def process_client_event(self, client_id, client, mask):
+    def process_client_event(self, client, mask):
         try:
             client.process_events(mask)
-            if client.request:
-                self.handle_client_message(client_id, client.request)
-                client.request = None
+            self.process_client_messages(client)
         except Exception as e:
             logging.error(f"Error processing client event: {e}")
-            self.remove_client(client_id)
+            self.remove_client(client.id)
+            return
+        if client.closed:
+            self.remove_client(client.id)
+
+    def start_heartbeat(self, client):
+        client.last_activity = time.monotonic()
+        client.heartbeat_timer = self.timers.schedule(HEARTBEAT_INTERVAL, self.heartbeat, client)
+
+    def heartbeat(self, client):
+        """Reaps the client if it has been silent too long, otherwise pings it and re-arms."""
+        if self.clients.get(client.id) is not client:
+            return
+        idle = time.monotonic() - client.last_activity
+        if idle >= IDLE_TIMEOUT:
+            logging.info(f"Reaping {client.id} after {idle:.0f}s without traffic")
+            self.remove_client(client.id)
+            return
+        client.send(PING)
+        client.heartbeat_timer = self.timers.schedule(HEARTBEAT_INTERVAL, self.heartbeat, client)
+
+    def arm_matchmaker(self):
+        """Polls the matchmaker periodically, but only while players are waiting."""
+        if len(self.matchmaker) and self.matchmaker_timer is None:
+            self.matchmaker_timer = self.timers.schedule(MATCHMAKER_POLL_INTERVAL, self.matchmaker_tick)
+
+    def matchmaker_tick(self):
+        self.matchmaker_timer = None
+        self.poll_matchmaker()
+        self.arm_matchmaker()
+
+    def process_client_messages(self, client):
+        if client.messages:
+            client.last_activity = time.monotonic()
+        while client.messages:
+            self.handle_client_message(client.id, client.messages.popleft())
 
     def handle_client_message(self, client_id, msg):
         client = self.clients.get(client_id)
@@ -81,6 +237,11 @@ class BattleshipServer:
             logging.warning(f"Message from unknown client {client_id}")
             return
 
+        _type = msg.get('type') if isinstance(msg, dict) else None
+        MESSAGES_RECEIVED.inc(_type if _type in REQUEST_TYPES else 'unknown')
+        if _type == 'pong':
+            return
+
         if client.name is None:
             self.handle_unnamed_client(client, msg)
         else:
@@ -91,73 +252,353 @@ class BattleshipServer:
             logging.warning(f"Invalid message format from {client.addr}: {msg}")
             return
 
-        if msg.get('type') == 'set_name' and client.name is None:
+        _type = msg.get('type')
+        if _type == 'set_name':
+            self.stop_spectating(client.id)
             client.set_name(msg)
             if client.name:
-                self.pending_clients.append(client)
-                self.try_start_game()
+                self.enqueue_player(client)
+        elif _type == 'spectate':
+            self.start_spectating(client, msg)
 
-    def try_start_game(self):
-        if len(self.pending_clients) < 2:
-            logging.info("Waiting for more players to join...")
-            self.pending_clients[0].send(ServerMessage(message="Waiting for more players to join..."))
+    def start_spectating(self, client, msg):
+        try:
+            game_id = SpectateRequest(**msg).game_id
+        except ValidationError:
+            client.send(SpectateResponse(success=False, game_id=-1, message="Invalid spectate request"))
+            return
+
+        game_session = self.live_games.get(game_id)
+        if game_session is None:
+            client.send(SpectateResponse(success=False, game_id=game_id, message=f"No live game {game_id}"))
             return
 
-        player1 = self.pending_clients.pop(0)
-        player2 = self.pending_clients.pop(0)
+        self.stop_spectating(client.id)
+        game_session.add_spectator(client)
+        self.spectating[client.id] = game_session
+        player1, player2 = game_session.game.players
+        client.send(SpectateResponse(success=True, game_id=game_id, player1=player1, player2=player2))
+        logging.info(f"{client.id} is spectating game {game_id}")
+
+    def stop_spectating(self, client_id):
+        game_session = self.spectating.pop(client_id, None)
+        if game_session:
+            game_session.remove_spectator(client_id)
+
+    def drop_spectator(self, client):
+        self.spectating.pop(client.id, None)
+        self.remove_client(client.id)
+
+    def enqueue_player(self, client):
+        pair = self.matchmaker.enqueue(client)
+        if pair:
+            self.start_game(*pair)
+            return
+
+        logging.info("Waiting for more players to join...")
+        client.send(WAITING)
+        self.arm_matchmaker()
+        if self.coordinator:
+            self.coordinator.announce(client, self.matchmaker.rating_of(client.name))
+
+    def poll_matchmaker(self):
+        for player1, player2 in self.matchmaker.poll():
+            self.start_game(player1, player2)
+
+    def start_game(self, player1, player2):
+        if self.coordinator:
+            self.coordinator.cancel(player1)
+            self.coordinator.cancel(player2)
 
         try:
-            game_session = GameSession(player1, player2)
+            game_session = GameSession(player1, player2, self.timers, TURN_TIMEOUT, PLACEMENT_TIMEOUT)
+            game_session.on_finish = self.end_game
+            game_session.on_pending = self.dirty_sessions.add
+            game_session.on_spectator_lag = self.drop_spectator
             self.game_sessions[player1.id] = game_session
             self.game_sessions[player2.id] = game_session
+            self.live_games[game_session.game.game_id] = game_session
+            GAMES_STARTED.inc()
+            self.dirty_sessions.add(game_session)
             logging.info(f"Game session created between {player1.name} and {player2.name}")
         except Exception as e:
             logging.error(f"Failed to create game session: {e}")
-            self.pending_clients.extend([player1, player2])
+            self.matchmaker.enqueue(player1, match=False)
+            self.matchmaker.enqueue(player2, match=False)
+            self.arm_matchmaker()
+
+    def handle_coordinator_message(self):
+        """Hands a waiting client to another worker, or adopts one handed to this worker."""
+        try:
+            msg, fds = self.coordinator.receive()
+        except BlockingIOError:
+            return
+        except ValueError as e:
+            logging.error(f"Dropping control message from the coordinator: {e}")
+            return
+        if msg is None:
+            logging.error("Lost connection to the match coordinator; matching locally only.")
+            self.sel.unregister(self.coordinator.sock)
+            self.coordinator = None
+            return
+
+        if msg['type'] == 'handoff':
+            client = self.matchmaker.get(msg['client'])
+            if client is None:
+                self.coordinator.handoff_failed(msg)
+                return
+            if not self.coordinator.transfer(client, msg['to'], msg['partner']):
+                # The client keeps waiting here for a local match; the coordinator re-queues its partner.
+                self.coordinator.handoff_failed(msg)
+                return
+            self.matchmaker.cancel(client.id)
+            self.clients.remove(client.id)
+            logging.info(f"Handed {client.name} off to worker {msg['to']}")
+        elif msg['type'] == 'adopt':
+            addr, name, encoding, unsent, unread = CoordinatorLink.adopted_state(msg)
+            connection = Connection.adopt(self.sel, socket.socket(fileno=fds[0]), addr, name, encoding, unsent, unread)
+            self.clients.add(connection)
+            self.start_heartbeat(connection)
+            logging.info(f"Adopted {name} from another worker")
+            partner = self.matchmaker.cancel(msg['partner'])
+            if partner is not None:
+                self.start_game(partner, connection)
+            else:
+                # The partner left or was matched here meanwhile; the adopted player waits here instead.
+                self.coordinator.handoff_failed(msg)
+                self.enqueue_player(connection)
+        elif msg['type'] == 'ratings':
+            self.matchmaker.ratings.update(msg['ratings'])
+
+    def record_result(self, winner, loser):
+        # With workers, the coordinator applies the result and sends the new ratings to every worker.
+        if self.coordinator and self.coordinator.report_result(winner, loser):
+            return
+        self.matchmaker.record_result(winner, loser)
 
     def route_to_game_session(self, client_id, msg):
         game_session = self.game_sessions.get(client_id)
 
         if game_session:
+            # Players act under the name they registered, whatever the message claims.
+            msg['user'] = self.clients.get(client_id).name
             try:
                 game_session.handle_message(msg)
             except Exception as e:
                 logging.error(f"Error handling message in game session: {e}")
         else:
             logging.warning(f"No game session found for {client_id}")
+            _type = msg.get('type') if isinstance(msg, dict) else None
+            self.clients.get(client_id).send(ErrorResponse(request=str(_type or ''), message="You are not in a game"))
+
+    def end_game(self, game_session, winner, loser):
+        """Records the result and forgets the finished session once its last messages are flushed."""
+        if winner is not None:
+            self.record_result(winner, loser)
+        for player in game_session.game.players.values():
+            if self.game_sessions.get(player.id) is game_session:
+                del self.game_sessions[player.id]
+        self.live_games.pop(game_session.game.game_id, None)
+        # Spectators stay subscribed until the final messages are flushed, then are free to watch another game.
+        for spectator_id in game_session.spectators:
+            self.spectating.pop(spectator_id, None)
+
+    def flush_sessions(self):
+        """Sends the broadcasts queued by every session touched during this tick."""
+        while self.dirty_sessions:
+            game_session = self.dirty_sessions.pop()
+            try:
+                game_session.flush()
+            except Exception as e:
+                logging.error(f"Error flushing game session: {e}")
 
     def remove_client(self, client_id):
-        client = self.clients.pop(client_id, None)
+        client = self.clients.remove(client_id)
         if not client:
             logging.warning(f"Tried to remove unknown client {client_id}")
             return
 
-        if client in self.pending_clients:
-            self.pending_clients.remove(client)
+        if self.matchmaker.cancel(client_id) is not None:
+            if self.coordinator:
+                self.coordinator.cancel(client)
 
         game_session = self.game_sessions.pop(client_id, None)
         if game_session:
             game_session.remove_player(client_id)
+        self.stop_spectating(client_id)
 
+        self.timers.cancel(client.heartbeat_timer)
+        self.closed_bytes_received += client.bytes_received
+        self.closed_bytes_sent += client.bytes_sent
         client.close()
         logging.info(f"Client {client_id} disconnected")
 
     def shutdown(self):
         logging.info("Shutting down server...")
+        if self.profiler:
+            self.profiler.stop()
+        if isinstance(self.metrics_endpoint, MetricsEndpoint):
+            self.metrics_endpoint.close()
         self.sel.close()
         self.sock.close()
-        for client in self.clients.values():
+        for client in self.clients:
             client.close()
 
 
+class AsyncBattleshipServer(BattleshipServer):
+    """Runs the same lobby and game sessions on an asyncio event loop instead of the selectors loop."""
+
+    def __init__(self, host='localhost', port=29999, use_uvloop=True, metrics_port=None, profiler=None):
+        super().__init__(host, port, metrics_port=metrics_port, profiler=profiler)
+        self.sel.unregister(self.sock)
+        self.use_uvloop = use_uvloop and uvloop is not None
+        self._flush_scheduled = False
+        self._timer_handle = None
+        self._timer_due = 0.0
+
+    def run(self):
+        logging.info(f"Server running on {self.server_address} (asyncio{', uvloop' if self.use_uvloop else ''})")
+        if self.profiler:
+            self.profiler.install_signal()
+        try:
+            if self.use_uvloop:
+                uvloop.install()
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            logging.info("Server shutting down...")
+        finally:
+            self.shutdown()
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        server = await loop.create_server(lambda: AsyncConnection(self), sock=self.sock, backlog=socket.SOMAXCONN)
+        if self.metrics_port is not None:
+            self.metrics_endpoint = await loop.create_server(lambda: MetricsProtocol(REGISTRY), '127.0.0.1',
+                                                             self.metrics_port)
+            logging.info(f"Serving metrics on http://127.0.0.1:{self.metrics_port}/metrics")
+        self._arm_timer()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if self._timer_handle:
+                self._timer_handle.cancel()
+            if self.metrics_endpoint:
+                self.metrics_endpoint.close()
+            for client in self.clients:
+                client.close()
+
+    def _timer_tick(self):
+        # Drives the timer wheel from the event loop, waking only when the earliest timer is due.
+        loop = asyncio.get_running_loop()
+        LOOP_LAG.observe(max(0.0, loop.time() - self._timer_due))
+        self._timer_handle = None
+        self.timers.advance()
+        self.schedule_flush()
+        self._arm_timer()
+
+    def _arm_timer(self):
+        """Schedules _timer_tick for the wheel's earliest deadline if nothing earlier is armed."""
+        delay = self.timers.next_timeout()
+        if delay is None:
+            return
+        loop = asyncio.get_running_loop()
+        due = loop.time() + delay
+        if self._timer_handle is not None:
+            if self._timer_due <= due:
+                return
+            self._timer_handle.cancel()
+        self._timer_due = due
+        self._timer_handle = loop.call_at(due, self._timer_tick)
+
+    def start_heartbeat(self, client):
+        super().start_heartbeat(client)
+        self._arm_timer()
+
+    def process_client_messages(self, client):
+        start = time.perf_counter()
+        try:
+            super().process_client_messages(client)
+        except Exception as e:
+            logging.error(f"Error processing client event: {e}")
+            self.remove_client(client.id)
+        self.schedule_flush()
+        self._arm_timer()
+        LOOP_TICK.observe(time.perf_counter() - start)
+
+    def remove_client(self, client_id):
+        super().remove_client(client_id)
+        self.schedule_flush()
+        self._arm_timer()
+
+    def schedule_flush(self):
+        # Sessions are flushed once per loop iteration, after every ready protocol has run.
+        if self.dirty_sessions and not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush_tick)
+
+    def _flush_tick(self):
+        self._flush_scheduled = False
+        self.flush_sessions()
+
+
 def parse_args():
     parser = argparse.ArgumentParser(description='Start the Battleship server.')
     parser.add_argument('-i', type=str, default='localhost', help='IP/DNS address of the server')
     parser.add_argument('-p', type=int, default=29999, help='Port number to run the server on')
-    return parser.parse_args()
+    parser.add_argument('--engine', choices=['selectors', 'asyncio'], default='selectors',
+                        help='Event loop engine to run the server on (default: selectors)')
+    parser.add_argument('--no-uvloop', action='store_true', help='Do not use uvloop with the asyncio engine')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes sharing the port with SO_REUSEPORT (default: 1)')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve Prometheus metrics on 127.0.0.1:PORT/metrics; worker N uses PORT+N')
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], default='INFO',
+                        help='Minimum level of records to log (default: INFO)')
+    parser.add_argument('--log-file', type=str, default=None, help='Also write the log to this file')
+    parser.add_argument('--log-json', action='store_true', help='Log one JSON object per line')
+    parser.add_argument('--log-payloads', type=int, default=0, metavar='N',
+                        help='Log one in N received payloads of each message type (default: 0, off)')
+    parser.add_argument('--log-payloads-for', action='append', default=[], metavar='TYPE=N',
+                        help='Sampling rate for one message type, overriding --log-payloads; may be repeated')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile from startup; SIGUSR2 toggles profiling on a running server either way')
+    parser.add_argument('--profile-hz', type=int, default=200,
+                        help='Stack samples per second of CPU time while profiling, 0 for timing hooks only (default: 200)')
+    parser.add_argument('--profile-dir', type=str, default='.', help='Directory profile results are written to')
+    args = parser.parse_args()
+    if args.workers > 1 and args.engine != 'selectors':
+        parser.error('--workers is only supported with the selectors engine')
+    if args.workers > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        parser.error('--workers requires SO_REUSEPORT, which this platform does not support')
+    try:
+        args.log_payloads_for = {_type: int(every) for _type, every in
+                                 (override.split('=', 1) for override in args.log_payloads_for)}
+    except ValueError:
+        parser.error('--log-payloads-for expects TYPE=N')
+    return args
+
+
+def make_profiler(args):
+    profiler = Profiler(PROFILE_TARGETS, args.profile_hz, args.profile_dir)
+    if args.profile:
+        profiler.start()
+    return profiler
 
 
 if __name__ == "__main__":
     args = parse_args()
-    server = BattleshipServer(port=args.p, host=args.i)
-    server.run()
+    configure_logging(args.log_level, args.log_file, args.log_json, args.log_payloads, args.log_payloads_for)
+    if args.workers > 1:
+        # Workers install their own handler, so `kill -USR2 -<pgid>` toggles all of them at once.
+        if hasattr(signal, 'SIGUSR2'):
+            signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+        run_workers(args.workers, lambda link: BattleshipServer(
+            port=args.p, host=args.i, reuse_port=True, coordinator=link,
+            metrics_port=None if args.metrics_port is None else args.metrics_port + link.worker_id,
+            profiler=make_profiler(args)))
+    elif args.engine == 'asyncio':
+        AsyncBattleshipServer(port=args.p, host=args.i, use_uvloop=not args.no_uvloop,
+                              metrics_port=args.metrics_port, profiler=make_profiler(args)).run()
+    else:
+        BattleshipServer(port=args.p, host=args.i, metrics_port=args.metrics_port, profiler=make_profiler(args)).run()
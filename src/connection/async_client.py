@@ -0,0 +1,233 @@
+"""Headless asyncio client for bots, integrations and tests.
+
+    async with BattleshipClient('localhost', 29999) as client:
+        await client.set_name('bot-1')
+        async for event in client.events():
+            if isinstance(event, GameStartedNotification):
+                await client.submit_board()
+            elif isinstance(event, TurnSwitchNotification) and event.user == client.name:
+                await client.fire(x, y)
+            elif isinstance(event, GameOverNotification):
+                break
+
+Each client is one StreamReader task, so a single process can run hundreds of sessions.
+"""
+import asyncio
+from collections import defaultdict, deque
+
+from pydantic import ValidationError
+
+from src.connection.framing import FrameError, ReceiveBuffer, create_frame
+from src.game.board import Board
+from src.protocol.client_schemas import ServerMessage, QuitNotification, JoinNotification, GameStartedNotification, \
+    ViewResponse, MoveResponse, NameChangeResponse, WelcomeMessage, TurnSwitchNotification, GameOverNotification, \
+    SpectateResponse, PingMessage, ErrorResponse
+from src.protocol.codec import BINARY, JSON, decode_message, encode_message
+from src.protocol.server_schemas import BoardRequest, ChatMessage, MoveRequest, PongMessage, QuitRequest, \
+    SetNameRequest, SpectateRequest, ViewRequest
+
+EVENT_TYPES = {
+    'welcome': WelcomeMessage,
+    'set_name': NameChangeResponse,
+    'info': ServerMessage,
+    'join': JoinNotification,
+    'game_started': GameStartedNotification,
+    'turn_switch': TurnSwitchNotification,
+    'move': MoveResponse,
+    'view': ViewResponse,
+    'spectate': SpectateResponse,
+    'game_over': GameOverNotification,
+    'quit': QuitNotification,
+    'ping': PingMessage,
+    'error': ErrorResponse,
+}
+REQUEST_TIMEOUT = 30.0
+
+
+class ServerError(Exception):
+    """The server answered a request with an error message."""
+
+    def __init__(self, response):
+        super().__init__(response.message)
+        self.response = response
+
+
+def parse_event(msg):
+    """Builds the client_schemas model for a decoded server message.
+
+    Types without a model of their own come back as a ServerMessage.
+    """
+    if not isinstance(msg, dict):
+        raise ValueError(f"Expected a message object, got {type(msg).__name__}")
+    _type = msg.get('type')
+    model = EVENT_TYPES.get(_type)
+    if model is not None:
+        try:
+            return model.model_validate(msg)
+        except ValidationError:
+            pass
+    return ServerMessage(type=str(_type), message=str(msg.get('message', '')))
+
+
+class BattleshipClient:
+    """Asyncio connection to a Battleship server.
+
+    Server messages are parsed into client_schemas models and delivered through events(). A
+    message that answers a pending request (set_name, view, spectate) resolves that coroutine
+    instead; an error reply to one raises ServerError from it, and a request left unanswered for
+    `request_timeout` seconds raises TimeoutError. Pings are answered automatically.
+    """
+
+    def __init__(self, host='localhost', port=29999, encoding=BINARY, request_timeout=REQUEST_TIMEOUT):
+        self.address = (host, port)
+        self.requested_encoding = encoding
+        self.request_timeout = request_timeout
+        self.encoding = JSON
+        self.name = None
+        self.welcome = None
+        self.reader = self.writer = None
+        self.closed = False
+        self._events = asyncio.Queue()
+        self._waiters = defaultdict(deque)
+        self._reader_task = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def connect(self):
+        """Opens the connection and waits for the server's welcome."""
+        welcome = self._expect('welcome')
+        self.reader, self.writer = await asyncio.open_connection(*self.address)
+        self._reader_task = asyncio.create_task(self._read_loop())
+        self.welcome = await self._wait(welcome)
+        return self.welcome
+
+    async def set_name(self, name, encoding=None):
+        """Joins the lobby under `name`; the server pairs the client once another player is waiting."""
+        encoding = encoding or self.requested_encoding
+        if encoding not in self.welcome.encodings:
+            encoding = JSON
+        response = self._expect('set_name')
+        self.name = name
+        self.send(SetNameRequest(user=name, encoding=encoding))
+        response = await self._wait(response)
+        if isinstance(response, NameChangeResponse) and response.success:
+            self.encoding = response.encoding
+        return response
+
+    async def spectate(self, game_id):
+        response = self._expect('spectate')
+        self.send(SpectateRequest(game_id=game_id))
+        return await self._wait(response)
+
+    async def submit_board(self, board=None):
+        """Sends the ship layout; a random one is placed when `board` is None."""
+        if board is None:
+            board = Board()
+            if not board.randomize_ships():
+                raise RuntimeError("Could not place ships")
+        self.send(BoardRequest(user=self.name, board=board.serialize()))
+        await self.drain()
+
+    async def fire(self, x, y):
+        """Fires at (x, y); the result arrives as info, turn_switch and game_over events."""
+        self.send(MoveRequest(user=self.name, x=x, y=y))
+        await self.drain()
+
+    async def view(self):
+        response = self._expect('view')
+        self.send(ViewRequest(user=self.name))
+        return await self._wait(response)
+
+    async def chat(self, message):
+        self.send(ChatMessage(user=self.name, message=message))
+        await self.drain()
+
+    async def quit(self):
+        self.send(QuitRequest(user=self.name))
+        await self.drain()
+
+    async def events(self):
+        """Yields server events until the connection closes."""
+        while True:
+            event = await self._events.get()
+            if event is None:
+                self._events.put_nowait(None)  # Wake any other consumer too.
+                return
+            yield event
+
+    def send(self, msg):
+        if self.closed:
+            raise ConnectionError("Client is closed")
+        self.writer.write(create_frame(encode_message(msg, self.encoding)))
+
+    async def drain(self):
+        await self.writer.drain()
+
+    async def close(self):
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        if self._reader_task is not None:
+            await self._reader_task
+
+    def _expect(self, _type):
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[_type].append(future)
+        return future
+
+    async def _wait(self, future):
+        return await asyncio.wait_for(future, self.request_timeout)
+
+    async def _read_loop(self):
+        recv_buffer = ReceiveBuffer()
+        error = ConnectionError("Server closed the connection")
+        try:
+            while True:
+                data = await self.reader.read(65536)
+                if not data:
+                    break
+                recv_buffer.feed(data)
+                for payload in recv_buffer.frames():
+                    try:
+                        event = parse_event(decode_message(payload, self.name))
+                    except ValueError as e:
+                        raise FrameError(f"Undecodable message from the server: {e}") from e
+                    self._dispatch(event)
+        except (ConnectionError, OSError, FrameError, ValueError) as e:
+            error = e
+        finally:
+            self.closed = True
+            for waiters in self._waiters.values():
+                for future in waiters:
+                    if not future.done():
+                        future.set_exception(error)
+            self._waiters.clear()
+            self._events.put_nowait(None)
+            self.writer.close()
+
+    def _dispatch(self, event):
+        if event.type == 'ping':
+            self.send(PongMessage())
+            return
+        if isinstance(event, ErrorResponse):
+            waiters = self._waiters.get(event.request)
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():
+                    future.set_exception(ServerError(event))
+                    return
+        waiters = self._waiters.get(event.type)
+        while waiters:
+            future = waiters.popleft()
+            if not future.done():
+                future.set_result(event)
+                return
+        self._events.put_nowait(event)
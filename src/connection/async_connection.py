@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import socket
+
+from src.connection.connection import BaseConnection
+
+
+class AsyncConnection(BaseConnection, asyncio.BufferedProtocol):
+    """asyncio protocol exposing the same player interface as the selectors Connection."""
+
+    def __init__(self, server, high_water=256 * 1024):
+        self.server = server
+        self.high_water = high_water
+        self.transport = None
+        self._pending_frames = []
+
+    def connection_made(self, transport):
+        sock = transport.get_extra_info('socket')
+        super().__init__(transport.get_extra_info('peername'), sock.fileno())
+        # asyncio only disables Nagle for sockets created with IPPROTO_TCP, and ours is not.
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.transport = transport
+        transport.set_write_buffer_limits(high=self.high_water, low=self.high_water // 4)
+        self.server.register_client(self)
+
+    def get_buffer(self, sizehint):
+        return self._recv_buffer.writable(max(sizehint, 4096))
+
+    def buffer_updated(self, nbytes):
+        self.bytes_received += nbytes
+        self._recv_buffer.commit(nbytes)
+        self._process_request()
+        self.server.process_client_messages(self)
+
+    def eof_received(self):
+        logging.info(f"Peer {self.addr} closed connection.")
+        return False
+
+    def connection_lost(self, exc):
+        if exc:
+            logging.error(f"Connection to {self.addr} lost: {exc}")
+        self.closed = True
+        if self.server.clients.get(self.id) is self:
+            self.server.remove_client(self.id)
+
+    def pause_writing(self):
+        logging.debug(f"Write buffer above high-water mark for {self.addr}; pausing reads.")
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+    def _enqueue(self, message_data):
+        # Frames produced during one loop iteration are written together.
+        if not self._pending_frames:
+            asyncio.get_running_loop().call_soon(self._flush)
+        self._pending_frames.append(message_data)
+
+    def _flush(self):
+        frames, self._pending_frames = self._pending_frames, []
+        if frames and not self.transport.is_closing():
+            # Counted once handed to the transport, which buffers whatever the socket does not take.
+            self.bytes_sent += sum(map(len, frames))
+            self.transport.writelines(frames)
+
+    @property
+    def pending_bytes(self):
+        return self.transport.get_write_buffer_size() if self.transport else 0
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self._flush()
+        self.transport.close()
+        logging.info(f"Closed connection to {self.addr}")
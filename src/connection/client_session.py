@@ -1,22 +1,36 @@
 import threading
-import time
 from prompt_toolkit import PromptSession
 from prompt_toolkit.patch_stdout import patch_stdout
 from prompt_toolkit import print_formatted_text
 
 from src.game.board import Board
-from src.protocol.client_schemas import ServerMessage, ViewResponse, TurnSwitchNotification
-from src.protocol.server_schemas import MoveRequest, QuitRequest, ViewRequest, BoardRequest, SetNameRequest, ChatMessage
+from src.protocol.client_schemas import ServerMessage, ViewResponse, TurnSwitchNotification, NameChangeResponse, \
+    GameStartedNotification, SpectateResponse
+from src.protocol.codec import BINARY, JSON
+from src.protocol.server_schemas import MoveRequest, QuitRequest, ViewRequest, BoardRequest, SetNameRequest, ChatMessage, PongMessage, \
+    SpectateRequest
 
 
 class GameMenu:
-    def __init__(self, connection):
+    """Interactive player UI.
+
+    The network loop puts each server message on `events` (None once the connection is gone); a
+    dispatcher thread blocks on that queue and the input thread sleeps on `state_changed` until
+    there is something to prompt for, so an idle client uses no CPU.
+    """
+
+    def __init__(self, connection, events, spectate=None, wakeup=None):
         self.player = connection
+        self.events = events
+        self.spectate = spectate
+        self.wakeup = wakeup or (lambda: None)
         self.game_active = False
         self.my_turn = False
         self.awaiting_name = False
         self.awaiting_ship_placement = False
+        self.supports_binary = False
         self.stop_threads = False
+        self.state_changed = threading.Condition()
 
         self.session = PromptSession()
 
@@ -28,60 +42,105 @@ class GameMenu:
 
     def handle_response_loop(self):
         while not self.stop_threads:
-            if self.player.request:
-                self.handle_response()
-                self.player.request = None
-            else:
-                time.sleep(0.1)
-
-    def handle_response(self):
-        if self.player.request:
-            req_type = self.player.request.get("type")
-            message = ""
-            if req_type == "welcome":
-                message = ServerMessage(**self.player.request).message
+            msg = self.events.get()
+            if msg is None:
+                self.stop()
+                break
+            self.handle_response(msg)
+
+    def handle_response(self, msg):
+        req_type = msg.get("type")
+        message = ""
+        if req_type == "welcome":
+            message = ServerMessage(**msg).message
+            self.supports_binary = BINARY in msg.get("encodings", [])
+            if self.spectate is None:
                 self.awaiting_name = True
-            elif req_type == "info":
-                message = ServerMessage(**self.player.request).message
-            elif req_type == "game_started":
-                self.game_active = True
-                self.awaiting_ship_placement = True
-            elif req_type == "turn_switch":
-                turn_msg = TurnSwitchNotification(**self.player.request)
-                if turn_msg.user == self.player.name:
-                    message = "It's your turn!\n"
-                    self.my_turn = True
-                else:
-                    message = f"Waiting for {turn_msg.user} to make a move...\n"
-                    self.my_turn = False
-                message += "\nType 'help' to see the list of available commands."
-            elif req_type == "view":
-                view_msg = ViewResponse(**self.player.request)
-                message = f"Opponent's Board:\n{view_msg.opponent_board}\n"
-                message += f"Board for {view_msg.user}:\n{view_msg.my_board}"
-            elif req_type == "chat":
-                chat_msg = ChatMessage(**self.player.request)
-                message = f"{chat_msg.user}: {chat_msg.message}"
-            elif req_type == "error":
-                message = f"Error: {self.player.request.get('message')}"
-            elif req_type == "quit":
-                message = f"Player {self.player.request.get('user')} has quit the game. You win!"
+            else:
+                self.send(SpectateRequest(game_id=self.spectate))
+        elif req_type == "spectate":
+            spectate_msg = SpectateResponse(**msg)
+            if spectate_msg.success:
+                message = f"Spectating game {spectate_msg.game_id}: {spectate_msg.player1} vs {spectate_msg.player2}"
+            else:
+                message = f"Cannot spectate: {spectate_msg.message}"
+                self.stop_spectating()
+        elif req_type == "set_name":
+            name_msg = NameChangeResponse(**msg)
+            if name_msg.success:
+                self.player.encoding = name_msg.encoding
+        elif req_type == "ping":
+            self.send(PongMessage())
+        elif req_type == "info":
+            message = ServerMessage(**msg).message
+        elif req_type == "game_started":
+            started_msg = GameStartedNotification(**msg)
+            message = f"Game {started_msg.game_id} started. Others can watch with --spectate {started_msg.game_id}"
+            self.game_active = True
+            self.awaiting_ship_placement = True
+        elif req_type == "turn_switch":
+            turn_msg = TurnSwitchNotification(**msg)
+            if self.spectate is not None:
+                message = f"{turn_msg.user} to move"
+            elif turn_msg.user == self.player.name:
+                message = "It's your turn!\n"
+                self.my_turn = True
+            else:
+                message = f"Waiting for {turn_msg.user} to make a move...\n"
+                self.my_turn = False
+            message += "\nType 'help' to see the list of available commands."
+        elif req_type == "view":
+            view_msg = ViewResponse(**msg)
+            message = f"Opponent's Board:\n{view_msg.opponent_board}\n"
+            message += f"Board for {view_msg.user}:\n{view_msg.my_board}"
+        elif req_type == "chat":
+            chat_msg = ChatMessage(**msg)
+            message = f"{chat_msg.user}: {chat_msg.message}"
+        elif req_type == "error":
+            message = f"Error: {msg.get('message')}"
+        elif req_type == "quit":
+            if self.spectate is not None:
+                message = f"Player {msg.get('user')} has quit the game."
+                self.stop_spectating()
+            else:
+                message = f"Player {msg.get('user')} has quit the game. You win!"
                 self.quit_game()
-            elif req_type == "game_over":
-                message = f"Game over! Player {self.player.request.get('winner')} has won!"
+        elif req_type == "game_over":
+            winner = msg.get('winner')
+            message = f"Game over! Player {winner} has won!" if winner else "Game over! Nobody won."
+            if self.spectate is not None:
+                self.stop_spectating()
+            else:
                 self.quit_game()
 
-            self.player.request = None
+        if message:
+            print_formatted_text("\n" + message)
+        self.notify_input()
 
-            if message:
-                print_formatted_text("\n" + message)
+    def notify_input(self):
+        with self.state_changed:
+            self.state_changed.notify_all()
+
+    def wait_for_input_state(self):
+        """Blocks until there is something to prompt for; returns False once the client is stopping."""
+        with self.state_changed:
+            self.state_changed.wait_for(lambda: self.stop_threads or self.awaiting_name
+                                        or self.awaiting_ship_placement or self.game_active)
+        return not self.stop_threads
 
     def process_user_input(self):
-        while not self.stop_threads:
+        try:
+            self._input_loop()
+        except EOFError:
+            self.stop()  # Ctrl-D, or the prompt was closed by stop().
+
+    def _input_loop(self):
+        while self.wait_for_input_state():
             with patch_stdout():
                 if self.awaiting_name:
                     self.player.name = self.session.prompt("Enter your player name: ").strip()
-                    self.player.send(SetNameRequest(user=self.player.name))
+                    encoding = BINARY if self.supports_binary else JSON
+                    self.send(SetNameRequest(user=self.player.name, encoding=encoding))
                     self.awaiting_name = False
                     continue
 
@@ -90,13 +149,14 @@ class GameMenu:
                     self.awaiting_ship_placement = False
                     continue
 
-                if not self.game_active:
-                    continue
-
                 user_input = self.session.prompt("> ").strip().lower()
                 if user_input:
                     self.process_command(user_input)
 
+    def send(self, msg):
+        self.player.send(msg)
+        self.wakeup()
+
     def process_command(self, user_input):
         if user_input == "help":
             print(self.get_commands_text())
@@ -111,7 +171,6 @@ class GameMenu:
             self.view_board()
         elif user_input == "quit":
             self.quit_game()
-            self.stop_threads = True
         else:
             print("Unknown command. Type 'help' for the list of available commands.")
 
@@ -119,7 +178,7 @@ class GameMenu:
         print("\nGame started! Place your ships.")
         board = Board()
         board.place_ships()
-        self.player.send(BoardRequest(user=self.player.name, board=board.serialize()))
+        self.send(BoardRequest(user=self.player.name, board=board.serialize()))
         print("Board sent to server. Waiting for other player...")
 
     def get_commands_text(self):
@@ -132,13 +191,13 @@ class GameMenu:
         return commands
 
     def view_board(self):
-        self.player.send(ViewRequest(user=self.player.name))
+        self.send(ViewRequest(user=self.player.name))
 
     def handle_move(self, user_input):
         try:
             _, x, y = user_input.split()
             x, y = int(x), int(y)
-            self.player.send(MoveRequest(user=self.player.name, x=x, y=y))
+            self.send(MoveRequest(user=self.player.name, x=x, y=y))
             print(f"Move sent: ({x}, {y})")
         except ValueError:
             print("Invalid move command. Use the format: move [x] [y]")
@@ -146,13 +205,25 @@ class GameMenu:
     def handle_chat(self, user_input):
         try:
             _, message = user_input.split(' ', 1)
-            self.player.send(ChatMessage(user=self.player.name, message=message))
+            self.send(ChatMessage(user=self.player.name, message=message))
             print(f"Chat sent: {message}")
         except ValueError:
             print("Invalid chat command. Use the format: chat [message]")
 
-    def quit_game(self):
-        self.player.send(QuitRequest(user=self.player.name))
+    def stop(self):
+        """Stops both threads; the network loop exits once anything queued has been sent."""
         self.stop_threads = True
+        self.notify_input()
+        self.wakeup()
+        # Close an open prompt so the input thread leaves patch_stdout, which flushes pending output.
+        app = self.session.app
+        if app.is_running and threading.current_thread() is not self.input_thread:
+            app.loop.call_soon_threadsafe(lambda: app.is_running and app.exit(exception=EOFError))
+
+    def stop_spectating(self):
+        self.stop()
+
+    def quit_game(self):
+        self.send(QuitRequest(user=self.player.name))
         print("Quitting the game...")
-        self.player.close()
+        self.stop()
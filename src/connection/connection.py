@@ -1,37 +1,136 @@
-import json
 import logging
+import os
 import selectors
-import struct
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from itertools import islice
 
 from pydantic import BaseModel
 
+from src.connection.frame_cache import CachedMessage
+from src.connection.framing import MAX_FRAME_SIZE, FrameError, ReceiveBuffer, create_frame
 from src.protocol.client_schemas import NameChangeResponse
+from src.protocol.codec import JSON, ENCODINGS, encode_message, decode_message
+from src.util.logger import log_payload
 
+IOV_MAX = os.sysconf("SC_IOV_MAX") if hasattr(os, "sysconf") else 1024
+HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+# Until a connection has set its name, no legitimate message is anywhere near this large.
+UNNAMED_MAX_FRAME_SIZE = 4 * 1024
 
-class Connection:
-    def __init__(self, selector, sock, addr):
+
+class BaseConnection(ABC):
+    """Framing, decoding and naming shared by every transport a player can connect through."""
+
+    def __init__(self, addr, fd=None):
         self.id = f"{addr[0]}:{addr[1]}"
+        self.fd = fd
         self.name = None
-        self.selector = selector
-        self.sock = sock
         self.addr = addr
-        self._recv_buffer = b""
-        self._send_buffer = b""
+        self.closed = False
+        self.encoding = JSON
+        self.last_activity = 0.0
+        self.heartbeat_timer = None
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self._recv_buffer = ReceiveBuffer()
+        self.messages = deque()
         self.request = None
 
+    def limit_frames_until_named(self):
+        """Restricts frames to UNNAMED_MAX_FRAME_SIZE until set_name succeeds."""
+        self._recv_buffer.max_frame_size = UNNAMED_MAX_FRAME_SIZE
+
+    def _process_request(self):
+        try:
+            for payload in self._recv_buffer.frames():
+                try:
+                    message = decode_message(payload, self.name)
+                except ValueError:
+                    logging.error("Failed to decode message content")
+                    continue
+                log_payload("Received", self.id, message)
+                self.messages.append(message)
+        except FrameError as e:
+            logging.error(f"Invalid frame from {self.addr}: {e}")
+            self.close()
+
+    def send(self, content):
+        if isinstance(content, CachedMessage):
+            frame = content.frame(self.encoding)
+        elif isinstance(content, BaseModel):
+            frame = self.create_message(encode_message(content, self.encoding))
+        elif isinstance(content, str):
+            frame = self.create_message(content.encode('utf-8'))
+        elif isinstance(content, bytes):
+            frame = self.create_message(content)
+        else:
+            raise TypeError("Content must be a Pydantic model, cached message, str, or bytes")
+
+        if self.closed:
+            logging.warning(f"Dropping message to closed connection {self.addr}")
+            return
+
+        self._enqueue(frame)
+
+    @abstractmethod
+    def _enqueue(self, message_data):
+        """Queues an encoded frame for the transport to write."""
+
+    @staticmethod
+    def create_message(content):
+        if not isinstance(content, bytes):
+            raise TypeError("Content must be in bytes")
+        return create_frame(content)
+
+    @abstractmethod
+    def close(self):
+        """Closes the transport and marks the connection closed."""
+
+    def set_name(self, msg):
+        if 'user' in msg:
+            self.name = msg['user']
+            encoding = msg.get('encoding', JSON)
+            if encoding not in ENCODINGS:
+                encoding = JSON
+            logging.info(f"Set name for {self.id} to {self.name} ({encoding})")
+            # The reply is still sent in JSON; both sides switch encodings once it is delivered.
+            self.send(NameChangeResponse(name=self.name, user=self.name, success=True, encoding=encoding))
+            self.encoding = encoding
+            self._recv_buffer.max_frame_size = MAX_FRAME_SIZE
+        else:
+            logging.warning(f"Invalid name set request from {self.id}")
+            self.send(NameChangeResponse(name=None, success=False))
+
+
+class Connection(BaseConnection):
+    def __init__(self, selector, sock, addr, high_water=256 * 1024):
+        super().__init__(addr, sock.fileno())
+        self.selector = selector
+        self.sock = sock
+        self.high_water = high_water
+        self.low_water = high_water // 4
+        self._send_queue = deque()
+        self._send_queued = 0
+        self._reading_paused = False
+        self._events = selectors.EVENT_READ
+        self._send_lock = threading.Lock()
+
     def process_events(self, mask):
         if mask & selectors.EVENT_READ:
             self._read()
             self._process_request()
-        if mask & selectors.EVENT_WRITE:
+        if mask & selectors.EVENT_WRITE and not self.closed:
             self._write()
 
     def _read(self):
         try:
-            data = self.sock.recv(4096)
-            if data:
-                self._recv_buffer += data
-                logging.debug(f"Received {len(data)} bytes from {self.addr}")
+            received = self._recv_buffer.recv_from(self.sock)
+            if received:
+                self.bytes_received += received
+                logging.debug("Received %d bytes from %s", received, self.addr)
             else:
                 raise RuntimeError("Peer closed connection.")
         except BlockingIOError:
@@ -41,78 +140,102 @@ class Connection:
             self.close()
 
     def _write(self):
-        if self._send_buffer:
-            try:
-                sent = self.sock.send(self._send_buffer)
-                self._send_buffer = self._send_buffer[sent:]  # Trim sent data
-            except BrokenPipeError:
-                logging.error("Broken pipe; closing connection.")
-                self.close()
-                return
-
-            if not self._send_buffer:
-                logging.debug(f"Buffer empty for {self.addr}; switching to EVENT_READ.")
-                self.selector.modify(self.sock, selectors.EVENT_READ, data=self)
-
-    def _process_request(self):
-        while len(self._recv_buffer) >= 2:
-            header_length = struct.unpack(">H", self._recv_buffer[:2])[0]
-            if len(self._recv_buffer) < 2 + header_length:
-                break
-            content_bytes = self._recv_buffer[2:2 + header_length]
-            self._recv_buffer = self._recv_buffer[2 + header_length:]
-            try:
-                self.request = json.loads(content_bytes.decode('utf-8'))
-                logging.info(f"Received message: {self.request}")
-            except json.JSONDecodeError:
-                logging.error("Failed to decode message content")
-
-    def send(self, content):
-        if isinstance(content, BaseModel):
-            content = content.json().encode('utf-8')
-        elif isinstance(content, str):
-            content = content.encode('utf-8')
-        elif not isinstance(content, bytes):
-            raise TypeError("Content must be a Pydantic model, str, or bytes")
-
-        message_data = self.create_message(content)
-        self._send_buffer += message_data
-
-        if self._send_buffer:
-            try:
-                sent = self.sock.send(self._send_buffer)
-                self._send_buffer = self._send_buffer[sent:]
-                logging.debug(f"Sent {sent} bytes to {self.addr}")
-            except BrokenPipeError:
-                logging.error("Broken pipe; closing connection.")
-                self.close()
-            except Exception as e:
-                logging.error(f"Error sending data to {self.addr}: {e}")
-                self.close()
-
-        if not self._send_buffer:
-            self.selector.modify(self.sock, selectors.EVENT_READ, data=self)
-
-    @staticmethod
-    def create_message(content):
-        if not isinstance(content, bytes):
-            raise TypeError("Content must be in bytes")
-        header_bytes = struct.pack(">H", len(content))
-        return header_bytes + content
+        with self._send_lock:
+            if self._send_queue:
+                try:
+                    sent = self._send_frames()
+                except (BlockingIOError, InterruptedError):
+                    sent = 0
+                except OSError as e:
+                    logging.error(f"Error sending data to {self.addr}: {e}")
+                    self.close()
+                    return
+                self._consume_sent(sent)
+                self.bytes_sent += sent
+                logging.debug("Sent %d bytes to %s", sent, self.addr)
+            self._update_interest()
+
+    def _send_frames(self):
+        """Writes as many queued frames as possible with a single scatter/gather syscall."""
+        if len(self._send_queue) == 1:
+            return self.sock.send(self._send_queue[0])
+        if HAS_SENDMSG:
+            return self.sock.sendmsg(islice(self._send_queue, IOV_MAX))
+        return self.sock.send(b"".join(self._send_queue))
+
+    def _consume_sent(self, sent):
+        self._send_queued -= sent
+        queue = self._send_queue
+        while sent:
+            head = queue[0]
+            if sent >= len(head):
+                sent -= len(head)
+                queue.popleft()
+            else:
+                queue[0] = memoryview(head)[sent:]
+                sent = 0
+
+    def _update_interest(self):
+        """Registers for EVENT_WRITE while frames are queued and pauses reads above the high-water mark."""
+        if self.closed:
+            return
+        if self._reading_paused:
+            self._reading_paused = self._send_queued > self.low_water
+        else:
+            self._reading_paused = self._send_queued > self.high_water
+
+        events = 0 if self._reading_paused else selectors.EVENT_READ
+        if self._send_queue:
+            events |= selectors.EVENT_WRITE
+        if events != self._events:
+            self._events = events
+            self.selector.modify(self.sock, events, data=self)
+            logging.debug("Switched %s to events %d", self.addr, events)
+
+    def _enqueue(self, message_data):
+        with self._send_lock:
+            self._send_queue.append(message_data)
+            self._send_queued += len(message_data)
+            self._update_interest()
+
+    @property
+    def pending_bytes(self):
+        return self._send_queued
+
+    def buffered(self):
+        """Returns copies of the bytes queued for sending and of the bytes received but not yet framed."""
+        with self._send_lock:
+            return b"".join(self._send_queue), self._recv_buffer.pending()
+
+    def detach(self):
+        """Unregisters the socket without closing it and returns it; anything still buffered is dropped."""
+        with self._send_lock:
+            self.closed = True
+            self.selector.unregister(self.sock)
+            self._send_queue.clear()
+            self._send_queued = 0
+        return self.sock
+
+    @classmethod
+    def adopt(cls, selector, sock, addr, name, encoding=JSON, unsent=b"", unread=b""):
+        """Wraps a socket handed over by another process, restoring its buffered state."""
+        sock.setblocking(False)
+        connection = cls(selector, sock, addr)
+        connection.name = name
+        connection.encoding = encoding
+        connection._recv_buffer.feed(unread)
+        selector.register(sock, selectors.EVENT_READ, data=connection)
+        if unsent:
+            connection._enqueue(unsent)
+        return connection
 
     def close(self):
+        if self.closed:
+            return
+        self.closed = True
         try:
             self.selector.unregister(self.sock)
             self.sock.close()
             logging.info(f"Closed connection to {self.addr}")
         except Exception as e:
             logging.error(f"Error closing socket {self.addr}: {e}")
-
-    def set_name(self, msg):
-        if 'user' in msg:
-            self.name = msg['user']
-            logging.info(f"Set name for {self.id} to {self.name}")
-            self.send(NameChangeResponse(name=self.name, user=self.name, success=True))
-        else:
-            logging.warning(f"Invalid name set request from {self.id}")
-            self.send(NameChangeResponse(name=None, success=False))
@@ -0,0 +1,282 @@
+import base64
+import json
+import logging
+import os
+import selectors
+import signal
+import socket
+
+from src.connection.matchmaking import Matchmaker
+
+MAX_CONTROL_MESSAGE = 64 * 1024
+POLL_INTERVAL = 0.5
+
+
+def send_control(sock, msg, fds=()):
+    data = json.dumps(msg).encode('utf-8')
+    if len(data) > MAX_CONTROL_MESSAGE:
+        raise ValueError(f"Control message of {len(data)} bytes exceeds the {MAX_CONTROL_MESSAGE} byte limit")
+    if fds:
+        socket.send_fds(sock, [data], list(fds))
+    else:
+        sock.send(data)
+
+
+def recv_control(sock):
+    """Reads one control message and any file descriptors passed with it; returns (None, []) on EOF.
+
+    A truncated or malformed message raises ValueError after its descriptors are closed.
+    """
+    data, fds, flags, _addr = socket.recv_fds(sock, MAX_CONTROL_MESSAGE, 1)
+    if not data:
+        return None, fds
+    try:
+        if flags & socket.MSG_TRUNC:
+            raise ValueError("Control message was truncated")
+        return json.loads(data), fds
+    except ValueError:
+        for fd in fds:
+            os.close(fd)
+        raise
+
+
+class CoordinatorLink:
+    """Worker-side end of the control socket to the match coordinator."""
+
+    def __init__(self, sock, worker_id):
+        self.sock = sock
+        self.worker_id = worker_id
+        self.announced = set()
+        sock.setblocking(False)
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def announce(self, client, rating):
+        if client.id in self.announced:
+            return
+        if self._send({"type": "waiting", "client": client.id, "name": client.name, "rating": rating}):
+            self.announced.add(client.id)
+
+    def cancel(self, client):
+        if client.id in self.announced:
+            self.announced.discard(client.id)
+            self._send({"type": "cancel", "client": client.id})
+
+    def transfer(self, connection, target, partner):
+        """Hands a waiting client's socket and buffered bytes to another worker through the coordinator.
+
+        Returns False and leaves the connection in place if the handoff cannot be sent, for example
+        because the client's buffered bytes do not fit in one control message.
+        """
+        # The coordinator stopped tracking the client when it paired it.
+        self.announced.discard(connection.id)
+        unsent, unread = connection.buffered()
+        sent = self._send({
+            "type": "transfer",
+            "to": target,
+            "partner": partner,
+            "client": connection.id,
+            "name": connection.name,
+            "encoding": connection.encoding,
+            "addr": list(connection.addr),
+            "unsent": base64.b64encode(unsent).decode('ascii'),
+            "unread": base64.b64encode(unread).decode('ascii'),
+        }, fds=[connection.sock.fileno()])
+        if sent:
+            connection.detach().close()
+        return sent
+
+    def handoff_failed(self, msg):
+        self._send({"type": "handoff_failed", "client": msg["client"], "partner": msg["partner"], "to": msg["to"]})
+
+    def report_result(self, winner, loser):
+        """Sends a finished game to the coordinator, which keeps the ratings for every worker."""
+        return self._send({"type": "result", "winner": winner, "loser": loser})
+
+    def receive(self):
+        return recv_control(self.sock)
+
+    def _send(self, msg, fds=()):
+        try:
+            send_control(self.sock, msg, fds)
+            return True
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to send {msg['type']} to the coordinator: {e}")
+            return False
+
+    @staticmethod
+    def adopted_state(msg):
+        return (tuple(msg["addr"]), msg["name"], msg["encoding"],
+                base64.b64decode(msg["unsent"]), base64.b64decode(msg["unread"]))
+
+
+class WaitingPlayer:
+    """A player waiting alone in one worker, as the coordinator sees it."""
+
+    __slots__ = ('id', 'worker', 'client_id', 'name', 'rating')
+
+    def __init__(self, worker, client_id, name, rating):
+        self.id = (worker, client_id)
+        self.worker = worker
+        self.client_id = client_id
+        self.name = name
+        self.rating = rating
+
+
+class CrossWorkerMatchmaker(Matchmaker):
+    """Matchmaker that only pairs players waiting in different workers.
+
+    Each worker pairs its own players in the same bucket at once, so a bucket holds at most one
+    player per worker and the partner scan stays short.
+    """
+
+    def can_pair(self, client, other):
+        return client.worker != other.worker
+
+
+class MatchCoordinator:
+    """Pairs players left waiting alone in different workers, relays the socket handoff and keeps the ratings."""
+
+    def __init__(self, control_socks, matchmaker=None):
+        self.sel = selectors.DefaultSelector()
+        self.workers = {}
+        for worker_id, sock in control_socks.items():
+            self.workers[worker_id] = sock
+            self.sel.register(sock, selectors.EVENT_READ, data=worker_id)
+        self.matchmaker = matchmaker or CrossWorkerMatchmaker()
+        self.handoffs = {}  # (worker_id, client_id) of a player being moved -> the partner it is moving to
+
+    def run(self):
+        while self.workers:
+            for key, _mask in self.sel.select(timeout=POLL_INTERVAL if len(self.matchmaker) else None):
+                self.handle_worker(key.data)
+            for first, second in self.matchmaker.poll():
+                self.hand_off(first, second)
+
+    def handle_worker(self, worker_id):
+        sock = self.workers[worker_id]
+        try:
+            msg, fds = recv_control(sock)
+        except ValueError as e:
+            logging.error(f"Dropping control message from worker {worker_id}: {e}")
+            return
+        except OSError as e:
+            logging.error(f"Control socket for worker {worker_id} failed: {e}")
+            msg, fds = None, []
+
+        if msg is None:
+            self.remove_worker(worker_id)
+            return
+
+        _type = msg["type"]
+        if _type == "waiting":
+            self.enqueue(WaitingPlayer(worker_id, msg["client"], msg["name"], msg["rating"]))
+        elif _type == "cancel":
+            self.matchmaker.cancel((worker_id, msg["client"]))
+        elif _type == "handoff_failed":
+            partner = self.handoffs.pop((worker_id, msg["client"]), None)
+            if partner is not None:
+                # The partner is still waiting alone in its worker.
+                self.enqueue(partner)
+        elif _type == "transfer":
+            self.relay_transfer(worker_id, msg, fds)
+        elif _type == "result":
+            self.record_result(msg["winner"], msg["loser"])
+
+    def enqueue(self, player):
+        pair = self.matchmaker.enqueue(player, rating=player.rating)
+        if pair:
+            self.hand_off(*pair)
+
+    def hand_off(self, first, second):
+        # Move the newer arrival to the worker where its opponent already waits.
+        if self.send(second.worker, {
+            "type": "handoff", "client": second.client_id, "to": first.worker, "partner": first.client_id
+        }):
+            self.handoffs[second.id] = first
+            logging.info(f"Pairing {second.name} (worker {second.worker}) with {first.name} (worker {first.worker})")
+        elif first.worker in self.workers:
+            self.enqueue(first)
+
+    def relay_transfer(self, worker_id, msg, fds):
+        partner = self.handoffs.pop((worker_id, msg["client"]), None)
+        try:
+            if not fds:
+                logging.error(f"Dropping transfer of {msg['client']} without a socket")
+                return
+            msg["type"] = "adopt"
+            if not self.send(msg["to"], msg, fds=fds):
+                # Hand the client back to the worker it came from rather than dropping it.
+                if partner is not None and partner.worker in self.workers:
+                    self.enqueue(partner)
+                self.send(worker_id, msg, fds=fds)
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def record_result(self, winner, loser):
+        self.matchmaker.record_result(winner, loser)
+        ratings = {name: self.matchmaker.ratings[name] for name in (winner, loser)}
+        for worker_id in list(self.workers):
+            self.send(worker_id, {"type": "ratings", "ratings": ratings})
+
+    def send(self, worker_id, msg, fds=()):
+        sock = self.workers.get(worker_id)
+        if sock is None:
+            logging.error(f"Cannot send {msg['type']} to worker {worker_id}: it is gone")
+            return False
+        try:
+            send_control(sock, msg, fds)
+            return True
+        except (OSError, ValueError) as e:
+            logging.error(f"Failed to send {msg['type']} to worker {worker_id}: {e}")
+            return False
+
+    def remove_worker(self, worker_id):
+        logging.warning(f"Worker {worker_id} disconnected from the coordinator")
+        self.sel.unregister(self.workers.pop(worker_id))
+        for player_id in [player_id for player_id in self.matchmaker.tickets if player_id[0] == worker_id]:
+            self.matchmaker.cancel(player_id)
+        for player_id in [player_id for player_id in self.handoffs if player_id[0] == worker_id]:
+            self.enqueue(self.handoffs.pop(player_id))
+
+
+def run_workers(workers, server_factory):
+    """Forks one server per worker and runs the match coordinator in the parent process.
+
+    server_factory is called in each child with its CoordinatorLink and must return a server
+    listening with SO_REUSEPORT on the shared port.
+    """
+    control_socks = {}
+    pids = []
+    for worker_id in range(workers):
+        parent_sock, child_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        pid = os.fork()
+        if pid == 0:
+            parent_sock.close()
+            for sock in control_socks.values():
+                sock.close()
+            try:
+                server_factory(CoordinatorLink(child_sock, worker_id)).run()
+            finally:
+                # os._exit skips atexit, so flush the background log writer by hand.
+                logging.shutdown()
+                os._exit(0)
+        child_sock.close()
+        control_socks[worker_id] = parent_sock
+        pids.append(pid)
+        logging.info(f"Started worker {worker_id} (pid {pid})")
+
+    try:
+        MatchCoordinator(control_socks).run()
+    except KeyboardInterrupt:
+        logging.info("Coordinator shutting down...")
+    finally:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGINT)
+            except ProcessLookupError:
+                pass
+        for pid in pids:
+            os.waitpid(pid, 0)
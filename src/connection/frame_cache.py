@@ -0,0 +1,79 @@
+"""Pre-encoded frames for messages that are sent many times.
+
+Connection.send enqueues the frame of a CachedMessage for the connection's encoding as-is, so a
+constant message such as the welcome is serialized and framed once per encoding for the life of
+the process, and a session broadcast once per encoding rather than once per recipient.
+"""
+import re
+from json.encoder import encode_basestring
+
+from src.connection.framing import create_frame
+from src.protocol.codec import JSON, encode_message
+
+_PLACEHOLDER = re.compile(rb'"\\u0000(\w+)\\u0000"')
+
+
+class CachedMessage:
+    """A message that is encoded and framed at most once per wire encoding."""
+
+    __slots__ = ('message', '_frames')
+
+    def __init__(self, message):
+        self.message = message
+        self._frames = {}
+
+    def frame(self, encoding):
+        frame = self._frames.get(encoding)
+        if frame is None:
+            frame = self._frames[encoding] = self._build(encoding)
+        return frame
+
+    def _build(self, encoding):
+        return create_frame(encode_message(self.message, encoding))
+
+
+class MessageTemplate:
+    """A message type with a few per-recipient string fields.
+
+    The JSON encoding of the constant part is computed once and split around the variable fields;
+    render() splices the escaped values back in. Other encodings encode the full model, which for
+    the hot message types is already a fixed struct layout.
+    """
+
+    def __init__(self, model_class, fields, **constants):
+        self.model_class = model_class
+        self.constants = constants
+        placeholders = {name: f"\x00{name}\x00" for name in fields}
+        encoded = encode_message(model_class(**constants, **placeholders), JSON)
+        parts = _PLACEHOLDER.split(encoded)
+        # split() alternates constant segments with the captured field names.
+        self._segments = parts[0::2]
+        self._fields = [name.decode('ascii') for name in parts[1::2]]
+        if sorted(self._fields) != sorted(fields):
+            raise ValueError(f"Could not template fields {fields} of {model_class.__name__}")
+
+    def render(self, **values):
+        return TemplatedMessage(self, values)
+
+    def encode_json(self, values):
+        segments = self._segments
+        out = [segments[0]]
+        for name, segment in zip(self._fields, segments[1:]):
+            out.append(encode_basestring(values[name]).encode('utf-8'))
+            out.append(segment)
+        return b''.join(out)
+
+
+class TemplatedMessage(CachedMessage):
+    __slots__ = ('template', 'values')
+
+    def __init__(self, template, values):
+        super().__init__(None)
+        self.template = template
+        self.values = values
+
+    def _build(self, encoding):
+        template = self.template
+        if encoding == JSON:
+            return create_frame(template.encode_json(self.values))
+        return create_frame(encode_message(template.model_class(**template.constants, **self.values), encoding))
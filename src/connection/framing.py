@@ -0,0 +1,170 @@
+"""Length-prefixed message framing.
+
+Every frame is a flags byte, the payload length as an unsigned LEB128 varint, then the payload.
+Payloads above COMPRESS_THRESHOLD are deflated with zlib when that makes them smaller.
+"""
+import zlib
+
+FLAG_COMPRESSED = 0x01
+KNOWN_FLAGS = FLAG_COMPRESSED
+
+COMPRESS_THRESHOLD = 1024
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+MAX_HEADER_SIZE = 1 + 5
+SHRINK_SIZE = 256 * 1024
+GROW_STEP = 64 * 1024
+
+
+class FrameError(ValueError):
+    pass
+
+
+class ReceiveBuffer:
+    """Growable receive buffer that frames messages in place."""
+
+    def __init__(self, initial_size=4096, max_frame_size=MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self._initial_size = initial_size
+        self._buffer = bytearray(initial_size)
+        self._view = memoryview(self._buffer)
+        self._start = 0
+        self._end = 0
+        self._needed = 0
+
+    def __len__(self):
+        return self._end - self._start
+
+    def writable(self, min_free=1024):
+        """Returns a writable view over the free tail of the buffer, growing or compacting it as needed.
+
+        While a large frame is partially received, the buffer grows towards the whole frame by at most
+        GROW_STEP per read, so the rest of it is read straight into place without a declared length
+        alone reserving the memory.
+        """
+        missing = self._needed - (self._end - self._start)
+        min_free = max(min_free, min(missing, GROW_STEP))
+        if len(self._buffer) - self._end < min_free:
+            self._make_room(min_free)
+        return self._view[self._end:]
+
+    def commit(self, nbytes):
+        """Marks nbytes written into the view returned by writable() as received."""
+        self._end += nbytes
+
+    def recv_from(self, sock, min_free=4096):
+        """Reads directly into the buffer with recv_into, returning the number of bytes read."""
+        nbytes = sock.recv_into(self.writable(min_free))
+        self._end += nbytes
+        return nbytes
+
+    def pending(self):
+        """Returns a copy of the bytes received but not yet framed."""
+        return bytes(self._view[self._start:self._end])
+
+    def feed(self, data):
+        """Appends already-received bytes, e.g. when adopting a connection from another process."""
+        view = self.writable(len(data))
+        view[:len(data)] = data
+        self._end += len(data)
+
+    def frames(self):
+        """Yields the payload of every complete frame currently buffered.
+
+        Uncompressed payloads are memoryviews into the buffer and are only valid until the next read.
+        """
+        buffer, view = self._buffer, self._view
+        start, end = self._start, self._end
+        try:
+            while end - start >= 2:
+                flags = buffer[start]
+                length = buffer[start + 1]
+                payload_start = start + 2
+                if length & 0x80:
+                    length, payload_start = self._read_varint(buffer, start + 1, end)
+                    if payload_start is None:
+                        break
+                if flags & ~KNOWN_FLAGS:
+                    raise FrameError(f"Unknown frame flags {flags:#x}")
+                if length > self.max_frame_size:
+                    raise FrameError(f"Frame of {length} bytes exceeds the {self.max_frame_size} byte limit")
+
+                frame_end = payload_start + length
+                if frame_end > end:
+                    self._needed = frame_end - start
+                    break
+                self._needed = 0
+                payload = view[payload_start:frame_end]
+                start = frame_end
+                if flags & FLAG_COMPRESSED:
+                    payload = self._decompress(payload)
+                yield payload
+        finally:
+            self._start = start
+            if start == end:
+                self._start = self._end = 0
+                if len(self._buffer) > SHRINK_SIZE:
+                    # Release the space a large frame needed once it has been consumed.
+                    self._buffer = bytearray(self._initial_size)
+                    self._view = memoryview(self._buffer)
+
+    @staticmethod
+    def _read_varint(buffer, pos, end):
+        length = shift = 0
+        limit = min(end, pos + MAX_HEADER_SIZE - 1)
+        while pos < limit:
+            byte = buffer[pos]
+            pos += 1
+            length |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return length, pos
+            shift += 7
+        if limit < end:
+            raise FrameError("Frame length header is too long")
+        return 0, None
+
+    def _decompress(self, payload):
+        decompressor = zlib.decompressobj()
+        try:
+            data = decompressor.decompress(payload, self.max_frame_size)
+        except zlib.error as e:
+            raise FrameError(f"Corrupt compressed frame: {e}") from e
+        if decompressor.unconsumed_tail:
+            raise FrameError(f"Decompressed frame exceeds the {self.max_frame_size} byte limit")
+        if not decompressor.eof:
+            raise FrameError("Truncated compressed frame")
+        return data
+
+    def _make_room(self, min_free):
+        pending = self._end - self._start
+        if self._start and len(self._buffer) - pending >= min_free:
+            self._buffer[:pending] = self._buffer[self._start:self._end]
+        else:
+            size = len(self._buffer)
+            while size - pending < min_free:
+                size *= 2
+            grown = bytearray(size)
+            grown[:pending] = self._view[self._start:self._end]
+            self._buffer = grown
+            self._view = memoryview(self._buffer)
+        self._start, self._end = 0, pending
+
+
+def encode_varint(value):
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def create_frame(content, compress_threshold=COMPRESS_THRESHOLD):
+    flags = 0
+    if compress_threshold is not None and len(content) > compress_threshold:
+        compressed = zlib.compress(content, 1)
+        if len(compressed) < len(content):
+            content, flags = compressed, FLAG_COMPRESSED
+    length = len(content)
+    if length < 0x80:
+        return bytes((flags, length)) + content
+    return bytes((flags,)) + encode_varint(length) + content
@@ -1,58 +1,99 @@
 import logging
 import time
+from collections import deque
 
+from src.connection.frame_cache import CachedMessage, MessageTemplate
 from src.game.board import Board
 from src.protocol.client_schemas import *
-from src.protocol.server_schemas import BoardRequest, ViewRequest, MoveRequest, ChatMessage, QuitRequest
+from src.protocol.server_schemas import BoardRequest, ViewRequest, ChatMessage, QuitRequest, parse_move
 from src.game.game import Game
+from src.util.metrics import REGISTRY
+
+TURN_SWITCH = MessageTemplate(TurnSwitchNotification, ['user'])
+GAME_OVER = MessageTemplate(GameOverNotification, ['winner'])
+QUIT = MessageTemplate(QuitNotification, ['user'])
+
+# Spectators further behind than this skip droppable events; past the hard limit they are dropped.
+SPECTATOR_LAG_BYTES = 64 * 1024
+SPECTATOR_MAX_BYTES = 512 * 1024
+
+HANDLER_SECONDS = REGISTRY.histogram('battleship_handler_seconds', 'Time spent in GameSession handlers', label='handler')
 
 
 class GameSession:
-    def __init__(self, player1, player2):
+    # Looked up by name on each message so that methods wrapped at runtime (see Profiler) take effect.
+    HANDLERS = {
+        "move": "handle_move",
+        "board": "handle_board",
+        "view": "handle_view",
+        "chat": "handle_chat",
+        "quit": "handle_quit",
+    }
+
+    def __init__(self, player1, player2, timers=None, turn_timeout=None, placement_timeout=None):
         self.game = Game(player1, player2)
+        self.finished = False
+        self.on_finish = None
+        self.on_pending = None
+        self.on_spectator_lag = None
+        self.spectators = {}
+        self.timers = timers
+        self.turn_timeout = turn_timeout
+        self._turn_timer = None
+        self._outbox = deque()
         msg = f"New game session started between {player1.name} and {player2.name}"
         logging.info(msg)
         self.notify_session(ServerMessage(message=msg))
-        self.notify_session(GameStartedNotification(player1=player1.name, player2=player2.name))
+        self.notify_session(GameStartedNotification(
+            player1=player1.name, player2=player2.name, game_id=self.game.game_id))
+        # Ship placement runs on the same clock as the turns; it stops once both boards are in.
+        self._start_clock(placement_timeout, self.handle_placement_timeout)
 
     def handle_message(self, msg):
         _type = msg['type']
-        if _type == "move":
-            self.handle_move(msg)
-        elif _type == "board":
-            self.handle_board(msg)
-        elif _type == "view":
-            self.handle_view(msg)
-        elif _type == "chat":
-            self.handle_chat(msg)
-        elif _type == "quit":
-            self.handle_quit(msg)
+        handler = self.HANDLERS.get(_type)
+        if handler:
+            start = time.perf_counter()
+            getattr(self, handler)(msg)
+            HANDLER_SECONDS.observe(time.perf_counter() - start, _type)
 
     def handle_move(self, msg):
-        msg = MoveRequest(**msg)
-        player_name = msg.user
+        player_name, x, y = parse_move(msg)
+        if not self.game.both_players_submit_boards():
+            self.notify_player(player_name, ErrorResponse(request='move', message="Boards have not been submitted yet"))
+            return
+        if player_name != self.game.turn:
+            self.notify_player(player_name, ErrorResponse(request='move', message="It is not your turn"))
+            return
+        if not all(board.in_bounds(x, y) for board in self.game.boards.values()):
+            self.notify_player(player_name, ErrorResponse(request='move', message=f"({x}, {y}) is off the board"))
+            return
+        self._stop_turn_clock()
 
         for opp_name, opp_board in self.game.boards.items():
             if opp_name != player_name:
-                hit, sunk, ship_name = opp_board.mark_hit(msg.x, msg.y)
+                hit, sunk, ship_name = opp_board.mark_hit(x, y)
                 status = "Hit!" if hit else "Miss!"
-                response = f"{player_name} fired at ({msg.x}, {msg.y}). {status}"
+                response = f"{player_name} fired at ({x}, {y}). {status}"
                 response += f" {ship_name} has been sunk!" if sunk else ""
-                print(response)
-                self.notify_session(ServerMessage(message=response))
+                logging.debug(response)
+                self.notify_session(ServerMessage(message=response), droppable=True)
 
         if self.game.check_winner():
-            self.game.winner = player_name
+            self.finish(player_name)
             logging.info(f"Player {self.game.winner} has won the game!")
-            self.notify_session(GameOverNotification(winner=self.game.winner))
+            self.notify_session(GAME_OVER.render(winner=self.game.winner))
         else:
             self.game.switch_turn()
-            self.notify_session(TurnSwitchNotification(user=self.game.turn))
+            self.notify_session(TURN_SWITCH.render(user=self.game.turn))
+            self._start_turn_clock()
 
     def handle_view(self, msg):
         msg = ViewRequest(**msg)
-        player = self.game.players[msg.user]
-        player.send(ViewResponse(
+        if not self.game.both_players_submit_boards():
+            self.notify_player(msg.user, ErrorResponse(request='view', message="Boards have not been submitted yet"))
+            return
+        self.notify_player(msg.user, ViewResponse(
             user=msg.user,
             my_board=self.game.get_board(msg.user).to_string(),
             opponent_board=self.game.get_opponent_board_view(msg.user)
@@ -61,7 +102,7 @@ class GameSession:
     def handle_board(self, msg):
         msg = BoardRequest(**msg)
         player_name = msg.user
-        self.game.boards[player_name] = Board.deserialize(msg.board.dict())
+        self.game.boards[player_name] = Board.deserialize(msg.board.model_dump())
 
         response = f"Board received for {player_name}. "
         if not self.game.both_players_submit_boards():
@@ -70,21 +111,129 @@ class GameSession:
         else:
             response += "Both players have submitted their boards. Starting game..."
             self.notify_session(ServerMessage(message=response))
-            self.notify_session(TurnSwitchNotification(user=self.game.turn))
+            self.notify_session(TURN_SWITCH.render(user=self.game.turn))
+            self._start_turn_clock()
 
     def handle_chat(self, msg):
         msg = ChatMessage(**msg)
         logging.info(f"Chat from {msg.user}: {msg.message}")
-        for name, player in self.game.players.items():
+        for name in self.game.players:
             if name != msg.user:
-                player.send(ServerMessage(message=f"{msg.user}: {msg.message}"))
+                self.notify_player(name, ServerMessage(message=f"{msg.user}: {msg.message}"))
 
     def handle_quit(self, msg):
         msg = QuitRequest(**msg)
         logging.info(f"Player {msg.user} has quit the game.")
-        self.notify_session(QuitNotification(user=msg.user))
+        self.finish(self.opponent_of(msg.user))
+        self.notify_session(QUIT.render(user=msg.user))
 
-    def notify_session(self, msg):
+    def remove_player(self, player_id):
         for name, player in self.game.players.items():
-            player.send(msg)
-        time.sleep(0.05)
+            if player.id == player_id:
+                logging.info(f"Player {name} disconnected from the game.")
+                self.finish(self.opponent_of(name))
+                self.notify_session(QUIT.render(user=name))
+                return
+
+    def handle_turn_timeout(self):
+        self._turn_timer = None
+        loser = self.game.turn
+        winner = self.opponent_of(loser)
+        logging.info(f"Player {loser} ran out of time.")
+        self.notify_session(ServerMessage(message=f"{loser} ran out of time and forfeits the game."))
+        self.finish(winner)
+        self.notify_session(GAME_OVER.render(winner=winner))
+
+    def handle_placement_timeout(self):
+        self._turn_timer = None
+        missing = [name for name in self.game.players if name not in self.game.boards]
+        if len(missing) == 1:
+            loser = missing[0]
+            winner = self.opponent_of(loser)
+            logging.info(f"Player {loser} did not place their ships in time.")
+            self.notify_session(ServerMessage(message=f"{loser} did not place their ships in time and forfeits."))
+        else:
+            winner = None
+            logging.info("Neither player placed their ships in time.")
+            self.notify_session(ServerMessage(message="Neither player placed their ships in time."))
+        self.finish(winner)
+        # The template only splices in strings; an abandoned game has no winner to render.
+        self.notify_session(GAME_OVER.render(winner=winner) if winner else GameOverNotification())
+
+    def _start_turn_clock(self):
+        self._start_clock(self.turn_timeout, self.handle_turn_timeout)
+
+    def _start_clock(self, timeout, callback):
+        if self.timers is not None and timeout:
+            self._stop_turn_clock()
+            self._turn_timer = self.timers.schedule(timeout, callback)
+
+    def _stop_turn_clock(self):
+        if self._turn_timer:
+            self.timers.cancel(self._turn_timer)
+            self._turn_timer = None
+
+    def add_spectator(self, connection):
+        self.spectators[connection.id] = connection
+
+    def remove_spectator(self, connection_id):
+        return self.spectators.pop(connection_id, None)
+
+    def opponent_of(self, name):
+        return next((other for other in self.game.players if other != name), None)
+
+    def finish(self, winner):
+        """Ends the game once, with no winner if it was abandoned; later quits and disconnects change nothing."""
+        if self.finished:
+            return
+        self.finished = True
+        self._stop_turn_clock()
+        self.game.winner = winner
+        if self.on_finish:
+            self.on_finish(self, winner, self.opponent_of(winner) if winner else None)
+
+    def notify_session(self, msg, droppable=False):
+        """Queues a message for every player and spectator; it is sent when the session is flushed.
+
+        Droppable messages are skipped for spectators that are falling behind.
+        """
+        self._queue(None, msg, droppable)
+
+    def notify_player(self, name, msg):
+        """Queues a message for a single player, ordered with the session broadcasts."""
+        self._queue(name, msg, False)
+
+    def _queue(self, name, msg, droppable):
+        if not self._outbox and self.on_pending:
+            self.on_pending(self)
+        self._outbox.append((name, msg, droppable))
+
+    def flush(self):
+        """Sends every queued message in the order it was produced."""
+        players = self.game.players
+        while self._outbox:
+            name, msg, droppable = self._outbox.popleft()
+            if name is None:
+                if not isinstance(msg, CachedMessage):
+                    # Encode a broadcast once per wire encoding rather than once per recipient.
+                    msg = CachedMessage(msg)
+                for player in players.values():
+                    player.send(msg)
+                if self.spectators:
+                    self.fan_out(msg, droppable)
+            elif name in players:
+                players[name].send(msg)
+
+    def fan_out(self, msg, droppable):
+        """Sends a broadcast to every spectator; all of them share the same encoded frame."""
+        for spectator in list(self.spectators.values()):
+            backlog = spectator.pending_bytes
+            if backlog > SPECTATOR_MAX_BYTES:
+                logging.info(f"Dropping spectator {spectator.id}: {backlog} bytes behind")
+                del self.spectators[spectator.id]
+                if self.on_spectator_lag:
+                    self.on_spectator_lag(spectator)
+            elif droppable and backlog > SPECTATOR_LAG_BYTES:
+                continue
+            else:
+                spectator.send(msg)
@@ -0,0 +1,167 @@
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+
+from src.util.metrics import REGISTRY
+
+WAIT_SECONDS = REGISTRY.histogram('battleship_matchmaking_wait_seconds', 'Time players waited in the queue for a match')
+
+
+class Ticket:
+    __slots__ = ('client', 'rating', 'bucket', 'enqueued_at', 'radius', 'active')
+
+    def __init__(self, client, rating, bucket, enqueued_at):
+        self.client = client
+        self.rating = rating
+        self.bucket = bucket
+        self.enqueued_at = enqueued_at
+        self.radius = 0
+        self.active = True
+
+
+class Matchmaker:
+    """Rating-bucketed matchmaking queue.
+
+    Players wait in a FIFO deque for their rating bucket. A new player is paired with the oldest
+    player in the nearest bucket within its search radius, which starts at its own bucket and widens
+    by one bucket every `widen_interval` seconds of waiting. Cancelled and matched tickets are
+    flagged inactive and skipped lazily, so enqueue, cancel and each widening step stay O(log n).
+    """
+
+    def __init__(self, bucket_width=100, widen_interval=5.0, max_radius=20, default_rating=1500,
+                 k_factor=32, clock=time.monotonic):
+        self.bucket_width = bucket_width
+        self.widen_interval = widen_interval
+        self.max_radius = max_radius
+        self.default_rating = default_rating
+        self.k_factor = k_factor
+        self.clock = clock
+
+        self.ratings = {}
+        self.tickets = {}  # client id -> active ticket
+        self.buckets = {}  # bucket index -> deque of tickets, oldest first
+        self._widen_heap = []  # (next widening time, sequence, ticket)
+        self._sequence = itertools.count()
+
+        self.wait_times = deque(maxlen=1024)
+        self.matched = 0
+        self.cancelled = 0
+
+    def __len__(self):
+        return len(self.tickets)
+
+    def __contains__(self, client_id):
+        return client_id in self.tickets
+
+    def rating_of(self, name):
+        return self.ratings.get(name, self.default_rating)
+
+    def enqueue(self, client, match=True, rating=None):
+        """Adds a player to the queue, returning (player1, player2) if it was paired immediately."""
+        now = self.clock()
+        if rating is None:
+            rating = self.rating_of(client.name)
+        ticket = Ticket(client, rating, int(rating // self.bucket_width), now)
+
+        partner = self._find_partner(ticket) if match else None
+        if partner:
+            return self._pair(partner, ticket, now)
+
+        self.tickets[client.id] = ticket
+        self.buckets.setdefault(ticket.bucket, deque()).append(ticket)
+        heapq.heappush(self._widen_heap, (now + self.widen_interval, next(self._sequence), ticket))
+        return None
+
+    def get(self, client_id):
+        """Returns a waiting player's connection, or None if it is not queued."""
+        ticket = self.tickets.get(client_id)
+        return ticket.client if ticket else None
+
+    def cancel(self, client_id):
+        """Removes a waiting player, returning its connection or None if it was not queued."""
+        ticket = self.tickets.pop(client_id, None)
+        if ticket is None:
+            return None
+        ticket.active = False
+        self.cancelled += 1
+        return ticket.client
+
+    def poll(self):
+        """Widens the search of every ticket whose next interval has elapsed and returns the new pairs."""
+        now = self.clock()
+        pairs = []
+        heap = self._widen_heap
+        while heap and heap[0][0] <= now:
+            _, _, ticket = heapq.heappop(heap)
+            if not ticket.active:
+                continue
+            ticket.radius = min(ticket.radius + 1, self.max_radius)
+            partner = self._find_partner(ticket)
+            if partner:
+                pairs.append(self._pair(partner, ticket, now))
+            elif ticket.radius < self.max_radius:
+                heapq.heappush(heap, (now + self.widen_interval, next(self._sequence), ticket))
+        return pairs
+
+    def can_pair(self, client, other):
+        """Returns whether two waiting players may be matched; subclasses narrow this."""
+        return True
+
+    def record_result(self, winner, loser):
+        """Applies an Elo update for a finished game."""
+        winner_rating, loser_rating = self.rating_of(winner), self.rating_of(loser)
+        expected = 1 / (1 + 10 ** ((loser_rating - winner_rating) / 400))
+        delta = self.k_factor * (1 - expected)
+        self.ratings[winner] = winner_rating + delta
+        self.ratings[loser] = loser_rating - delta
+        logging.info(f"Ratings updated: {winner} {self.ratings[winner]:.0f}, {loser} {self.ratings[loser]:.0f}")
+
+    def stats(self):
+        waits = sorted(self.wait_times)
+        return {
+            "waiting": len(self.tickets),
+            "matched": self.matched,
+            "cancelled": self.cancelled,
+            "wait_p50": waits[len(waits) // 2] if waits else 0.0,
+            "wait_p99": waits[min(len(waits) - 1, len(waits) * 99 // 100)] if waits else 0.0,
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+
+    def _find_partner(self, ticket):
+        for distance in range(ticket.radius + 1):
+            for bucket in (ticket.bucket - distance, ticket.bucket + distance) if distance else (ticket.bucket,):
+                partner = self._oldest_in(bucket, ticket)
+                if partner:
+                    return partner
+        return None
+
+    def _oldest_in(self, bucket, ticket):
+        waiting = self.buckets.get(bucket)
+        if not waiting:
+            return None
+        while waiting and not waiting[0].active:
+            waiting.popleft()
+        if not waiting:
+            del self.buckets[bucket]
+            return None
+        # An arrival always pairs with a player it may play that is already waiting in its own bucket,
+        # so the scan normally stops at the head.
+        for candidate in waiting:
+            if candidate.active and candidate is not ticket and self.can_pair(candidate.client, ticket.client):
+                return candidate
+        return None
+
+    def _pair(self, first, second, now):
+        if second.enqueued_at < first.enqueued_at:
+            first, second = second, first
+        for ticket in (first, second):
+            ticket.active = False
+            self.tickets.pop(ticket.client.id, None)
+            self.wait_times.append(now - ticket.enqueued_at)
+            WAIT_SECONDS.observe(now - ticket.enqueued_at)
+        self.matched += 1
+        logging.debug(f"Matched {first.client.name} ({first.rating:.0f}) with {second.client.name} "
+                      f"({second.rating:.0f}) after {now - first.enqueued_at:.1f}s")
+        return first.client, second.client
@@ -0,0 +1,135 @@
+"""Minimal HTTP endpoint serving the metrics registry from inside the server's own event loop."""
+import asyncio
+import logging
+import selectors
+import socket
+from urllib.parse import urlsplit, parse_qs
+
+MAX_REQUEST_SIZE = 8192
+REQUEST_TIMEOUT = 5.0  # for the whole exchange, so a stalled scraper cannot hold a socket open
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_response(registry, request):
+    """Builds the full HTTP response for a raw request head, or a 431 if no complete head fit in the limit."""
+    if b"\r\n\r\n" not in request[:MAX_REQUEST_SIZE]:
+        return _response(431, "Request Header Fields Too Large", "request head too large\n")
+    try:
+        method, target, _ = request.split(b"\r\n", 1)[0].decode('ascii').split(" ", 2)
+    except (UnicodeDecodeError, ValueError):
+        return _response(400, "Bad Request", "bad request\n")
+    if method != "GET":
+        return _response(405, "Method Not Allowed", "only GET is supported\n")
+    url = urlsplit(target)
+    if url.path != "/metrics":
+        return _response(404, "Not Found", "try /metrics\n")
+    detailed = parse_qs(url.query).get("detailed") == ["1"]
+    return _response(200, "OK", registry.render(detailed))
+
+
+def _response(status, reason, body):
+    body = body.encode('utf-8')
+    head = (f"HTTP/1.1 {status} {reason}\r\nContent-Type: {CONTENT_TYPE}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n")
+    return head.encode('ascii') + body
+
+
+class MetricsEndpoint:
+    """Listening socket for scrapes, multiplexed on the server's selector."""
+
+    def __init__(self, selector, registry, host='127.0.0.1', port=9100, timers=None):
+        self.sel = selector
+        self.registry = registry
+        self.timers = timers
+        self.address = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(self.address)
+        self.sock.listen()
+        self.sock.setblocking(False)
+        self.sel.register(self.sock, selectors.EVENT_READ, data=self)
+        logging.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    def accept(self):
+        try:
+            conn, _ = self.sock.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        request = MetricsRequest(self, conn)
+        self.sel.register(conn, selectors.EVENT_READ, data=request)
+        if self.timers is not None:
+            request.timer = self.timers.schedule(REQUEST_TIMEOUT, request.close)
+
+    def close(self):
+        self.sel.unregister(self.sock)
+        self.sock.close()
+
+
+class MetricsRequest:
+    def __init__(self, endpoint, sock):
+        self.endpoint = endpoint
+        self.sock = sock
+        self.request = b""
+        self.response = None
+        self.timer = None
+
+    def process_events(self, mask):
+        try:
+            if mask & selectors.EVENT_READ and self.response is None:
+                self._read()
+            if mask & selectors.EVENT_WRITE and self.response:
+                self._write()
+        except OSError as e:
+            logging.debug(f"Metrics request failed: {e}")
+            self.close()
+
+    def _read(self):
+        data = self.sock.recv(4096)
+        if not data:
+            self.close()
+            return
+        self.request += data
+        if b"\r\n\r\n" in self.request or len(self.request) > MAX_REQUEST_SIZE:
+            self.response = memoryview(render_response(self.endpoint.registry, self.request))
+            self.endpoint.sel.modify(self.sock, selectors.EVENT_WRITE, data=self)
+            self._write()
+
+    def _write(self):
+        sent = self.sock.send(self.response)
+        self.response = self.response[sent:]
+        if not self.response:
+            self.close()
+
+    def close(self):
+        if self.timer is not None:
+            self.endpoint.timers.cancel(self.timer)
+            self.timer = None
+        try:
+            self.endpoint.sel.unregister(self.sock)
+        except (KeyError, ValueError):
+            pass
+        self.sock.close()
+
+
+class MetricsProtocol(asyncio.Protocol):
+    """The same endpoint for the asyncio engine."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.transport = None
+        self.request = b""
+        self._timeout = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._timeout = asyncio.get_running_loop().call_later(REQUEST_TIMEOUT, transport.close)
+
+    def connection_lost(self, exc):
+        self._timeout.cancel()
+
+    def data_received(self, data):
+        self.request += data
+        if b"\r\n\r\n" in self.request or len(self.request) > MAX_REQUEST_SIZE:
+            self.transport.write(render_response(self.registry, self.request))
+            self.transport.close()
@@ -0,0 +1,32 @@
+class ConnectionRegistry:
+    """Live connections indexed by client id and by socket file descriptor."""
+
+    def __init__(self):
+        self._by_id = {}
+        self._by_fd = {}
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def __contains__(self, client_id):
+        return client_id in self._by_id
+
+    def add(self, connection):
+        self._by_id[connection.id] = connection
+        self._by_fd[connection.fd] = connection
+
+    def get(self, client_id):
+        return self._by_id.get(client_id)
+
+    def get_by_fd(self, fd):
+        return self._by_fd.get(fd)
+
+    def remove(self, client_id):
+        """Removes and returns the connection with the given id, or None if it is not registered."""
+        connection = self._by_id.pop(client_id, None)
+        if connection is not None and self._by_fd.get(connection.fd) is connection:
+            del self._by_fd[connection.fd]
+        return connection
@@ -0,0 +1,135 @@
+"""Probability-density targeting for a computer opponent.
+
+For every ship still afloat, each placement that avoids known misses and sunk ships is counted
+over the cells it covers; the unshot cell covered by the most placements is fired at next. While
+there are hits not yet attributed to a sunk ship (target mode) placements through those hits are
+weighted TARGET_WEIGHT times per hit, which concentrates fire around them. Placement validity is a
+prefix-sum difference over every row and column at once, so a shot costs a few dozen array
+operations on size x size arrays regardless of how many placements there are.
+"""
+import random
+
+import numpy as np
+
+from src.game.board import Board
+
+TARGET_WEIGHT = 1000
+
+
+def _prefix_sums(cells):
+    """Running totals along the last axis with a leading 0, so a window sum is one subtraction."""
+    sums = np.zeros(cells.shape[:-1] + (cells.shape[-1] + 1,))
+    np.cumsum(cells, axis=-1, out=sums[..., 1:])
+    return sums
+
+
+def placement_heatmap(blocked, hits, remaining):
+    """Weighted count of ship placements covering each cell, 0 for cells already shot.
+
+    blocked (misses and sunk ships) and hits (unresolved hits) are boolean arrays of shape
+    (..., size, size); any leading dimensions are independent boards. remaining maps each ship
+    length still afloat to its count, as a number or an array over the leading dimensions.
+    """
+    size = blocked.shape[-1]
+    # Horizontal placements run along rows of layer 0, vertical ones along rows of the transposed layer 1.
+    blocked_sums = _prefix_sums(np.stack((blocked, blocked.swapaxes(-1, -2)), axis=-3))
+    target = bool(hits.any())
+    if target:
+        hit_sums = _prefix_sums(np.stack((hits, hits.swapaxes(-1, -2)), axis=-3))
+    density = np.zeros(blocked_sums.shape[:-1] + (size,))
+    for length, count in remaining.items():
+        if length > size:
+            continue
+        starts = size - length + 1
+        count = np.asarray(count, float)[..., None, None, None]
+        weights = (blocked_sums[..., length:] == blocked_sums[..., :-length]) * count
+        if target:
+            weights *= 1 + TARGET_WEIGHT * (hit_sums[..., length:] - hit_sums[..., :-length])
+        # Spread each placement's weight over the cells it covers.
+        for offset in range(length):
+            density[..., offset:offset + starts] += weights
+    density = density[..., 0, :, :] + density[..., 1, :, :].swapaxes(-1, -2)
+    density[blocked | hits] = 0
+    return density
+
+
+class TargetingAI:
+    """Chooses shots against one opponent board of `size` with ships of the given lengths.
+
+    Coordinates follow Board: x indexes rows of Board.grid and y indexes columns.
+    """
+
+    def __init__(self, size=10, lengths=None, rng=None):
+        self.size = size
+        self.remaining = sorted(lengths or [ship.length for ship in Board(size).ships], reverse=True)
+        self.rng = rng or random.Random()
+        self.misses = np.zeros((size, size), dtype=bool)
+        self.hits = np.zeros((size, size), dtype=bool)  # hits not yet attributed to a sunk ship
+        self.sunk = np.zeros((size, size), dtype=bool)
+
+    @property
+    def mode(self):
+        return 'target' if self.hits.any() else 'hunt'
+
+    def heatmap(self):
+        """Weighted count of the remaining placements covering each cell, 0 for cells already shot."""
+        remaining = {length: self.remaining.count(length) for length in set(self.remaining)}
+        return placement_heatmap(self.misses | self.sunk, self.hits, remaining)
+
+    def next_shot(self):
+        """Returns (x, y) of the best unshot cell, breaking ties at random."""
+        density = self.heatmap()
+        best = np.flatnonzero(density == density.max())
+        if density.flat[best[0]] == 0:
+            # Nothing fits any more (inconsistent results); fall back to any unshot cell.
+            best = np.flatnonzero(~(self.misses | self.hits | self.sunk))
+            if not len(best):
+                raise ValueError("Every cell has been shot")
+        x, y = divmod(int(best[self.rng.randrange(len(best))]), self.size)
+        return x, y
+
+    def record(self, x, y, hit, sunk_length=None):
+        """Updates the state with the result of a shot; `sunk_length` is the length of a ship it sank."""
+        if not hit:
+            self.misses[x, y] = True
+            return
+        self.hits[x, y] = True
+        if sunk_length:
+            self._resolve_sunk(x, y, sunk_length)
+
+    def _resolve_sunk(self, x, y, length):
+        """Moves the cells of the ship just sunk from `hits` to `sunk`.
+
+        The ship ends at (x, y) and lies along a line of `length` unresolved hits; when several
+        lines fit, the first one found is taken.
+        """
+        if length in self.remaining:
+            self.remaining.remove(length)
+        for dx, dy in ((0, 1), (1, 0)):
+            for start in range(length):
+                cells = [(x + (i - start) * dx, y + (i - start) * dy) for i in range(length)]
+                if all(0 <= cx < self.size and 0 <= cy < self.size and self.hits[cx, cy] for cx, cy in cells):
+                    for cx, cy in cells:
+                        self.hits[cx, cy] = False
+                        self.sunk[cx, cy] = True
+                    return
+        self.hits[x, y] = False
+        self.sunk[x, y] = True
+
+    @classmethod
+    def from_view(cls, view, lengths=None, rng=None):
+        """Builds the state from a Board.get_opponent_view() string: X is a hit, O a miss.
+
+        The view does not say which ships are sunk, so every hit is treated as unresolved.
+        """
+        rows = []
+        for line in view.splitlines():
+            cells = line.split()
+            if len(cells) > 1 and cells[0].isdigit() and all(cell in ('~', 'X', 'O', 'S') for cell in cells[1:]):
+                rows.append((int(cells[0]), cells[1:]))
+        ai = cls(len(rows), lengths, rng)
+        for x, cells in rows:
+            for y, cell in enumerate(cells):
+                ai.hits[x, y] = cell == 'X'
+                ai.misses[x, y] = cell == 'O'
+        return ai
@@ -1,17 +1,83 @@
 import json
 import random
+from functools import lru_cache
 
+from src.game.placement import fleet_generator
 from src.game.ship import Carrier, Battleship, Cruiser, Submarine, Destroyer
 from src.protocol.server_schemas import ShipType, BoardType
 
 
+@lru_cache(maxsize=None)
+def _footer(size):
+    """The blank line and column header that end every rendered board."""
+    return "\n\n     " + "  ".join(f"{i}" for i in range(size)) + "\n"
+
+
 class Board:
+    """A player's board stored as bitmasks.
+
+    Cell (x, y) is bit x * size + y of the ship, hit and miss masks. ship_at maps each cell to the
+    index of the ship covering it (-1 for water) and `remaining` counts ship cells not yet hit, so
+    resolving a shot, detecting a sunk ship and detecting a lost board are all constant time. The
+    list-of-lists `grid` is built from the masks on demand for serialization.
+
+    Rendered rows are cached for the owner's and the opponent's view and only the rows a change
+    touches are rebuilt, so repeated views of an unchanged board are a cache lookup.
+    """
+
     def __init__(self, size=10):
         self.size = size
-        self.grid = [['~'] * size for _ in range(size)]
+        self.ship_mask = 0
+        self.hit_mask = 0
+        self.miss_mask = 0
+        self.ship_at = [-1] * (size * size)
+        self.remaining = 0
         self.ships = [
             Carrier(), Battleship(), Cruiser(), Submarine(), Destroyer()
         ]
+        self._owner_rows = [None] * size
+        self._opponent_rows = [None] * size
+        self._owner_view = self._opponent_view = None
+
+    @property
+    def grid(self):
+        size = self.size
+        ships, hits, misses = self.ship_mask, self.hit_mask, self.miss_mask
+        grid = []
+        for x in range(size):
+            row = []
+            for bit in range(x * size, (x + 1) * size):
+                if hits >> bit & 1:
+                    row.append('X')
+                elif misses >> bit & 1:
+                    row.append('O')
+                elif ships >> bit & 1:
+                    row.append('S')
+                else:
+                    row.append('~')
+            grid.append(row)
+        return grid
+
+    @grid.setter
+    def grid(self, grid):
+        """Loads cell states from a list-of-lists grid; ship cells are added to the ship mask."""
+        size = self.size
+        self.ship_mask = self.hit_mask = self.miss_mask = 0
+        for x, row in enumerate(grid[:size]):
+            for y, cell in enumerate(row[:size]):
+                bit = 1 << (x * size + y)
+                if cell == 'S':
+                    self.ship_mask |= bit
+                elif cell == 'X':
+                    self.ship_mask |= bit
+                    self.hit_mask |= bit
+                elif cell == 'O':
+                    self.miss_mask |= bit
+        self.remaining = (self.ship_mask & ~self.hit_mask).bit_count()
+        self._invalidate(range(size))
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.size and 0 <= y < self.size
 
     def place_ships(self):
         print("\nPlace your ships on the board.")
@@ -73,53 +139,42 @@ class Board:
         # Mark hits to sink all but submarines and destroyers
         for ship in self.ships:
             if ship.name not in ("Submarine", "Destroyer"):
-                for coord in ship.coordinates:
-                    row, col = coord
-                    self.grid[row][col] = 'X'
-                ship.hits = ship.length  # Mark ship as sunk
+                for row, col in ship.coordinates:
+                    self.mark_hit(row, col)
 
         # Mark 2/3 hits on the submarine
         for ship in self.ships:
             if ship.name == "Submarine":
-                submarine_hits = 2
-                for coord in ship.coordinates:
-                    if submarine_hits == 0:
-                        break
-                    row, col = coord
-                    self.grid[row][col] = 'X'
-                    submarine_hits -= 1
-                ship.hits = 2  # Update hits manually
+                for row, col in ship.coordinates[:2]:
+                    self.mark_hit(row, col)
                 break
 
         # Randomly mark 50% of open spaces as misses
+        taken = self.ship_mask | self.hit_mask | self.miss_mask
         open_positions = [(row, col) for row in range(self.size)
-                          for col in range(self.size) if self.grid[row][col] == '~']
+                          for col in range(self.size) if not taken >> (row * self.size + col) & 1]
         miss_count = len(open_positions) // 2
         random.shuffle(open_positions)
 
         for _ in range(miss_count):
             row, col = open_positions.pop()
-            self.grid[row][col] = 'O'
+            self.mark_hit(row, col)
+
+    def randomize_ships(self, rng=None):
+        """Place all ships randomly on the board, using `rng` or the random module's generator."""
+        layout = fleet_generator(self.size, tuple(ship.length for ship in self.ships)).sample(rng or random)
+        if layout is None:
+            print("Failed to place ships: the fleet does not fit on the board.")
+            return False
+        self.place_fleet(layout)
+        return True
 
-    def randomize_ships(self):
-        """Place all ships randomly on the board."""
-        max_attempts = 100
+    def place_fleet(self, layout):
+        """Places every ship from a placement.FleetGenerator layout, replacing any earlier placement."""
         for ship in self.ships:
-            placed = False
-            attempts = 0
-            while not placed and attempts < max_attempts:
-                row = random.randint(0, self.size - 1)
-                col = random.randint(0, self.size - 1)
-                direction = random.choice(['H', 'V'])
-                try:
-                    self.place_ship(row, col, ship, direction)
-                    placed = True
-                except ValueError:
-                    attempts += 1
-            if not placed:
-                print(f"Failed to place {ship.name} after {max_attempts} attempts.")
-                return False
-        return True
+            self.remove_ship(ship)
+        for ship, placement in zip(self.ships, layout):
+            self._add_ship(ship, list(placement.coordinates), placement.mask)
 
     def get_ship_coordinates(self, row, col, length, direction):
         """Helper function to get the coordinates of a ship."""
@@ -130,78 +185,122 @@ class Board:
         return []
 
     def can_place_ship(self, row, col, length, direction):
-        if direction == 'H':
-            if col + length > self.size:
-                return False
-            return all(self.grid[row][col + i] == '~' for i in range(length))
-        elif direction == 'V':
-            if row + length > self.size:
-                return False
-            return all(self.grid[row + i][col] == '~' for i in range(length))
+        mask = self.placement_mask(self.get_ship_coordinates(row, col, length, direction))
+        return mask is not None and not mask & self.ship_mask
+
+    def placement_mask(self, coordinates):
+        """Bitmask of the given cells, or None if there are none or any is off the board."""
+        if not coordinates:
+            return None
+        mask = 0
+        for r, c in coordinates:
+            if not (0 <= r < self.size and 0 <= c < self.size):
+                return None
+            mask |= 1 << (r * self.size + c)
+        return mask
 
     def place_ship(self, row, col, ship, direction):
         """Places a single ship on the grid."""
         coordinates = self.get_ship_coordinates(row, col, ship.length, direction)
-
-        if not coordinates or any(
-                not (0 <= r < self.size and 0 <= c < self.size) or self.grid[r][c] != '~'
-                for r, c in coordinates
-        ):
+        mask = self.placement_mask(coordinates)
+        # A ship being moved may overlap its own current position; the board is unchanged on failure.
+        current = self.placement_mask(ship.coordinates) or 0
+        if mask is None or mask & self.ship_mask & ~current:
             raise ValueError("Invalid placement: Coordinates are out of bounds or overlap with another ship.")
+        self.remove_ship(ship)
+        self._add_ship(ship, coordinates, mask)
 
+    def _add_ship(self, ship, coordinates, mask):
+        index = self.ships.index(ship)
         for r, c in coordinates:
-            self.grid[r][c] = 'S'
-
+            self.ship_at[r * self.size + c] = index
+        self.remaining += (mask & ~self.ship_mask & ~self.hit_mask).bit_count()
+        self.ship_mask |= mask
         ship.coordinates = coordinates
+        self._invalidate({r for r, c in coordinates}, opponent=False)
+
+    def remove_ship(self, ship):
+        """Takes a placed ship off the board so that it can be placed again."""
+        mask = self.placement_mask(ship.coordinates)
+        if mask is None:
+            return
+        for r, c in ship.coordinates:
+            self.ship_at[r * self.size + c] = -1
+        self.remaining -= (mask & self.ship_mask & ~self.hit_mask).bit_count()
+        self.ship_mask &= ~mask
+        self._invalidate({r for r, c in ship.coordinates}, opponent=False)
+        ship.coordinates = []
 
     def mark_hit(self, x, y):
-        # Check if the cell contains a ship
-        if self.grid[x][y] == 'S':
-            self.grid[x][y] = 'X'
-            # Find which ship was hit
-            for ship in self.ships:
-                if (x, y) in ship.coordinates:
-                    ship.hit()
-                    return True, ship.is_sunk(), ship.name
-        else:
-            self.grid[x][y] = 'O'
+        """Resolves a shot at (x, y); returns (hit, sunk, ship name)."""
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            raise ValueError(f"({x}, {y}) is off the board")
+        cell = x * self.size + y
+        bit = 1 << cell
+        if not self.ship_mask & bit:
+            if not self.miss_mask & bit:
+                self.miss_mask |= bit
+                self._invalidate((x,))
             return False, False, ""
-        return False, False, ""
+        if self.hit_mask & bit:
+            return True, False, ""  # Already hit; nothing changes.
+        self.hit_mask |= bit
+        self.remaining -= 1
+        self._invalidate((x,))
+        index = self.ship_at[cell]
+        if index < 0:
+            return True, False, ""
+        ship = self.ships[index]
+        ship.hit()
+        return True, ship.is_sunk(), ship.name
+
+    def all_sunk(self):
+        return self.remaining == 0
 
     def display(self):
-        for idx, row in enumerate(reversed(self.grid)):
-            print(f"{self.size - idx - 1:2}   " + "  ".join(row))
-
-        print()
-        header = "     " + "  ".join(f"{i}" for i in range(self.size))
-        print(header + "\n")
+        print(self.to_string())
 
     def to_string(self):
-        rows = []
-        # Top x-coordinates with extra space
-
-        # Rows with left y-coordinates and grid content
-        for idx, row in enumerate(reversed(self.grid)):
-            rows.append(f"{self.size - idx - 1:2}   " + "  ".join(row))
-
-        rows.append("")
-        rows.append("     " + "  ".join(f"{i}" for i in range(self.size)))
-        rows.append("")
-
-        return "\n".join(rows)
+        if self._owner_view is None:
+            self._owner_view = self._render(self._owner_rows, opponent=False)
+        return self._owner_view
 
     def get_opponent_view(self):
-        rows = []
-        # Rows with left y-coordinates and grid content
-        for idx, row in enumerate(reversed(self.grid)):
-            row_view = "  ".join([cell if cell != 'S' else '~' for cell in row])
-            rows.append(f"{self.size - idx - 1:2}   " + row_view)
-
-        rows.append("")
-        rows.append("     " + "  ".join(f"{i}" for i in range(self.size)))
-        rows.append("")
-
-        return "\n".join(rows)
+        """The board as the opponent sees it: ships that have not been hit are shown as water."""
+        if self._opponent_view is None:
+            self._opponent_view = self._render(self._opponent_rows, opponent=True)
+        return self._opponent_view
+
+    def _invalidate(self, rows, opponent=True):
+        """Marks rendered rows stale; ship placement leaves the opponent's view unchanged."""
+        for x in rows:
+            self._owner_rows[x] = None
+            if opponent:
+                self._opponent_rows[x] = None
+        self._owner_view = None
+        if opponent:
+            self._opponent_view = None
+
+    def _render(self, rows, opponent):
+        """Joins the cached rows, top row first, rebuilding the stale ones."""
+        size = self.size
+        ship_cell = '~' if opponent else 'S'
+        for x in range(size):
+            if rows[x] is None:
+                shift = x * size
+                ships, hits, misses = self.ship_mask >> shift, self.hit_mask >> shift, self.miss_mask >> shift
+                cells = []
+                for y in range(size):
+                    if hits >> y & 1:
+                        cells.append('X')
+                    elif misses >> y & 1:
+                        cells.append('O')
+                    elif ships >> y & 1:
+                        cells.append(ship_cell)
+                    else:
+                        cells.append('~')
+                rows[x] = f"{x:2}   " + "  ".join(cells)
+        return "\n".join(reversed(rows)) + _footer(size)
 
     def serialize(self):
         return BoardType(
@@ -237,8 +336,11 @@ class Board:
                 ship_class = ship_map[ship_data.name]
                 ship = ship_class()
                 ship.hits = ship_data.hits
-                ship.coordinates = ship_data.coordinates
                 board.ships.append(ship)
+                # Cells off the board can never be hit, so they are left out.
+                coordinates = [(r, c) for r, c in ship_data.coordinates if board.in_bounds(r, c)]
+                board._add_ship(ship, coordinates, board.placement_mask(coordinates) or 0)
+                ship.coordinates = ship_data.coordinates
 
         return board
 
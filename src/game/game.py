@@ -1,9 +1,11 @@
-from random import Random
+from itertools import count
+
+_game_ids = count(1)
 
 
 class Game:
     def __init__(self, player1, player2):
-        self.game_id = Random().randint(0, 1000000)
+        self.game_id = next(_game_ids)
         self.players = {
             player1.name: player1,
             player2.name: player2
@@ -37,6 +39,5 @@ class Game:
                 break
 
     def check_winner(self):
-        """Checks if there is a winner."""
-        for player_name, player_board in self.boards.items():
-            return not any('S' in row for row in player_board.grid)
+        """Checks if either player has lost every ship."""
+        return any(player_board.all_sunk() for player_board in self.boards.values())
@@ -0,0 +1,140 @@
+"""Random fleet layouts drawn by placement index.
+
+The positions of a ship of each length are numbered, horizontal ones first, and a position's
+bitmask is its row or column pattern shifted to its start cell. Boards up to TABLE_MAX_SIZE keep
+every Placement in a table for the fastest draws; larger ones compute positions on demand, since
+a table of full-board masks grows with the fourth power of the size.
+
+A fleet is drawn by picking a position for each ship independently and starting over as soon as
+two ships overlap, which makes every non-overlapping fleet equally likely.
+"""
+import random
+from collections import namedtuple
+from functools import lru_cache
+
+Placement = namedtuple('Placement', 'mask row col direction coordinates')
+
+MAX_ATTEMPTS = 100_000
+TABLE_MAX_SIZE = 16
+
+
+class ShipPositions:
+    """Every position of a ship of `length` on a `size` x `size` board, in Board coordinates.
+
+    Behaves as a read-only sequence of Placements; `table` holds them all for small boards and is
+    None when they are built on access.
+    """
+
+    def __init__(self, size, length):
+        self.size = size
+        self.length = length
+        self.span = max(0, size - length + 1)  # starting columns of a row, or starting rows of a column
+        self.horizontal = size * self.span
+        self.row_bits = (1 << length) - 1
+        self.column_bits = sum(1 << (i * size) for i in range(length)) if self.span else 0
+        self.table = tuple(map(self._build, range(len(self)))) if size <= TABLE_MAX_SIZE else None
+
+    def __len__(self):
+        return 2 * self.horizontal
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if self.table is not None:
+            return self.table[index]
+        return self._build(index)
+
+    def _build(self, index):
+        row, col, direction = self.locate(index)
+        if direction == 'H':
+            coordinates = tuple((row, col + i) for i in range(self.length))
+        else:
+            coordinates = tuple((row + i, col) for i in range(self.length))
+        return Placement(self.mask(row, col, direction), row, col, direction, coordinates)
+
+    def locate(self, index):
+        """(row, col, direction) of the position numbered `index`."""
+        if index < self.horizontal:
+            row, col = divmod(index, self.span)
+            return row, col, 'H'
+        row, col = divmod(index - self.horizontal, self.size)
+        return row, col, 'V'
+
+    def mask(self, row, col, direction):
+        return (self.row_bits if direction == 'H' else self.column_bits) << (row * self.size + col)
+
+
+@lru_cache(maxsize=64)
+def ship_placements(size, length):
+    """The ShipPositions for a ship of `length` on a `size` x `size` board."""
+    return ShipPositions(size, length)
+
+
+class FleetGenerator:
+    """Samples fleet layouts uniformly; a layout is one Placement per ship, in `lengths` order."""
+
+    def __init__(self, size=10, lengths=(5, 4, 3, 3, 2), seed=None, rng=None):
+        self.size = size
+        self.lengths = tuple(lengths)
+        self.rng = rng or random.Random(seed)
+        # Longest ships first: they are the likeliest to collide, so failed draws stop earliest.
+        self._order = sorted(range(len(self.lengths)), key=lambda i: -self.lengths[i])
+        self._positions = [ship_placements(size, self.lengths[i]) for i in self._order]
+        self._shapes = [(len(p), p.horizontal, p.span, p.row_bits, p.column_bits,
+                         p.table and tuple(placement.mask for placement in p.table)) for p in self._positions]
+
+    def sample(self, rng=None):
+        """Returns a layout, or None if no fleet fits after MAX_ATTEMPTS draws."""
+        uniform = (rng or self.rng).random
+        positions = self._positions
+        if not all(positions):
+            return None
+        size = self.size
+        shapes = self._shapes
+        for _ in range(MAX_ATTEMPTS):
+            taken = 0
+            picked = []
+            for count, horizontal, span, row_bits, column_bits, masks in shapes:
+                index = int(uniform() * count)
+                if masks:
+                    mask = masks[index]
+                elif index < horizontal:
+                    row, col = divmod(index, span)
+                    mask = row_bits << (row * size + col)
+                else:
+                    row, col = divmod(index - horizontal, size)
+                    mask = column_bits << (row * size + col)
+                if taken & mask:
+                    break
+                taken |= mask
+                picked.append(index)
+            else:
+                layout = [None] * len(picked)
+                for ship, choices, index in zip(self._order, positions, picked):
+                    layout[ship] = choices[index]
+                return layout
+        return None
+
+    def batch(self, count):
+        """Yields `count` layouts."""
+        for _ in range(count):
+            layout = self.sample()
+            if layout is None:
+                raise ValueError(f"Ships of lengths {self.lengths} do not fit on a {self.size}x{self.size} board")
+            yield layout
+
+    def masks(self, count):
+        """Yields the combined occupancy mask of `count` layouts, for simulations that only need cells."""
+        for layout in self.batch(count):
+            mask = 0
+            for placement in layout:
+                mask |= placement.mask
+            yield mask
+
+
+@lru_cache(maxsize=16)
+def fleet_generator(size, lengths):
+    """Shared generator for a board shape; pass an rng to sample() to control the randomness."""
+    return FleetGenerator(size, lengths)
@@ -0,0 +1,241 @@
+"""Batched game simulation for evaluating targeting strategies and rules.
+
+B two-player games are held as stacked NumPy arrays instead of Game/Board objects:
+
+    ships     (B, 2, cells) int8   ship index at each cell of each player's board, -1 for water
+    shots     (B, 2, cells) bool   cells of each player's board that have been fired at
+    ship_hits (B, 2, ships) int8   hits taken by each ship
+
+Every step fires one shot in every unfinished game, for whichever player's turn it is, with a
+handful of fancy-indexing operations; sinks and wins fall out of comparing hit counts with ship
+lengths. Turns alternate after every shot, as in GameSession.
+
+    sim = BatchSimulation(100_000, (DensityStrategy(), RandomStrategy()), seed=1)
+    print(sim.run().summary())
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from src.game.ai import placement_heatmap
+from src.game.placement import MAX_ATTEMPTS, ship_placements
+
+FLEET = (5, 4, 3, 3, 2)
+
+
+@lru_cache(maxsize=64)
+def _placement_cells(size, length):
+    """(positions, length) array of the flat cells covered by each ShipPositions position, in its order."""
+    span = ship_placements(size, length).span
+    starts = np.arange(size * span)
+    horizontal = (starts // span * size + starts % span)[:, None] + np.arange(length)
+    vertical = starts[:, None] + np.arange(length) * size
+    return np.concatenate((horizontal, vertical)).astype(np.intp)
+
+
+def sample_fleets(count, size=10, lengths=FLEET, rng=None):
+    """Returns `count` uniformly random layouts as a (count, size * size) int8 array of ship indices.
+
+    The same rejection sampling as FleetGenerator, run for every pending layout at once: each
+    round places every ship of every pending layout and keeps the layouts without overlaps.
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    tables = [_placement_cells(size, length) for length in lengths]
+    if not all(len(table) for table in tables):
+        raise ValueError(f"Ships of lengths {tuple(lengths)} do not fit on a {size}x{size} board")
+    order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+    fleets = np.full((count, size * size), -1, dtype=np.int8)
+    pending = np.arange(count)
+    for _ in range(MAX_ATTEMPTS):
+        if not len(pending):
+            return fleets
+        ids = np.full((len(pending), size * size), -1, dtype=np.int8)
+        ok = np.ones(len(pending), dtype=bool)
+        rows = np.arange(len(pending))[:, None]
+        for i in order:
+            cells = tables[i][rng.integers(len(tables[i]), size=len(pending))]
+            ok &= (ids[rows, cells] < 0).all(axis=1)
+            ids[rows, cells] = i
+        fleets[pending[ok]] = ids[ok]
+        pending = pending[~ok]
+    raise ValueError(f"Ships of lengths {tuple(lengths)} do not fit on a {size}x{size} board")
+
+
+class RandomStrategy:
+    """Fires at every cell in a random order, shuffled once per game."""
+
+    def __init__(self):
+        self._sim = self._order = None
+
+    def choose(self, sim, games, player):
+        if self._sim is not sim:
+            self._sim = sim
+            cells = np.arange(sim.cells, dtype=np.min_scalar_type(sim.cells))
+            self._order = np.tile(cells, sim.shots.shape[:2] + (1,))
+            sim.rng.permuted(self._order, axis=-1, out=self._order)
+        # The order never repeats a cell, so the next shot is at the number of shots already fired.
+        return self._order[games, player, sim.shots_fired[games, player]]
+
+
+class HuntTargetStrategy:
+    """Fires next to unresolved hits when there are any, otherwise at random on a checkerboard.
+
+    Every ship is at least two cells long, so one colour of the checkerboard finds them all.
+    """
+
+    def choose(self, sim, games, player):
+        target = 1 - player
+        shots = sim.shots[games, target]
+        ships = sim.ships[games, target]
+        sunk = np.take_along_axis(sim.sunk[games, target], np.maximum(ships, 0).astype(np.intp), axis=1)
+        hits = (shots & (ships >= 0) & ~sunk).reshape(len(games), sim.size, sim.size)
+        neighbours = np.zeros_like(hits)
+        neighbours[:, 1:] |= hits[:, :-1]
+        neighbours[:, :-1] |= hits[:, 1:]
+        neighbours[:, :, 1:] |= hits[:, :, :-1]
+        neighbours[:, :, :-1] |= hits[:, :, 1:]
+        score = sim.rng.random(shots.shape) + 2 * neighbours.reshape(len(games), -1) + sim.parity
+        score[shots] = -1
+        return score.argmax(axis=1)
+
+
+class DensityStrategy:
+    """TargetingAI for a whole batch: fires at the densest cell of placement_heatmap.
+
+    Sunk ships are resolved from the true layout rather than inferred from the line of hits, and
+    ties are broken at random.
+    """
+
+    def choose(self, sim, games, player):
+        target = 1 - player
+        shots = sim.shots[games, target]
+        ships = sim.ships[games, target]
+        sunk = sim.sunk[games, target]
+        is_ship = ships >= 0
+        sunk_cells = is_ship & np.take_along_axis(sunk, np.maximum(ships, 0).astype(np.intp), axis=1)
+        blocked = shots & ~(is_ship & ~sunk_cells)
+        hits = shots & is_ship & ~sunk_cells
+        remaining = {int(length): (~sunk[:, sim.lengths == length]).sum(axis=1) for length in np.unique(sim.lengths)}
+        shape = (len(games), sim.size, sim.size)
+        density = placement_heatmap(blocked.reshape(shape), hits.reshape(shape), remaining).reshape(len(games), -1)
+        # Densities are whole numbers, so noise below 1 only reorders ties.
+        density += sim.rng.random(density.shape) * 0.5
+        density[shots] = -1
+        return density.argmax(axis=1)
+
+
+STRATEGIES = {
+    'random': RandomStrategy,
+    'hunt': HuntTargetStrategy,
+    'density': DensityStrategy,
+}
+
+
+class SimulationResult:
+    """Per-game outcomes, indexed by game and then by the player who fired.
+
+    winner      (B,) player who sank the whole opposing fleet, -1 if the game did not finish
+    shots       (B, 2) shots each player fired
+    sink_order  (B, 2, ships) opposing ship indices in the order the player sank them, -1 padded
+    sink_shot   (B, 2, ships) the player's shot number that sank each opposing ship, 0 if afloat
+    """
+
+    def __init__(self, winner, shots, sink_order, sink_shot, first):
+        self.winner = winner
+        self.shots = shots
+        self.sink_order = sink_order
+        self.sink_shot = sink_shot
+        self.first = first
+
+    def __len__(self):
+        return len(self.winner)
+
+    def summary(self):
+        finished = self.winner >= 0
+        winning_shots = self.shots[finished, self.winner[finished]]
+        return {
+            'games': len(self),
+            'unfinished': int((~finished).sum()),
+            'wins': [int((self.winner == player).sum()) for player in (0, 1)],
+            'first_player_wins': int((self.winner[finished] == self.first[finished]).sum()),
+            'mean_shots_to_win': float(winning_shots.mean()) if len(winning_shots) else None,
+            'shots_to_win_percentiles': {p: float(np.percentile(winning_shots, p)) for p in (1, 50, 99)}
+            if len(winning_shots) else {},
+        }
+
+
+class BatchSimulation:
+    """`games` independent games between two strategies with random fleets.
+
+    A strategy has a choose(sim, games, player) method that returns, for each game index in
+    `games`, the flat cell (x * size + y) the player fires at next. `first` is 'alternate' to
+    let the players take turns opening, or the index of the player who always opens.
+    """
+
+    def __init__(self, games, strategies, size=10, lengths=FLEET, first='alternate', seed=None, rng=None):
+        self.rng = rng if rng is not None else np.random.default_rng(seed)
+        self.strategies = tuple(strategies)
+        self.size = size
+        self.cells = size * size
+        self.parity = (np.add.outer(np.arange(size), np.arange(size)) % 2 == 0).ravel()
+        self.lengths = np.array(lengths, dtype=np.int8)
+        self.ships = sample_fleets(games * 2, size, lengths, self.rng).reshape(games, 2, self.cells)
+        self.shots = np.zeros((games, 2, self.cells), dtype=bool)
+        self.ship_hits = np.zeros((games, 2, len(lengths)), dtype=np.int8)
+        self.sunk = np.zeros((games, 2, len(lengths)), dtype=bool)
+        self.afloat = np.full((games, 2), int(self.lengths.sum()), dtype=np.int32)
+        self.first = np.arange(games, dtype=np.int8) % 2 if first == 'alternate' else np.full(games, first, np.int8)
+        self.turn = self.first.copy()
+        self.winner = np.full(games, -1, dtype=np.int8)
+        self.shots_fired = np.zeros((games, 2), dtype=np.int32)
+        self.sink_order = np.full((games, 2, len(lengths)), -1, dtype=np.int8)
+        self.sink_shot = np.zeros((games, 2, len(lengths)), dtype=np.int32)
+        self.steps = 0
+
+    def running(self):
+        return np.flatnonzero(self.winner < 0)
+
+    def step(self):
+        """Fires one shot in every unfinished game; returns the number still running."""
+        running = self.running()
+        turns = self.turn[running]
+        for player, strategy in enumerate(self.strategies):
+            games = running[turns == player]
+            if len(games):
+                self.fire(games, player, strategy.choose(self, games, player))
+        self.steps += 1
+        return int((self.winner < 0).sum())
+
+    def fire(self, games, player, cells):
+        """Applies one shot by `player` per game; games must be distinct and it must be their turn."""
+        target = 1 - player
+        fresh = ~self.shots[games, target, cells]
+        self.shots[games, target, cells] = True
+        self.shots_fired[games, player] += 1
+        ships = self.ships[games, target, cells]
+        hit = fresh & (ships >= 0)
+        hit_games, hit_ships = games[hit], ships[hit].astype(np.intp)
+        self.ship_hits[hit_games, target, hit_ships] += 1
+        self.afloat[hit_games, target] -= 1
+
+        sank = self.ship_hits[hit_games, target, hit_ships] == self.lengths[hit_ships]
+        sunk_games, sunk_ships = hit_games[sank], hit_ships[sank]
+        self.sunk[sunk_games, target, sunk_ships] = True
+        position = self.sunk[sunk_games, target].sum(axis=1) - 1
+        self.sink_order[sunk_games, player, position] = sunk_ships
+        self.sink_shot[sunk_games, player, sunk_ships] = self.shots_fired[sunk_games, player]
+
+        self.winner[hit_games[self.afloat[hit_games, target] == 0]] = player
+        self.turn[games] = target
+
+    def run(self, max_steps=None):
+        """Steps until every game is won (or `max_steps`) and returns the results."""
+        # Each player needs at most one shot per cell, so every game ends within 2 * cells steps.
+        limit = max_steps or 2 * self.cells
+        while self.steps < limit and self.step():
+            pass
+        return self.results()
+
+    def results(self):
+        return SimulationResult(self.winner.copy(), self.shots_fired.copy(), self.sink_order.copy(),
+                                self.sink_shot.copy(), self.first.copy())
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -6,6 +8,11 @@ class ServerMessage(BaseModel):
     message: str = ''
 
 
+class ErrorResponse(ServerMessage):
+    type: str = 'error'
+    request: str = ''  # type of the request that failed
+
+
 class QuitNotification(ServerMessage):
     type: str = 'quit'
     user: str
@@ -20,6 +27,7 @@ class GameStartedNotification(ServerMessage):
     type: str = 'game_started'
     player1: str
     player2: str
+    game_id: int = 0
 
 
 class ViewResponse(BaseModel):
@@ -41,11 +49,13 @@ class NameChangeResponse(BaseModel):
     type: str = 'set_name'
     user: str
     success: bool
+    encoding: str = 'json'
 
 
 class WelcomeMessage(BaseModel):
     type: str = 'welcome'
     message: str = "Welcome to Battleship!"
+    encodings: list[str] = ['json', 'binary']
 
 
 class TurnSwitchNotification(BaseModel):
@@ -55,4 +65,17 @@ class TurnSwitchNotification(BaseModel):
 
 class GameOverNotification(BaseModel):
     type: str = 'game_over'
-    winner: str
+    winner: Optional[str] = None  # None when the game was abandoned
+
+
+class SpectateResponse(BaseModel):
+    type: str = 'spectate'
+    success: bool
+    game_id: int
+    player1: str = ''
+    player2: str = ''
+    message: str = ''
+
+
+class PingMessage(BaseModel):
+    type: str = 'ping'
@@ -0,0 +1,245 @@
+"""Wire encodings for protocol messages.
+
+JSON frames always start with '{'. Binary frames start with a tag byte of 0x80 or above: the
+high-frequency messages use fixed struct layouts, everything else is a msgpack map.
+
+The messages sent on every move have hand-written binary encoders looked up by model class, so
+the hot path never builds an intermediate dict with model_dump().
+"""
+import json
+import struct
+
+from pydantic import BaseModel
+
+from src.protocol.client_schemas import MoveResponse, ServerMessage, TurnSwitchNotification
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "json"
+BINARY = "binary"
+ENCODINGS = [JSON, BINARY]
+
+TAG_MSGPACK = 0x80
+TAG_MOVE_REQUEST = 0x81
+TAG_MOVE_RESPONSE = 0x82
+TAG_TURN_SWITCH = 0x83
+
+MOVE_REQUEST = struct.Struct(">Bii")
+MOVE_RESPONSE = struct.Struct(">Bii?")
+COORDINATES = range(-2 ** 31, 2 ** 31)  # the struct layouts store x and y as int32
+
+
+def encode_message(content, encoding=JSON):
+    """Serializes a pydantic model or message dict to a frame payload in the given encoding."""
+    if encoding == BINARY:
+        encoder = BINARY_ENCODERS.get(type(content))
+        return encoder(content) if encoder else encode_binary(content)
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode('utf-8')
+    return json.dumps(content).encode('utf-8')
+
+
+def decode_message(payload, user=None):
+    """Decodes a frame payload of either encoding into a message dict.
+
+    Binary move requests do not carry the sender, so `user` is filled in from the connection.
+    Raises ValueError for any payload that is not a well-formed message.
+    """
+    try:
+        if payload[0] < TAG_MSGPACK:
+            return json.loads(bytes(payload))
+        return decode_binary(payload, user)
+    except (IndexError, struct.error, RecursionError) as e:
+        raise ValueError(f"Malformed message: {e}") from e
+
+
+def encode_binary(content):
+    msg = content.model_dump() if isinstance(content, BaseModel) else content
+    _type = msg.get('type')
+    if _type == 'move':
+        _check_coordinates(msg['x'], msg['y'])
+        if 'hit' in msg:
+            return MOVE_RESPONSE.pack(TAG_MOVE_RESPONSE, msg['x'], msg['y'], msg['hit']) + msg['user'].encode('utf-8')
+        return MOVE_REQUEST.pack(TAG_MOVE_REQUEST, msg['x'], msg['y'])
+    if _type == 'turn_switch':
+        return bytes((TAG_TURN_SWITCH,)) + msg['user'].encode('utf-8')
+    return bytes((TAG_MSGPACK,)) + packb(msg)
+
+
+def _check_coordinates(x, y):
+    if x not in COORDINATES or y not in COORDINATES:
+        raise ValueError(f"Coordinates ({x}, {y}) do not fit in a binary move")
+
+
+def _encode_move_response(msg):
+    _check_coordinates(msg.x, msg.y)
+    return MOVE_RESPONSE.pack(TAG_MOVE_RESPONSE, msg.x, msg.y, msg.hit) + msg.user.encode('utf-8')
+
+
+def _encode_turn_switch(msg):
+    return bytes((TAG_TURN_SWITCH,)) + msg.user.encode('utf-8')
+
+
+def _encode_info(msg):
+    return bytes((TAG_MSGPACK,)) + packb({'type': msg.type, 'message': msg.message})
+
+
+# Keyed by exact class: subclasses such as QuitNotification carry extra fields.
+BINARY_ENCODERS = {
+    MoveResponse: _encode_move_response,
+    TurnSwitchNotification: _encode_turn_switch,
+    ServerMessage: _encode_info,
+}
+
+
+def decode_binary(payload, user=None):
+    tag = payload[0]
+    if tag == TAG_MOVE_REQUEST:
+        _, x, y = MOVE_REQUEST.unpack_from(payload)
+        return {'type': 'move', 'user': user, 'x': x, 'y': y}
+    if tag == TAG_MOVE_RESPONSE:
+        _, x, y, hit = MOVE_RESPONSE.unpack_from(payload)
+        return {'type': 'move', 'user': str(payload[MOVE_RESPONSE.size:], 'utf-8'), 'x': x, 'y': y, 'hit': hit}
+    if tag == TAG_TURN_SWITCH:
+        return {'type': 'turn_switch', 'user': str(payload[1:], 'utf-8')}
+    if tag == TAG_MSGPACK:
+        return unpackb(payload[1:])
+    raise ValueError(f"Unknown binary message tag {tag:#x}")
+
+
+def packb(obj):
+    if msgpack is not None:
+        return msgpack.packb(obj)
+    out = bytearray()
+    _pack(obj, out)
+    return bytes(out)
+
+
+def unpackb(data):
+    if msgpack is not None:
+        return msgpack.unpackb(data)
+    obj, offset = _unpack(memoryview(data), 0)
+    if offset != len(data):
+        raise ValueError("Trailing bytes after msgpack object")
+    return obj
+
+
+def _pack(obj, out):
+    """Minimal msgpack encoder used when the msgpack package is not installed."""
+    if obj is None:
+        out.append(0xc0)
+    elif obj is True:
+        out.append(0xc3)
+    elif obj is False:
+        out.append(0xc2)
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(obj)
+        elif -32 <= obj < 0:
+            out.append(obj & 0xff)
+        elif -2 ** 31 <= obj < 2 ** 31:
+            out += struct.pack(">Bi", 0xd2, obj)
+        else:
+            out += struct.pack(">Bq", 0xd3, obj)
+    elif isinstance(obj, float):
+        out += struct.pack(">Bd", 0xcb, obj)
+    elif isinstance(obj, str):
+        data = obj.encode('utf-8')
+        size = len(data)
+        if size < 32:
+            out.append(0xa0 | size)
+        elif size < 0x100:
+            out += struct.pack(">BB", 0xd9, size)
+        elif size < 0x10000:
+            out += struct.pack(">BH", 0xda, size)
+        else:
+            out += struct.pack(">BI", 0xdb, size)
+        out += data
+    elif isinstance(obj, (bytes, bytearray)):
+        out += struct.pack(">BI", 0xc6, len(obj))
+        out += obj
+    elif isinstance(obj, (list, tuple)):
+        _pack_header(out, len(obj), 0x90, 0xdc, 0xdd)
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        _pack_header(out, len(obj), 0x80, 0xde, 0xdf)
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        raise TypeError(f"Cannot msgpack-encode {type(obj).__name__}")
+
+
+def _pack_header(out, size, fix, code16, code32):
+    if size < 16:
+        out.append(fix | size)
+    elif size < 0x10000:
+        out += struct.pack(">BH", code16, size)
+    else:
+        out += struct.pack(">BI", code32, size)
+
+
+_FIXED = {
+    0xcc: struct.Struct(">B"), 0xcd: struct.Struct(">H"), 0xce: struct.Struct(">I"), 0xcf: struct.Struct(">Q"),
+    0xd0: struct.Struct(">b"), 0xd1: struct.Struct(">h"), 0xd2: struct.Struct(">i"), 0xd3: struct.Struct(">q"),
+    0xca: struct.Struct(">f"), 0xcb: struct.Struct(">d"),
+}
+_LENGTHS = {
+    0xd9: struct.Struct(">B"), 0xda: struct.Struct(">H"), 0xdb: struct.Struct(">I"),
+    0xc4: struct.Struct(">B"), 0xc5: struct.Struct(">H"), 0xc6: struct.Struct(">I"),
+    0xdc: struct.Struct(">H"), 0xdd: struct.Struct(">I"), 0xde: struct.Struct(">H"), 0xdf: struct.Struct(">I"),
+}
+
+
+def _unpack(data, offset):
+    code = data[offset]
+    offset += 1
+    if code < 0x80:
+        return code, offset
+    if code >= 0xe0:
+        return code - 0x100, offset
+    if code <= 0x8f:
+        return _unpack_map(data, offset, code & 0x0f)
+    if code <= 0x9f:
+        return _unpack_array(data, offset, code & 0x0f)
+    if code <= 0xbf:
+        size = code & 0x1f
+        return str(data[offset:offset + size], 'utf-8'), offset + size
+    if code == 0xc0:
+        return None, offset
+    if code in (0xc2, 0xc3):
+        return code == 0xc3, offset
+    if code in _FIXED:
+        fmt = _FIXED[code]
+        return fmt.unpack_from(data, offset)[0], offset + fmt.size
+    if code in _LENGTHS:
+        fmt = _LENGTHS[code]
+        size = fmt.unpack_from(data, offset)[0]
+        offset += fmt.size
+        if code in (0xdc, 0xdd):
+            return _unpack_array(data, offset, size)
+        if code in (0xde, 0xdf):
+            return _unpack_map(data, offset, size)
+        chunk = data[offset:offset + size]
+        return (str(chunk, 'utf-8') if code >= 0xd9 else bytes(chunk)), offset + size
+    raise ValueError(f"Unsupported msgpack type {code:#x}")
+
+
+def _unpack_array(data, offset, size):
+    items = []
+    for _ in range(size):
+        item, offset = _unpack(data, offset)
+        items.append(item)
+    return items, offset
+
+
+def _unpack_map(data, offset, size):
+    obj = {}
+    for _ in range(size):
+        key, offset = _unpack(data, offset)
+        obj[key], offset = _unpack(data, offset)
+    return obj, offset
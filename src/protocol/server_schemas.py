@@ -1,6 +1,9 @@
 from pydantic import BaseModel
 
 
+REQUEST_TYPES = frozenset({'set_name', 'spectate', 'pong', 'board', 'move', 'view', 'chat', 'quit'})
+
+
 class Request(BaseModel):
     type: str
     user: str
@@ -34,6 +37,19 @@ class MoveRequest(Request):
     y: int
 
 
+def parse_move(msg):
+    """Returns (user, x, y) from a move message dict.
+
+    Well-formed moves are read directly; anything else goes through full MoveRequest validation,
+    which coerces what it can and raises ValidationError otherwise.
+    """
+    user, x, y = msg.get('user'), msg.get('x'), msg.get('y')
+    if type(x) is not int or type(y) is not int or type(user) is not str:
+        move = MoveRequest(**msg)
+        user, x, y = move.user, move.x, move.y
+    return user, x, y
+
+
 class ViewRequest(Request):
     type: str = 'view'
     user: str
@@ -50,3 +66,13 @@ class QuitRequest(Request):
 class SetNameRequest(Request):
     type: str = 'set_name'
     user: str
+    encoding: str = 'json'
+
+
+class SpectateRequest(BaseModel):
+    type: str = 'spectate'
+    game_id: int
+
+
+class PongMessage(BaseModel):
+    type: str = 'pong'
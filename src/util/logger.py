@@ -1,23 +1,187 @@
+"""Logging that never blocks the event loop.
+
+Records are put on a bounded queue by a QueueHandler and written by a QueueListener thread, so
+stream and file I/O happen off the loop. When the writer falls behind, new records are dropped and
+counted rather than queued without limit.
+"""
+import json
 import logging
-from io import StringIO
+import os
+import queue
+import weakref
+from collections import defaultdict, deque
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+QUEUE_SIZE = 10000
+PAYLOAD_LOGGER = 'battleship.payload'
+
+_pipelines = weakref.WeakSet()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; anything passed as extra={'fields': {...}} is merged in."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last `capacity` formatted records in memory."""
+
+    def __init__(self, capacity=1000):
+        super().__init__()
+        self.records = deque(maxlen=capacity)
+
+    def emit(self, record):
+        try:
+            self.records.append(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def getvalue(self):
+        return "".join(f"{line}\n" for line in self.records)
+
+    def clear(self):
+        self.records.clear()
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # Block rather than fail when the queue is full at shutdown; the thread is draining it.
+        self.queue.put(self._sentinel)
+
+
+class BackgroundHandler(QueueHandler):
+    """Hands records to `handlers` on a background thread through a queue of at most `maxsize`."""
+
+    def __init__(self, handlers, maxsize=QUEUE_SIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.handlers = handlers
+        self.maxsize = maxsize
+        self.dropped = 0
+        self.listener = _Listener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        _pipelines.add(self)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+        super().close()
+
+    def _restart(self):
+        # Only the forking thread survives fork(), and the queue's lock may have been held by the
+        # listener when it happened; start over with a fresh queue and thread.
+        if self.listener is not None:
+            self.queue = queue.Queue(self.maxsize)
+            self.listener = _Listener(self.queue, *self.handlers, respect_handler_level=True)
+            self.listener.start()
+
+
+def _restart_pipelines():
+    for pipeline in list(_pipelines):
+        pipeline._restart()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_pipelines)
+
+
+class PayloadSampler:
+    """Decides which message payloads get logged: one in `every` per message type.
+
+    `every` of 0 disables payload logging; `overrides` sets a different rate for given types.
+    """
+
+    MAX_TYPES = 64
+
+    def __init__(self, every=0, overrides=None):
+        self.every = every
+        self.overrides = overrides or {}
+        self.seen = defaultdict(int)
+
+    def sample(self, message_type):
+        every = self.overrides.get(message_type, self.every)
+        if not every:
+            return False
+        seen = self.seen
+        if message_type not in seen and len(seen) >= self.MAX_TYPES:
+            message_type = None
+        count = seen[message_type]
+        seen[message_type] = count + 1
+        return count % every == 0
+
+
+PAYLOADS = PayloadSampler()
+
+
+def log_payload(direction, peer, message):
+    """Logs a message payload if it is picked by the PAYLOADS sampler."""
+    message_type = message.get('type') if isinstance(message, dict) else None
+    if PAYLOADS.sample(message_type):
+        logging.getLogger(PAYLOAD_LOGGER).info(
+            "%s %s message %s: %s", direction, message_type, peer, message,
+            extra={'fields': {'direction': direction, 'type': message_type, 'peer': peer, 'payload': message}})
+
+
+def configure_logging(level=logging.INFO, log_file=None, json_format=False, payload_every=0, payload_overrides=None,
+                      queue_size=QUEUE_SIZE):
+    """Routes the root logger through a BackgroundHandler writing to stderr and, optionally, a file.
+
+    Returns the BackgroundHandler so callers can report how many records were dropped.
+    """
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    background = BackgroundHandler(handlers, queue_size)
+    root.addHandler(background)
+    root.setLevel(level)
+
+    PAYLOADS.every = payload_every
+    PAYLOADS.overrides = payload_overrides or {}
+    return background
 
 
 class Logger:
-    def __init__(self, name='Logger', log_file=None):
+    def __init__(self, name='Logger', log_file=None, buffer_size=1000):
         self.logger = logging.getLogger(name)
         self.logger.setLevel(logging.DEBUG)
 
-        self.buffer = StringIO()
-        stream_handler = logging.StreamHandler(self.buffer)
-        stream_handler.setLevel(logging.DEBUG)
-        self.logger.addHandler(stream_handler)
+        self.buffer = RingBufferHandler(buffer_size)
+        self.buffer.setLevel(logging.DEBUG)
+        self.logger.addHandler(self.buffer)
 
         if log_file:
-            file_handler = logging.FileHandler(log_file)
+            file_handler = logging.FileHandler(log_file, delay=True)
             file_handler.setLevel(logging.DEBUG)
-            file_format = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-            file_handler.setFormatter(file_format)
-            self.logger.addHandler(file_handler)
+            file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+            self.logger.addHandler(BackgroundHandler([file_handler]))
 
         self.logger.propagate = False
 
@@ -25,8 +189,7 @@ class Logger:
         return self.buffer.getvalue()
 
     def clear(self):
-        self.buffer.truncate(0)
-        self.buffer.seek(0)
+        self.buffer.clear()
 
     def info(self, msg, *args, **kwargs):
         self.logger.info(msg, *args, **kwargs)
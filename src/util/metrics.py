@@ -0,0 +1,174 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Recording is an integer update on a dict or list; all formatting happens when the endpoint is
+scraped, so a server nobody is scraping pays next to nothing for its instrumentation.
+"""
+from collections import defaultdict
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _series(name, label, label_value, extra=''):
+    labels = f'{label}="{_escape(label_value)}"' if label else ''
+    if extra:
+        labels = f'{labels},{extra}' if labels else extra
+    return f'{name}{{{labels}}}' if labels else name
+
+
+class Counter:
+    def __init__(self, name, help, label=None):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values = defaultdict(int)
+
+    def inc(self, label_value='', amount=1):
+        self.values[label_value] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_value, value in sorted(self.values.items()):
+            lines.append(f"{_series(self.name, self.label, label_value)} {value}")
+        return lines
+
+
+class CallbackMetric:
+    """A counter or gauge whose value is computed by `function` at scrape time.
+
+    The function returns a number, or a dict of label value -> number when `label` is set.
+    """
+
+    def __init__(self, name, help, kind, function, label=None, detailed=False):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.function = function
+        self.label = label
+        self.detailed = detailed
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        value = self.function()
+        if self.label:
+            for label_value, item in sorted(value.items()):
+                lines.append(f"{_series(self.name, self.label, label_value)} {item}")
+        else:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+class HdrBuckets:
+    """Log-linear buckets over integer microseconds, in the style of an HDR histogram.
+
+    Values below 2**precision_bits get a bucket each; above that every power of two is split into
+    2**precision_bits buckets, so any recorded value is known to within 1 / 2**precision_bits.
+    """
+
+    __slots__ = ('precision_bits', 'counts', 'count', 'total')
+
+    def __init__(self, precision_bits=3):
+        self.precision_bits = precision_bits
+        self.counts = []
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        micros = int(seconds * 1_000_000)
+        bits = self.precision_bits
+        if micros < 1 << bits:
+            index = max(micros, 0)
+        else:
+            shift = micros.bit_length() - bits - 1
+            index = ((shift + 1) << bits) + (micros >> shift) - (1 << bits)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.total += seconds
+
+    def upper_bound(self, index):
+        """Exclusive upper bound of a bucket, in microseconds."""
+        bits = self.precision_bits
+        if index < 1 << bits:
+            return index + 1
+        shift = (index >> bits) - 1
+        mantissa = (1 << bits) + (index & ((1 << bits) - 1))
+        return (mantissa + 1) << shift
+
+    def quantile(self, q):
+        """Upper bound in seconds of the bucket holding the q-th quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= rank and bucket:
+                return self.upper_bound(index) / 1_000_000
+        return self.upper_bound(len(self.counts) - 1) / 1_000_000
+
+
+class Histogram:
+    """Latency distribution exported as a Prometheus summary with quantiles computed on scrape."""
+
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self, name, help, label=None, precision_bits=3):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.precision_bits = precision_bits
+        self.buckets = {}
+
+    def observe(self, seconds, label_value=''):
+        buckets = self.buckets.get(label_value)
+        if buckets is None:
+            buckets = self.buckets[label_value] = HdrBuckets(self.precision_bits)
+        buckets.record(seconds)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} summary"]
+        for label_value, buckets in sorted(self.buckets.items()):
+            for q in self.QUANTILES:
+                series = _series(self.name, self.label, label_value, f'quantile="{q}"')
+                lines.append(f"{series} {buckets.quantile(q):.6f}")
+            lines.append(f"{_series(self.name + '_sum', self.label, label_value)} {buckets.total:.6f}")
+            lines.append(f"{_series(self.name + '_count', self.label, label_value)} {buckets.count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, help, label=None):
+        return self._register(Counter(name, help, label))
+
+    def histogram(self, name, help, label=None, precision_bits=3):
+        return self._register(Histogram(name, help, label, precision_bits))
+
+    def callback(self, name, help, kind, function, label=None, detailed=False):
+        """Registers a metric computed at scrape time; re-registering a name replaces it."""
+        return self._register(CallbackMetric(name, help, kind, function, label, detailed))
+
+    def _register(self, metric):
+        existing = self.metrics.get(metric.name)
+        if existing is not None and not isinstance(metric, CallbackMetric):
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self, detailed=False):
+        """Renders every metric; per-connection series are only included when `detailed` is set."""
+        lines = []
+        for metric in self.metrics.values():
+            if getattr(metric, 'detailed', False) and not detailed:
+                continue
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,165 @@
+"""Profiling that can be switched on and off in a running server.
+
+Timing hooks replace the target methods on their classes while profiling is on and put the
+originals back when it is switched off, so a server that is not being profiled runs unwrapped
+code. The optional sampler uses the ITIMER_PROF interval timer: every N ms of CPU time SIGPROF
+interrupts the main (event loop) thread and the handler records its current stack, which costs a
+few microseconds per sample instead of cProfile's per-call tracing.
+"""
+import functools
+import logging
+import os
+import signal
+import time
+from collections import Counter
+
+from src.util.metrics import Histogram
+
+MAX_STACK_DEPTH = 128
+
+
+class TimingHooks:
+    """Wraps (class, method name) targets with a timer recording into a histogram per method."""
+
+    def __init__(self, targets):
+        self.targets = targets
+        self.histogram = None
+        self._originals = {}
+
+    def install(self):
+        self.histogram = Histogram('battleship_profile_seconds', 'Wall time per call of profiled methods',
+                                   label='function')
+        for cls, name in self.targets:
+            original = cls.__dict__[name]
+            self._originals[(cls, name)] = original
+            setattr(cls, name, _timed(original, self.histogram, f"{cls.__name__}.{name}"))
+
+    def remove(self):
+        for (cls, name), original in self._originals.items():
+            setattr(cls, name, original)
+        self._originals.clear()
+
+    def report(self):
+        lines = [f"{'function':<32} {'calls':>9} {'total s':>10} {'p50 us':>9} {'p99 us':>9} {'max us':>9}"]
+        for label, buckets in sorted(self.histogram.buckets.items(), key=lambda item: -item[1].total):
+            lines.append(f"{label:<32} {buckets.count:>9} {buckets.total:>10.4f} "
+                         f"{buckets.quantile(0.5) * 1e6:>9.0f} {buckets.quantile(0.99) * 1e6:>9.0f} "
+                         f"{buckets.quantile(1.0) * 1e6:>9.0f}")
+        return "\n".join(lines) + "\n"
+
+
+def _timed(function, histogram, label):
+    observe = histogram.observe
+    perf_counter = time.perf_counter
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            observe(perf_counter() - start, label)
+    return timed
+
+
+class SamplingProfiler:
+    """Counts the main thread's stacks on SIGPROF; renders them as collapsed stacks for flamegraphs."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._names = {}
+
+    def start(self):
+        self.stacks.clear()
+        self.samples = 0
+        signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self):
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, signal.SIG_IGN)
+
+    def _sample(self, signum, frame):
+        names = self._names
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            if code not in names:
+                names[code] = self._name(code)
+            name = names[code]
+            if name is not None:
+                stack.append(name)
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[";".join(stack)] += 1
+        self.samples += 1
+
+    @staticmethod
+    def _name(code):
+        if code.co_name == 'timed' and code.co_filename == __file__:
+            return None  # the timing hook's wrapper frame
+        return f"{code.co_name} ({os.path.relpath(code.co_filename)}:{code.co_firstlineno})"
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """Timing hooks plus, when sample_hz is set, the sampling profiler; toggled by a signal.
+
+    Each session writes profile-<pid>-<start>.txt with the per-method timings and, when sampling,
+    profile-<pid>-<start>.folded with collapsed stacks (input for flamegraph.pl or speedscope).
+    """
+
+    def __init__(self, targets, sample_hz=0, output_dir='.'):
+        self.hooks = TimingHooks(targets)
+        self.sampler = SamplingProfiler(1 / sample_hz) if sample_hz else None
+        self.output_dir = output_dir
+        self.started_at = None
+
+    @property
+    def enabled(self):
+        return self.started_at is not None
+
+    def start(self):
+        if self.enabled:
+            return
+        self.started_at = time.time()
+        self.hooks.install()
+        if self.sampler:
+            self.sampler.start()
+        logging.info(f"Profiling started (pid {os.getpid()})")
+
+    def stop(self):
+        """Stops profiling and writes the results; returns the path prefix of the files written."""
+        if not self.enabled:
+            return None
+        if self.sampler:
+            self.sampler.stop()
+        self.hooks.remove()
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))
+        prefix = os.path.join(self.output_dir, f"profile-{os.getpid()}-{stamp}")
+        elapsed = time.time() - self.started_at
+        self.started_at = None
+        with open(f"{prefix}.txt", 'w') as f:
+            f.write(f"# {elapsed:.1f}s profiled\n")
+            f.write(self.hooks.report())
+        if self.sampler:
+            with open(f"{prefix}.folded", 'w') as f:
+                f.write(self.sampler.collapsed())
+        logging.info(f"Profiling stopped after {elapsed:.1f}s; results written to {prefix}.*")
+        return prefix
+
+    def toggle(self):
+        if self.enabled:
+            self.stop()
+        else:
+            self.start()
+
+    def install_signal(self, signum=None):
+        """Toggles profiling whenever the process receives `signum` (SIGUSR2 by default)."""
+        signum = signum or getattr(signal, 'SIGUSR2', None)
+        if signum is not None:
+            signal.signal(signum, lambda _signum, _frame: self.toggle())
@@ -0,0 +1,123 @@
+import heapq
+import itertools
+import logging
+import math
+import time
+
+
+class Timer:
+    __slots__ = ('expires', 'callback', 'args', 'slot')
+
+    def __init__(self, expires, callback, args):
+        self.expires = expires
+        self.callback = callback
+        self.args = args
+        self.slot = None
+
+    @property
+    def active(self):
+        return self.slot is not None
+
+
+class TimerWheel:
+    """Hierarchical timer wheel with O(1) scheduling and cancellation.
+
+    Level 0 has one slot per tick; each higher level covers a full turn of the level below it.
+    Timers in a higher level are cascaded down when the level below wraps around to their slot.
+    With the defaults (0.1 s ticks, 4 levels of 64 slots) timers up to about 19 days are exact;
+    longer ones are parked in the top level and re-cascaded until they are due.
+
+    Deadlines are also kept in a lazy min-heap so that next_timeout() can report the earliest
+    one; cancelled and expired timers are dropped from it when they reach the top, and the heap
+    is compacted when they make up most of it.
+    """
+
+    def __init__(self, tick=0.1, slot_bits=6, levels=4, clock=time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self._bits = slot_bits
+        self._mask = (1 << slot_bits) - 1
+        self._levels = [[{} for _ in range(1 << slot_bits)] for _ in range(levels)]
+        self._max_delta = (1 << (slot_bits * levels)) - 1
+        self._origin = clock()
+        self._current = 0
+        self._count = 0
+        self._deadlines = []  # (expires, sequence, timer)
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return self._count
+
+    def schedule(self, delay, callback, *args):
+        """Runs callback(*args) once `delay` seconds from now; returns a Timer that can be cancelled."""
+        now_tick = (self.clock() - self._origin) / self.tick
+        expires = max(self._current + 1, math.ceil(now_tick + delay / self.tick))
+        timer = Timer(expires, callback, args)
+        self._insert(timer)
+        self._count += 1
+        heapq.heappush(self._deadlines, (expires, next(self._sequence), timer))
+        return timer
+
+    def cancel(self, timer):
+        if timer is not None and timer.slot is not None:
+            del timer.slot[timer]
+            timer.slot = None
+            self._count -= 1
+            if len(self._deadlines) > 2 * self._count + 64:
+                self._deadlines = [entry for entry in self._deadlines if entry[2].active]
+                heapq.heapify(self._deadlines)
+
+    def next_timeout(self):
+        """Seconds until the earliest pending timer is due, or None when no timers are pending."""
+        deadlines = self._deadlines
+        while deadlines and not deadlines[0][2].active:
+            heapq.heappop(deadlines)
+        if not deadlines:
+            return None
+        due = self._origin + deadlines[0][0] * self.tick
+        return max(0.0, due - self.clock())
+
+    def advance(self):
+        """Runs every timer whose deadline has passed."""
+        target = int((self.clock() - self._origin) / self.tick)
+        if not self._count:
+            self._current = max(self._current, target)
+            return
+        while self._current < target and self._count:
+            self._current += 1
+            self._cascade(self._current)
+            self._expire(self._levels[0][self._current & self._mask])
+        self._current = max(self._current, target)
+
+    def _insert(self, timer):
+        delta = max(0, min(timer.expires - self._current, self._max_delta))
+        level = 0
+        while delta >> (self._bits * (level + 1)):
+            level += 1
+        expires = max(timer.expires, self._current)
+        if level == len(self._levels) - 1 and timer.expires - self._current > self._max_delta:
+            expires = self._current + self._max_delta
+        slot = self._levels[level][(expires >> (self._bits * level)) & self._mask]
+        slot[timer] = None
+        timer.slot = slot
+
+    def _cascade(self, tick):
+        for level in range(1, len(self._levels)):
+            if tick & ((1 << (self._bits * level)) - 1):
+                break
+            slot = self._levels[level][(tick >> (self._bits * level)) & self._mask]
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                self._insert(timer)
+
+    def _expire(self, slot):
+        while slot:
+            timer = next(iter(slot))
+            del slot[timer]
+            timer.slot = None
+            self._count -= 1
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                logging.error(f"Timer callback {timer.callback.__name__} failed: {e}")
@@ -0,0 +1,69 @@
+import random
+
+import numpy as np
+
+from src.game.ai import TargetingAI
+from src.game.board import Board
+
+
+def brute_force_heatmap(ai):
+    """Counts placements cell by cell, the way the prefix sums are meant to."""
+    size = ai.size
+    blocked = ai.misses | ai.sunk
+    density = np.zeros((size, size))
+    for length in ai.remaining:
+        for x in range(size):
+            for y in range(size):
+                for cells in ([(x, y + i) for i in range(length)], [(x + i, y) for i in range(length)]):
+                    if all(cx < size and cy < size and not blocked[cx, cy] for cx, cy in cells):
+                        weight = 1 + 1000 * sum(ai.hits[cx, cy] for cx, cy in cells) if ai.hits.any() else 1
+                        for cell in cells:
+                            density[cell] += weight
+    density[ai.misses | ai.hits | ai.sunk] = 0
+    return density
+
+
+def test_heatmap_matches_a_brute_force_count():
+    ai = TargetingAI(size=6, lengths=[4, 3, 2], rng=random.Random(1))
+    ai.record(0, 0, False)
+    ai.record(2, 3, False)
+    assert np.array_equal(ai.heatmap(), brute_force_heatmap(ai))
+    ai.record(4, 4, True)
+    assert ai.mode == 'target'
+    assert np.array_equal(ai.heatmap(), brute_force_heatmap(ai))
+
+
+def test_target_mode_fires_next_to_a_hit_and_sinking_resolves_it():
+    ai = TargetingAI(rng=random.Random(2))
+    ai.record(5, 5, True)
+    x, y = ai.next_shot()
+    assert abs(x - 5) + abs(y - 5) == 1
+    ai.record(5, 6, True, sunk_length=2)
+    assert ai.mode == 'hunt' and ai.sunk[5, 5] and ai.sunk[5, 6] and 2 not in ai.remaining
+
+
+def test_ai_sinks_a_random_fleet_without_repeating_shots():
+    rng = random.Random(3)
+    board = Board()
+    assert board.randomize_ships(rng)
+    ai = TargetingAI(rng=rng)
+    shots = set()
+    while not board.all_sunk():
+        x, y = ai.next_shot()
+        assert (x, y) not in shots
+        shots.add((x, y))
+        hit, sunk, name = board.mark_hit(x, y)
+        ai.record(x, y, hit, next(s.length for s in board.ships if s.name == name) if sunk else None)
+    assert len(shots) < 75
+
+
+def test_state_can_be_rebuilt_from_an_opponent_view():
+    board = Board()
+    assert board.randomize_ships(random.Random(4))
+    board.mark_hit(*board.ships[0].coordinates[0])
+    water = next((x, y) for x in range(10) for y in range(10) if board.grid[x][y] == '~')
+    board.mark_hit(*water)
+    ai = TargetingAI.from_view(board.get_opponent_view())
+    grid = np.array(board.grid)
+    assert ai.size == 10
+    assert np.array_equal(ai.hits, grid == 'X') and np.array_equal(ai.misses, grid == 'O')
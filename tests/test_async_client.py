@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import pytest
+
+from server import AsyncBattleshipServer
+from src.connection.async_client import BattleshipClient, ServerError
+from src.connection.framing import create_frame
+from src.protocol.client_schemas import GameStartedNotification, TurnSwitchNotification
+
+
+async def with_server(scenario):
+    server = AsyncBattleshipServer(port=0, use_uvloop=False)
+    serving = asyncio.ensure_future(server.serve())
+    await asyncio.sleep(0)
+    try:
+        await scenario(server.sock.getsockname()[1])
+    finally:
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+        server.shutdown()
+
+
+async def next_event(client, event_type):
+    async for event in client.events():
+        if isinstance(event, event_type):
+            return event
+
+
+@pytest.mark.parametrize("encoding", ["json", "binary"])
+def test_two_clients_start_a_game_and_take_a_turn(encoding):
+    async def scenario(port):
+        async with BattleshipClient(port=port, encoding=encoding) as alice, \
+                BattleshipClient(port=port, encoding=encoding) as bob:
+            assert (await alice.set_name("alice")).success
+            assert (await bob.set_name("bob")).success
+            assert alice.encoding == encoding
+            for client in (alice, bob):
+                await next_event(client, GameStartedNotification)
+                await client.submit_board()
+            turn = await next_event(alice, TurnSwitchNotification)
+            mover = alice if turn.user == "alice" else bob
+            await mover.fire(0, 0)
+            view = await mover.view()
+            assert view.user == mover.name and view.opponent_board
+
+    asyncio.run(with_server(scenario))
+
+
+def test_requests_the_server_rejects_raise_server_error():
+    async def scenario(port):
+        async with BattleshipClient(port=port) as alice:
+            await alice.set_name("alice")
+            with pytest.raises(ServerError) as excinfo:
+                await alice.view()
+            assert excinfo.value.response.request == "view"
+
+    asyncio.run(with_server(scenario))
+
+
+async def with_fake_server(respond, scenario):
+    async def handle(reader, writer):
+        await respond(writer)
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(handle, 'localhost', 0)
+    async with server:
+        await scenario(server.sockets[0].getsockname()[1])
+
+
+def welcome():
+    return create_frame(json.dumps({"type": "welcome", "message": "hi", "encodings": ["json"]}).encode())
+
+
+def test_undecodable_frames_close_the_client_without_raising_from_close():
+    async def respond(writer):
+        writer.write(welcome() + create_frame(b"[1, 2]"))
+
+    async def scenario(port):
+        async with BattleshipClient(port=port) as client:
+            assert [event async for event in client.events()] == []
+            assert client.closed
+
+    asyncio.run(with_fake_server(respond, scenario))
+
+
+def test_unanswered_requests_time_out():
+    async def respond(writer):
+        writer.write(welcome())
+
+    async def scenario(port):
+        async with BattleshipClient(port=port, request_timeout=0.1) as client:
+            with pytest.raises(asyncio.TimeoutError):
+                await client.set_name("alice")
+
+    asyncio.run(with_fake_server(respond, scenario))
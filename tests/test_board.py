@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from src.game.board import Board
+from src.game.game import Game
+
+
+def placed_board():
+    board = Board()
+    for row, ship in enumerate(board.ships):
+        board.place_ship(row, 0, ship, 'H')
+    return board
+
+
+def test_failed_re_placement_leaves_the_ship_where_it_was():
+    board = placed_board()
+    carrier, battleship = board.ships[0], board.ships[1]
+    before = (board.grid, board.remaining, list(carrier.coordinates))
+    with pytest.raises(ValueError):
+        board.place_ship(1, 0, carrier, 'H')  # Overlaps the battleship.
+    with pytest.raises(ValueError):
+        board.place_ship(0, 8, carrier, 'H')  # Runs off the board.
+    assert (board.grid, board.remaining, carrier.coordinates) == before
+    assert board.mark_hit(1, 0)[2] == battleship.name
+
+
+def test_moving_a_ship_may_overlap_its_own_cells():
+    board = placed_board()
+    carrier = board.ships[0]
+    board.place_ship(0, 1, carrier, 'H')
+    assert carrier.coordinates == [(0, y) for y in range(1, 6)]
+    assert board.grid[0][:6] == ['~', 'S', 'S', 'S', 'S', 'S']
+    assert board.remaining == sum(ship.length for ship in board.ships)
+
+
+def test_shots_sink_ships_and_repeated_hits_change_nothing():
+    board = placed_board()
+    destroyer = board.ships[-1]
+    assert board.mark_hit(4, 0) == (True, False, destroyer.name)
+    assert board.mark_hit(4, 0) == (True, False, "")
+    assert board.mark_hit(4, 1) == (True, True, destroyer.name)
+    assert board.mark_hit(9, 9) == (False, False, "")
+    assert board.grid[4][:2] == ['X', 'X'] and board.grid[9][9] == 'O'
+    with pytest.raises(ValueError):
+        board.mark_hit(-1, 0)
+
+
+def test_game_is_won_when_either_board_has_no_ship_cells_left():
+    class Player:
+        def __init__(self, name):
+            self.name = name
+
+    game = Game(Player("alice"), Player("bob"))
+    game.boards = {"alice": placed_board(), "bob": placed_board()}
+    for ship in game.boards["bob"].ships:
+        for x, y in list(ship.coordinates):
+            game.boards["bob"].mark_hit(x, y)
+    assert game.check_winner() and game.boards["bob"].all_sunk()
+    assert not game.boards["alice"].all_sunk()
+
+
+def test_serialized_boards_round_trip():
+    board = placed_board()
+    board.mark_hit(0, 0)
+    board.mark_hit(9, 9)
+    copy = Board.deserialize(board.serialize().model_dump())
+    assert copy.grid == board.grid and copy.remaining == board.remaining
+    assert copy.to_string() == board.to_string()
+    assert copy.mark_hit(0, 1) == (True, False, "Carrier")
+
+
+def render(grid, opponent):
+    """The views as they were built before rows were cached."""
+    size = len(grid)
+    rows = [f"{size - idx - 1:2}   " + "  ".join('~' if opponent and cell == 'S' else cell for cell in row)
+            for idx, row in enumerate(reversed(grid))]
+    return "\n".join(rows + ["", "     " + "  ".join(f"{i}" for i in range(size)), ""])
+
+
+def assert_views_current(board):
+    assert board.to_string() == render(board.grid, opponent=False)
+    assert board.get_opponent_view() == render(board.grid, opponent=True)
+
+
+def test_cached_views_follow_every_change_to_the_board():
+    board = Board()
+    assert_views_current(board)
+    assert board.randomize_ships(random.Random(5))
+    assert_views_current(board)
+    carrier = board.ships[0]
+    board.mark_hit(*carrier.coordinates[0])
+    board.mark_hit(*next((x, y) for x in range(10) for y in range(10) if board.grid[x][y] == '~'))
+    assert_views_current(board)
+    board.remove_ship(board.ships[-1])
+    assert_views_current(board)
+    board.grid = placed_board().grid
+    assert_views_current(board)
+    assert_views_current(Board.deserialize(board.serialize().model_dump()))
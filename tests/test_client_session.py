@@ -0,0 +1,28 @@
+import queue
+
+from src.connection.client_session import GameMenu
+
+
+class FakeConnection:
+    def __init__(self):
+        self.name = None
+        self.encoding = "json"
+        self.sent = []
+
+    def send(self, msg):
+        self.sent.append(msg)
+
+
+def test_spectator_follows_events_and_both_threads_exit_when_the_game_ends():
+    connection, events, wakeups = FakeConnection(), queue.Queue(), []
+    menu = GameMenu(connection, events, spectate=7, wakeup=lambda: wakeups.append(True))
+    events.put({"type": "welcome", "message": "Welcome", "encodings": ["json"]})
+    events.put({"type": "spectate", "success": True, "game_id": 7, "player1": "alice", "player2": "bob"})
+    events.put({"type": "ping"})
+    events.put({"type": "game_over", "winner": "alice"})
+
+    menu.message_thread.join(5)
+    menu.input_thread.join(5)
+    assert not menu.message_thread.is_alive() and not menu.input_thread.is_alive()
+    assert [msg.type for msg in connection.sent] == ["spectate", "pong"]
+    assert connection.sent[0].game_id == 7 and wakeups
@@ -0,0 +1,69 @@
+import pytest
+
+from src.protocol import codec
+from src.protocol.client_schemas import MoveResponse, ServerMessage, TurnSwitchNotification
+from src.protocol.codec import BINARY, JSON, decode_message, encode_message
+from src.protocol.server_schemas import MoveRequest, parse_move
+
+MESSAGES = [
+    MoveRequest(user="alice", x=3, y=-5),
+    MoveResponse(user="bob", x=2 ** 31 - 1, y=-2 ** 31, hit=True),
+    TurnSwitchNotification(user="zoë"),
+    ServerMessage(message="Waiting for more players to join..."),
+]
+
+
+@pytest.mark.parametrize("encoding", [JSON, BINARY])
+@pytest.mark.parametrize("message", MESSAGES, ids=lambda m: type(m).__name__)
+def test_messages_round_trip(message, encoding):
+    assert decode_message(encode_message(message, encoding), "alice") == message.model_dump()
+
+
+@pytest.mark.parametrize("message", MESSAGES[1:], ids=lambda m: type(m).__name__)
+def test_fast_path_encoders_match_the_generic_encoding(message):
+    assert codec.BINARY_ENCODERS[type(message)](message) == codec.encode_binary(message)
+
+
+def test_parse_move_reads_well_formed_moves_and_validates_the_rest():
+    assert parse_move({"type": "move", "user": "alice", "x": 1, "y": 2}) == ("alice", 1, 2)
+    assert parse_move({"type": "move", "user": "alice", "x": "3", "y": 4}) == ("alice", 3, 4)
+    with pytest.raises(ValueError):
+        parse_move({"type": "move", "user": "alice", "x": "three", "y": 4})
+
+
+def test_binary_moves_are_fixed_size_and_take_the_sender_from_the_connection():
+    payload = encode_message(MoveRequest(user="alice", x=1, y=2), BINARY)
+    assert len(payload) == codec.MOVE_REQUEST.size
+    assert decode_message(payload, "mallory")["user"] == "mallory"
+
+
+def test_msgpack_fallback_round_trips_nested_values(monkeypatch):
+    monkeypatch.setattr(codec, "msgpack", None)
+    value = {"a": [1, -1, -33, 300, 2 ** 40, 1.5, None, True, False], "s": "x" * 40, "b": b"\x00\xff",
+             "big": list(range(20)), "map": {str(i): i for i in range(20)}}
+    assert codec.unpackb(codec.packb(value)) == value
+
+
+@pytest.mark.parametrize("payload", [
+    b"",
+    b"{not json",
+    b"\xff\xfe",
+    bytes((codec.TAG_MOVE_REQUEST, 0, 0)),
+    bytes((codec.TAG_MOVE_RESPONSE,)) + b"\x00" * 9 + b"\xff",
+    bytes((codec.TAG_MSGPACK, 0x91)),
+    bytes((codec.TAG_MSGPACK,)) + b"\x91" * 100_000 + b"\xc0",
+    b"[" * 100_000,
+])
+def test_malformed_payloads_raise_value_error(payload, monkeypatch):
+    monkeypatch.setattr(codec, "msgpack", None)
+    with pytest.raises(ValueError):
+        decode_message(payload)
+
+
+def test_binary_move_outside_int32_is_a_value_error():
+    with pytest.raises(ValueError):
+        encode_message(MoveRequest(user="alice", x=2 ** 31, y=0), BINARY)
+    with pytest.raises(ValueError):
+        encode_message({"type": "move", "user": "alice", "x": 0, "y": -2 ** 31 - 1, "hit": False}, BINARY)
+    with pytest.raises(ValueError):
+        encode_message(MoveResponse(user="alice", x=0, y=2 ** 40, hit=True), BINARY)
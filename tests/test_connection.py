@@ -0,0 +1,93 @@
+import selectors
+import socket
+
+import pytest
+
+from src.connection.connection import Connection
+from src.connection.framing import ReceiveBuffer, create_frame
+
+
+@pytest.fixture
+def pair():
+    selector = selectors.DefaultSelector()
+    local, remote = socket.socketpair()
+    local.setblocking(False)
+    connection = Connection(selector, local, ("127.0.0.1", 1))
+    selector.register(local, selectors.EVENT_READ, data=connection)
+    yield connection, remote
+    connection.close()
+    remote.close()
+    selector.close()
+
+
+def test_every_frame_of_one_read_is_queued(pair):
+    connection, remote = pair
+    remote.sendall(create_frame(b'{"type": "a"}') + create_frame(b'{"type": "b"}'))
+    connection.process_events(selectors.EVENT_READ)
+    assert list(connection.messages) == [{"type": "a"}, {"type": "b"}]
+
+
+def test_undecodable_frames_are_skipped(pair):
+    connection, remote = pair
+    remote.sendall(create_frame(b'not json') + create_frame(b'{"type": "ok"}'))
+    connection.process_events(selectors.EVENT_READ)
+    assert list(connection.messages) == [{"type": "ok"}]
+
+
+def read_frames(sock, count):
+    buffer = ReceiveBuffer()
+    payloads = []
+    while len(payloads) < count:
+        buffer.recv_from(sock)
+        payloads += [bytes(payload) for payload in buffer.frames()]
+    return payloads
+
+
+def test_send_queues_frames_until_the_socket_is_writable(pair):
+    connection, remote = pair
+    connection.send(b"first")
+    connection.send(b"second")
+    assert connection.pending_bytes == len(create_frame(b"first")) + len(create_frame(b"second"))
+    assert connection.selector.get_key(connection.sock).events & selectors.EVENT_WRITE
+
+    connection.process_events(selectors.EVENT_WRITE)
+    assert connection.pending_bytes == 0
+    assert connection.selector.get_key(connection.sock).events == selectors.EVENT_READ
+    assert read_frames(remote, 2) == [b"first", b"second"]
+
+
+def test_partial_writes_keep_the_unsent_tail(pair):
+    connection, remote = pair
+    frames = [create_frame(b"abc"), create_frame(b"defgh")]
+    for frame in frames:
+        connection._send_queue.append(frame)
+        connection._send_queued += len(frame)
+    connection._consume_sent(len(frames[0]) + 2)
+    assert connection.pending_bytes == len(frames[1]) - 2
+    assert bytes(connection._send_queue[0]) == frames[1][2:]
+
+
+def test_reads_pause_above_the_high_water_mark(pair):
+    connection, remote = pair
+    connection.high_water, connection.low_water = 100, 25
+    connection.send(b"x" * 200)
+    assert connection.selector.get_key(connection.sock).events == selectors.EVENT_WRITE
+    connection.process_events(selectors.EVENT_WRITE)
+    assert connection.selector.get_key(connection.sock).events == selectors.EVENT_READ
+
+
+def test_frames_are_limited_until_the_connection_is_named(pair):
+    connection, remote = pair
+    connection.limit_frames_until_named()
+    remote.sendall(create_frame(b'{"type": "set_name", "user": "alice"}'))
+    connection.process_events(selectors.EVENT_READ)
+    connection.set_name(connection.messages.popleft())
+    remote.sendall(create_frame(b'"' + b"x" * 8192 + b'"', compress_threshold=None))
+    while not connection.messages:
+        connection.process_events(selectors.EVENT_READ)
+    assert len(connection.messages[0]) == 8192
+
+    connection.limit_frames_until_named()
+    remote.sendall(create_frame(b'"' + b"x" * 8192 + b'"', compress_threshold=None))
+    connection.process_events(selectors.EVENT_READ)
+    assert connection.closed
@@ -0,0 +1,163 @@
+import os
+import selectors
+import socket
+
+import pytest
+
+from src.connection.connection import Connection
+from src.connection.coordinator import (MAX_CONTROL_MESSAGE, CoordinatorLink, MatchCoordinator, recv_control,
+                                        send_control)
+from src.connection.framing import create_frame
+
+
+def control_pair():
+    return socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+
+
+def test_control_messages_carry_file_descriptors():
+    left, right = control_pair()
+    passed, kept = socket.socketpair()
+    with left, right, passed, kept:
+        send_control(left, {"type": "adopt", "client": "a"}, fds=[passed.fileno()])
+        msg, fds = recv_control(right)
+        assert msg == {"type": "adopt", "client": "a"}
+        with socket.socket(fileno=fds[0]) as received:
+            received.sendall(b"ping")
+            assert kept.recv(4) == b"ping"
+
+
+def test_oversized_control_messages_are_refused():
+    left, right = control_pair()
+    with left, right:
+        with pytest.raises(ValueError):
+            send_control(left, {"type": "transfer", "unread": "x" * MAX_CONTROL_MESSAGE})
+
+
+def test_truncated_control_messages_raise_and_close_their_descriptors():
+    left, right = control_pair()
+    passed, kept = socket.socketpair()
+    with left, right, passed, kept:
+        socket.send_fds(left, [b"{" * (MAX_CONTROL_MESSAGE + 1)], [passed.fileno()])
+        before = set(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else None
+        with pytest.raises(ValueError):
+            recv_control(right)
+        if before is not None:
+            assert set(os.listdir("/proc/self/fd")) <= before
+        send_control(left, {"type": "cancel", "client": "a"})
+        assert recv_control(right) == ({"type": "cancel", "client": "a"}, [])
+
+
+class Waiting:
+    def __init__(self, client_id):
+        self.id = client_id
+        self.name = client_id
+
+
+@pytest.fixture
+def coordinator():
+    worker0, parent0 = control_pair()
+    worker1, parent1 = control_pair()
+    coordinator = MatchCoordinator({0: parent0, 1: parent1})
+    yield coordinator, CoordinatorLink(worker0, 0), CoordinatorLink(worker1, 1)
+    coordinator.sel.close()
+    for sock in (worker0, parent0, worker1, parent1):
+        sock.close()
+
+
+def test_coordinator_pairs_players_waiting_in_different_workers(coordinator):
+    coordinator, link0, link1 = coordinator
+    link0.announce(Waiting("a"), 1500)
+    coordinator.handle_worker(0)
+    link0.announce(Waiting("b"), 1510)
+    coordinator.handle_worker(0)
+    assert len(coordinator.matchmaker) == 2
+
+    link1.announce(Waiting("c"), 1500)
+    coordinator.handle_worker(1)
+    msg, _ = link1.receive()
+    assert msg == {"type": "handoff", "client": "c", "to": 0, "partner": "a"}
+    assert list(coordinator.matchmaker.tickets) == [(0, "b")]
+
+
+def test_coordinator_only_pairs_nearby_ratings_until_the_search_widens(coordinator):
+    coordinator, link0, link1 = coordinator
+    now = [0.0]
+    coordinator.matchmaker.clock = lambda: now[0]
+    link0.announce(Waiting("a"), 1500)
+    coordinator.handle_worker(0)
+    now[0] = 1.0
+    link1.announce(Waiting("b"), 1720)
+    coordinator.handle_worker(1)
+    now[0] = coordinator.matchmaker.widen_interval + 1
+    assert coordinator.matchmaker.poll() == []
+
+    now[0] = 2 * coordinator.matchmaker.widen_interval + 1
+    for first, second in coordinator.matchmaker.poll():
+        coordinator.hand_off(first, second)
+    assert link1.receive()[0] == {"type": "handoff", "client": "b", "to": 0, "partner": "a"}
+
+
+def test_failed_handoff_puts_the_partner_back_in_the_queue(coordinator):
+    coordinator, link0, link1 = coordinator
+    link0.announce(Waiting("a"), 1500)
+    coordinator.handle_worker(0)
+    link1.announce(Waiting("b"), 1500)
+    coordinator.handle_worker(1)
+    msg, _ = link1.receive()
+
+    link1.handoff_failed(msg)
+    coordinator.handle_worker(1)
+    assert list(coordinator.matchmaker.tickets) == [(0, "a")]
+
+
+def test_results_update_the_ratings_of_every_worker(coordinator):
+    coordinator, link0, link1 = coordinator
+    assert link0.report_result("alice", "bob")
+    coordinator.handle_worker(0)
+    for link in (link0, link1):
+        msg, _ = link.receive()
+        assert msg["type"] == "ratings"
+        assert msg["ratings"]["alice"] > 1500 > msg["ratings"]["bob"]
+
+
+@pytest.fixture
+def waiting_client():
+    selector = selectors.DefaultSelector()
+    local, remote = socket.socketpair()
+    local.setblocking(False)
+    connection = Connection(selector, local, ("127.0.0.1", 1))
+    connection.name = "alice"
+    selector.register(local, selectors.EVENT_READ, data=connection)
+    yield connection, remote
+    connection.close()
+    remote.close()
+    selector.close()
+
+
+def test_transfer_hands_over_the_socket_and_buffered_bytes(waiting_client):
+    connection, remote = waiting_client
+    worker, parent = control_pair()
+    with worker, parent:
+        link = CoordinatorLink(worker, 0)
+        connection.send(b"unsent")
+        remote.sendall(create_frame(b"unread")[:4])
+        connection.process_events(selectors.EVENT_READ)
+
+        assert link.transfer(connection, 1, "bob")
+        assert connection.closed and connection.sock.fileno() == -1
+        msg, fds = recv_control(parent)
+        addr, name, encoding, unsent, unread = CoordinatorLink.adopted_state(msg)
+        assert (name, encoding) == ("alice", "json")
+        assert (unsent, unread) == (create_frame(b"unsent"), create_frame(b"unread")[:4])
+        os.close(fds[0])
+
+
+def test_transfer_too_large_to_send_leaves_the_client_in_place(waiting_client):
+    connection, remote = waiting_client
+    worker, parent = control_pair()
+    with worker, parent:
+        link = CoordinatorLink(worker, 0)
+        connection.send(os.urandom(MAX_CONTROL_MESSAGE))
+        assert not link.transfer(connection, 1, "bob")
+        assert not connection.closed
+        assert connection.pending_bytes > MAX_CONTROL_MESSAGE
@@ -0,0 +1,27 @@
+import pytest
+
+from src.connection.frame_cache import CachedMessage, MessageTemplate
+from src.connection.framing import create_frame
+from src.protocol.client_schemas import GameStartedNotification, ServerMessage, TurnSwitchNotification
+from src.protocol.codec import BINARY, JSON, encode_message
+
+
+@pytest.mark.parametrize("encoding", [JSON, BINARY])
+def test_cached_frames_match_encoding_each_time(encoding):
+    message = ServerMessage(message="Waiting for more players to join...")
+    cached = CachedMessage(message)
+    assert cached.frame(encoding) == create_frame(encode_message(message, encoding))
+    assert cached.frame(encoding) is cached.frame(encoding)
+
+
+@pytest.mark.parametrize("encoding", [JSON, BINARY])
+@pytest.mark.parametrize("name", ["alice", "zoë", 'quote " and \\ backslash', "tab\tnew\nline"])
+def test_templates_render_like_the_full_model(name, encoding):
+    template = MessageTemplate(GameStartedNotification, ['player1', 'player2'])
+    rendered = template.render(player1=name, player2="bob").frame(encoding)
+    assert rendered == create_frame(encode_message(GameStartedNotification(player1=name, player2="bob"), encoding))
+
+
+def test_templates_reject_fields_they_cannot_place():
+    with pytest.raises(ValueError):
+        MessageTemplate(TurnSwitchNotification, ['user', 'opponent'])
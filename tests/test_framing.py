@@ -0,0 +1,102 @@
+import socket
+import zlib
+
+import pytest
+
+from src.connection.framing import (FLAG_COMPRESSED, GROW_STEP, FrameError, ReceiveBuffer, create_frame,
+                                    encode_varint)
+
+
+def feed(buffer, data):
+    view = buffer.writable(len(data))
+    view[:len(data)] = data
+    buffer.commit(len(data))
+
+
+def test_frames_yields_every_complete_frame():
+    buffer = ReceiveBuffer()
+    feed(buffer, create_frame(b"one") + create_frame(b"two") + create_frame(b""))
+    assert [bytes(payload) for payload in buffer.frames()] == [b"one", b"two", b""]
+    assert len(buffer) == 0
+
+
+def test_partial_frame_waits_for_the_rest():
+    buffer = ReceiveBuffer()
+    frame = create_frame(b"hello world")
+    feed(buffer, frame[:1])
+    assert list(buffer.frames()) == []
+    feed(buffer, frame[1:5])
+    assert list(buffer.frames()) == []
+    assert len(buffer) == 5
+    feed(buffer, frame[5:] + create_frame(b"next")[:3])
+    assert [bytes(payload) for payload in buffer.frames()] == [b"hello world"]
+    assert len(buffer) == 3
+
+
+def test_buffer_grows_for_frames_larger_than_its_initial_size():
+    buffer = ReceiveBuffer(initial_size=16)
+    payload = bytes(range(256)) * 40
+    frame = create_frame(payload)
+    for i in range(0, len(frame), 100):
+        feed(buffer, frame[i:i + 100])
+    assert [bytes(p) for p in buffer.frames()] == [payload]
+
+
+def test_recv_from_reads_straight_into_the_buffer():
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(create_frame(b"a") + create_frame(b"bc"))
+        buffer = ReceiveBuffer()
+        assert buffer.recv_from(right) == 7
+        assert [bytes(p) for p in buffer.frames()] == [b"a", b"bc"]
+
+
+@pytest.mark.parametrize("size", [0, 0x7f, 0x80, 0x3fff, 0x4000, 100_000])
+def test_varint_lengths_round_trip(size):
+    payload = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    frame = create_frame(payload, compress_threshold=None)
+    assert frame[1:len(frame) - size] == encode_varint(size)
+    buffer = ReceiveBuffer()
+    feed(buffer, frame)
+    assert [bytes(p) for p in buffer.frames()] == [payload]
+
+
+def test_large_payloads_are_compressed():
+    payload = b"~ " * 4096
+    frame = create_frame(payload)
+    assert frame[0] == FLAG_COMPRESSED and len(frame) < len(payload) // 10
+    buffer = ReceiveBuffer()
+    feed(buffer, frame)
+    assert [bytes(p) for p in buffer.frames()] == [payload]
+
+
+def test_declared_length_alone_does_not_grow_the_buffer():
+    buffer = ReceiveBuffer()
+    size = 16 * 1024 * 1024
+    header = bytes((0,)) + encode_varint(size)
+    feed(buffer, header)
+    assert list(buffer.frames()) == []
+    assert len(buffer.writable()) <= 2 * GROW_STEP
+
+    payload = bytes(size)
+    received = len(header)
+    for i in range(0, size, 256 * 1024):
+        feed(buffer, payload[i:i + 256 * 1024])
+        received += 256 * 1024
+        assert len(buffer.writable()) <= 2 * received + GROW_STEP
+    assert [len(p) for p in buffer.frames()] == [size]
+
+
+@pytest.mark.parametrize("frame", [
+    bytes((0,)) + encode_varint(2 ** 30) + b"x",
+    bytes((0x80, 1, 0)),
+    bytes((0,)) + b"\xff" * 6,
+    bytes((FLAG_COMPRESSED, 4)) + b"nope",
+    bytes((FLAG_COMPRESSED,)) + encode_varint(10) + zlib.compress(b"x" * 100)[:10],
+    bytes((FLAG_COMPRESSED,)) + encode_varint(len(zlib.compress(bytes(2 ** 20)))) + zlib.compress(bytes(2 ** 20)),
+], ids=["too-long", "unknown-flag", "long-header", "corrupt", "truncated", "inflates-too-far"])
+def test_invalid_frames_raise_frame_error(frame):
+    buffer = ReceiveBuffer(max_frame_size=1024)
+    feed(buffer, frame)
+    with pytest.raises(FrameError):
+        list(buffer.frames())
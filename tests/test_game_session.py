@@ -0,0 +1,148 @@
+import json
+
+from src.connection.frame_cache import CachedMessage, TemplatedMessage
+from src.connection.game_session import SPECTATOR_LAG_BYTES, SPECTATOR_MAX_BYTES, GameSession
+from src.game.board import Board
+from src.protocol.client_schemas import ServerMessage
+from src.util.timer_wheel import TimerWheel
+
+
+class FakePlayer:
+    def __init__(self, name):
+        self.name = name
+        self.id = f"127.0.0.1:{name}"
+        self.sent = []
+        self.pending_bytes = 0
+
+    def send(self, msg):
+        if isinstance(msg, TemplatedMessage):
+            template = msg.template
+            msg = template.model_class(**template.constants, **msg.values)
+        elif isinstance(msg, CachedMessage):
+            msg = msg.message
+        self.sent.append(msg)
+
+    def types(self):
+        return [msg.type for msg in self.sent]
+
+
+def make_session(**kwargs):
+    alice, bob = FakePlayer("alice"), FakePlayer("bob")
+    return GameSession(alice, bob, **kwargs), alice, bob
+
+
+def submit_board(session, name):
+    board = Board()
+    assert board.randomize_ships()
+    session.handle_message({"type": "board", "user": name, "board": json.loads(board.serialize().json())})
+
+
+def test_messages_are_queued_until_the_session_is_flushed():
+    pending = []
+    alice, bob = FakePlayer("alice"), FakePlayer("bob")
+    session = GameSession(alice, bob)
+    session.on_pending = pending.append
+    session.notify_session(ServerMessage(message="queued"))
+    assert alice.sent == [] and bob.sent == []
+    session.flush()
+    assert alice.types() == bob.types() == ["info", "game_started", "info"]
+    session.notify_session(ServerMessage(message="again"))
+    assert pending == [session]
+
+
+def test_replies_keep_their_order_with_broadcasts():
+    session, alice, bob = make_session()
+    session.flush()
+    session.handle_chat({"type": "chat", "user": "alice", "message": "hi"})
+    session.notify_session(ServerMessage(message="broadcast"))
+    session.flush()
+    assert [msg.message for msg in bob.sent[2:]] == ["alice: hi", "broadcast"]
+    assert [msg.message for msg in alice.sent[2:]] == ["broadcast"]
+
+
+def test_moves_are_refused_before_both_boards_and_out_of_turn():
+    session, alice, bob = make_session()
+    submit_board(session, "alice")
+    session.handle_message({"type": "move", "user": "alice", "x": 0, "y": 0})
+    submit_board(session, "bob")
+    session.handle_message({"type": "move", "user": "bob", "x": 0, "y": 0})
+    session.flush()
+    errors = [msg.message for msg in alice.sent + bob.sent if msg.type == "error"]
+    assert errors == ["Boards have not been submitted yet", "It is not your turn"]
+    assert all(cell == "~" or cell == "S" for row in session.game.boards["alice"].grid for cell in row)
+
+
+def test_moves_off_the_board_are_refused_without_passing_the_turn():
+    session, alice, bob = make_session()
+    submit_board(session, "alice")
+    submit_board(session, "bob")
+    session.handle_message({"type": "move", "user": "alice", "x": -1, "y": 3})
+    session.flush()
+    assert alice.sent[-1].type == "error" and alice.sent[-1].message == "(-1, 3) is off the board"
+    assert session.game.turn == "alice"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_player_without_a_board_forfeits_when_placement_times_out():
+    clock = Clock()
+    timers = TimerWheel(clock=clock)
+    results = []
+    session, alice, bob = make_session(timers=timers, turn_timeout=30, placement_timeout=60)
+    session.on_finish = lambda _session, winner, loser: results.append((winner, loser))
+    submit_board(session, "bob")
+    clock.now = 61
+    timers.advance()
+    assert results == [("bob", "alice")]
+    assert session.finished and len(timers) == 0
+
+
+def test_game_is_abandoned_when_neither_player_places_ships():
+    clock = Clock()
+    timers = TimerWheel(clock=clock)
+    results = []
+    session, alice, bob = make_session(timers=timers, placement_timeout=60)
+    session.on_finish = lambda _session, winner, loser: results.append((winner, loser))
+    clock.now = 61
+    timers.advance()
+    session.flush()
+    assert results == [(None, None)]
+    assert alice.sent[-1].type == "game_over" and alice.sent[-1].winner is None
+
+
+def test_placement_deadline_stops_once_both_boards_arrive():
+    clock = Clock()
+    timers = TimerWheel(clock=clock)
+    session, alice, bob = make_session(timers=timers, turn_timeout=120, placement_timeout=60)
+    submit_board(session, "alice")
+    submit_board(session, "bob")
+    clock.now = 61
+    timers.advance()
+    assert not session.finished
+    assert len(timers) == 1 and abs(timers.next_timeout() - 59) < 0.2
+
+
+def test_spectators_skip_droppable_events_when_behind_and_are_dropped_past_the_limit():
+    session, alice, bob = make_session()
+    session.flush()
+    lagging = []
+    session.on_spectator_lag = lagging.append
+    fast, slow, stuck = FakePlayer("fast"), FakePlayer("slow"), FakePlayer("stuck")
+    slow.pending_bytes = SPECTATOR_LAG_BYTES + 1
+    stuck.pending_bytes = SPECTATOR_MAX_BYTES + 1
+    for spectator in (fast, slow, stuck):
+        session.add_spectator(spectator)
+
+    session.notify_session(ServerMessage(message="shot"), droppable=True)
+    session.notify_session(ServerMessage(message="turn"))
+    session.flush()
+    assert [msg.message for msg in fast.sent] == ["shot", "turn"]
+    assert [msg.message for msg in slow.sent] == ["turn"]
+    assert stuck.sent == [] and lagging == [stuck]
+    assert set(session.spectators) == {fast.id, slow.id}
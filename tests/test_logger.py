@@ -0,0 +1,55 @@
+import json
+import logging
+import threading
+
+from src.util.logger import BackgroundHandler, JsonFormatter, PayloadSampler, RingBufferHandler
+
+
+def make_record(message, **fields):
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, message, None, None)
+    if fields:
+        record.fields = fields
+    return record
+
+
+def test_json_formatter_merges_extra_fields():
+    entry = json.loads(JsonFormatter().format(make_record("hello", peer="1.2.3.4:5")))
+    assert entry["message"] == "hello" and entry["level"] == "INFO" and entry["peer"] == "1.2.3.4:5"
+
+
+def test_ring_buffer_keeps_only_the_latest_records():
+    handler = RingBufferHandler(capacity=2)
+    for i in range(3):
+        handler.handle(make_record(f"line {i}"))
+    assert handler.getvalue() == "line 1\nline 2\n"
+
+
+class BlockingHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.unblock.wait(5)
+        self.records.append(record.getMessage())
+
+
+def test_background_handler_drops_records_instead_of_blocking():
+    target = BlockingHandler()
+    handler = BackgroundHandler([target], maxsize=2)
+    try:
+        for i in range(10):
+            handler.handle(make_record(f"record {i}"))
+        assert handler.dropped >= 10 - 2 - 1
+    finally:
+        target.unblock.set()
+        handler.close()
+    assert len(target.records) == 10 - handler.dropped
+
+
+def test_payload_sampler_logs_one_in_every_per_type():
+    sampler = PayloadSampler(every=3, overrides={"move": 0})
+    assert [sampler.sample("chat") for _ in range(6)] == [True, False, False, True, False, False]
+    assert not any(sampler.sample("move") for _ in range(5))
+    assert not PayloadSampler().sample("chat")
@@ -0,0 +1,71 @@
+from src.connection.matchmaking import Matchmaker
+
+
+class Player:
+    def __init__(self, name):
+        self.id = name
+        self.name = name
+
+
+def make_matchmaker(ratings=None):
+    now = [0.0]
+    matchmaker = Matchmaker(clock=lambda: now[0])
+    matchmaker.ratings.update(ratings or {})
+    return matchmaker, now
+
+
+def test_players_in_the_same_bucket_are_paired_oldest_first():
+    matchmaker, now = make_matchmaker()
+    a, b, c = Player("a"), Player("b"), Player("c")
+    assert matchmaker.enqueue(a) is None
+    now[0] = 1.0
+    assert matchmaker.enqueue(b) == (a, b)
+    assert matchmaker.enqueue(c) is None
+    assert len(matchmaker) == 1
+    assert matchmaker.stats()["matched"] == 1
+
+
+def test_search_widens_one_bucket_per_interval():
+    matchmaker, now = make_matchmaker({"low": 1500, "high": 1720})
+    low, high = Player("low"), Player("high")
+    matchmaker.enqueue(low)
+    now[0] = 1.0
+    matchmaker.enqueue(high)
+
+    now[0] = matchmaker.widen_interval
+    assert matchmaker.poll() == []
+    now[0] = 2 * matchmaker.widen_interval
+    assert matchmaker.poll() == [(low, high)]
+    assert len(matchmaker) == 0
+
+
+def test_cancelled_players_are_skipped():
+    matchmaker, _ = make_matchmaker()
+    a, b = Player("a"), Player("b")
+    matchmaker.enqueue(a)
+    assert matchmaker.get("a") is a
+    assert matchmaker.cancel("a") is a
+    assert matchmaker.cancel("a") is None
+    assert matchmaker.enqueue(b) is None
+    assert matchmaker.get("a") is None and "b" in matchmaker
+
+
+def test_can_pair_hook_skips_to_an_allowed_partner():
+    class OddOnly(Matchmaker):
+        def can_pair(self, client, other):
+            return client.name != "blocked" and other.name != "blocked"
+
+    matchmaker = OddOnly()
+    blocked, a, b = Player("blocked"), Player("a"), Player("b")
+    matchmaker.enqueue(blocked)
+    assert matchmaker.enqueue(a) is None
+    assert matchmaker.enqueue(b) == (a, b)
+    assert list(matchmaker.tickets) == ["blocked"]
+
+
+def test_elo_moves_ratings_by_the_same_amount():
+    matchmaker, _ = make_matchmaker({"underdog": 1400})
+    matchmaker.record_result("underdog", "favourite")
+    gain = matchmaker.ratings["underdog"] - 1400
+    assert gain > matchmaker.k_factor / 2
+    assert matchmaker.ratings["favourite"] == 1500 - gain
@@ -0,0 +1,95 @@
+import selectors
+import socket
+
+import pytest
+
+from src.connection.metrics_endpoint import MAX_REQUEST_SIZE, REQUEST_TIMEOUT, MetricsEndpoint, render_response
+from src.util.metrics import HdrBuckets, MetricsRegistry
+from src.util.timer_wheel import TimerWheel
+
+
+def test_hdr_buckets_bound_quantiles_within_their_precision():
+    buckets = HdrBuckets(precision_bits=3)
+    for micros in range(1, 10001):
+        buckets.record(micros / 1_000_000)
+    assert buckets.count == 10000
+    assert 0.005 <= buckets.quantile(0.5) <= 0.005 * 1.125
+    assert 0.0099 <= buckets.quantile(0.99) <= 0.0099 * 1.125
+
+
+def test_registry_renders_counters_histograms_and_detailed_callbacks():
+    registry = MetricsRegistry()
+    moves = registry.counter('moves_total', 'Moves', label='type')
+    assert registry.counter('moves_total', 'Moves', label='type') is moves
+    moves.inc('move')
+    registry.histogram('tick_seconds', 'Ticks').observe(0.001)
+    registry.callback('per_client', 'Per client', 'gauge', lambda: {'a': 1}, label='client', detailed=True)
+
+    text = registry.render()
+    assert 'moves_total{type="move"} 1' in text
+    assert 'tick_seconds_count 1' in text
+    assert 'per_client' not in text
+    assert 'per_client{client="a"} 1' in registry.render(detailed=True)
+
+
+@pytest.mark.parametrize("request_head, status", [
+    (b"GET /metrics HTTP/1.1\r\nHost: x\r\n\r\n", b"200"),
+    (b"GET /other HTTP/1.1\r\n\r\n", b"404"),
+    (b"POST /metrics HTTP/1.1\r\n\r\n", b"405"),
+    (b"\xff\r\n\r\n", b"400"),
+    (b"GET /metrics HTTP/1.1\r\n" + b"X: y\r\n" * MAX_REQUEST_SIZE, b"431"),
+])
+def test_render_response_status(request_head, status):
+    assert render_response(MetricsRegistry(), request_head).split(b" ")[1] == status
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def endpoint():
+    selector = selectors.DefaultSelector()
+    clock = Clock()
+    timers = TimerWheel(clock=clock)
+    endpoint = MetricsEndpoint(selector, MetricsRegistry(), port=0, timers=timers)
+    yield endpoint, clock
+    endpoint.close()
+    selector.close()
+
+
+def serve(endpoint):
+    for key, mask in endpoint.sel.select(timeout=0.05):
+        if key.data is endpoint:
+            endpoint.accept()
+        else:
+            key.data.process_events(mask)
+
+
+def test_idle_scrapes_are_closed_by_the_timer_wheel(endpoint):
+    endpoint, clock = endpoint
+    with socket.create_connection(endpoint.sock.getsockname()) as client:
+        serve(endpoint)
+        client.sendall(b"GET /metrics HTTP/1.1\r\n")
+        serve(endpoint)
+        clock.now = REQUEST_TIMEOUT + 0.1
+        endpoint.timers.advance()
+        assert client.recv(1024) == b""
+        assert len(endpoint.timers) == 0
+
+
+def test_oversized_request_heads_are_refused(endpoint):
+    endpoint, _ = endpoint
+    with socket.create_connection(endpoint.sock.getsockname()) as client:
+        serve(endpoint)
+        client.sendall(b"GET /metrics HTTP/1.1\r\n" + b"X-Padding: y\r\n" * (MAX_REQUEST_SIZE // 10))
+        for _ in range(4):
+            serve(endpoint)
+        client.settimeout(1)
+        response = client.recv(4096)
+        assert response.startswith(b"HTTP/1.1 431")
+        assert len(endpoint.timers) == 0
@@ -0,0 +1,56 @@
+import random
+from collections import Counter
+
+import pytest
+
+from src.game.board import Board
+from src.game.placement import TABLE_MAX_SIZE, FleetGenerator, ship_placements
+
+
+@pytest.mark.parametrize("size", [TABLE_MAX_SIZE, TABLE_MAX_SIZE + 1])
+def test_positions_match_their_coordinates_with_and_without_a_table(size):
+    positions = ship_placements(size, 3)
+    assert (positions.table is None) == (size > TABLE_MAX_SIZE)
+    assert len(positions) == 2 * size * (size - 2)
+    for placement in (positions[0], positions[len(positions) // 2 - 1], positions[-1]):
+        assert placement.mask == sum(1 << (r * size + c) for r, c in placement.coordinates)
+        assert all(0 <= r < size and 0 <= c < size for r, c in placement.coordinates)
+    with pytest.raises(IndexError):
+        positions[len(positions)]
+
+
+def test_layouts_never_overlap_and_are_reproducible_from_a_seed():
+    layouts = list(FleetGenerator(seed=7).batch(200))
+    assert layouts == list(FleetGenerator(seed=7).batch(200))
+    for layout in layouts:
+        assert [len(placement.coordinates) for placement in layout] == [5, 4, 3, 3, 2]
+        cells = [cell for placement in layout for cell in placement.coordinates]
+        assert len(cells) == len(set(cells))
+
+
+def test_every_fleet_is_equally_likely():
+    # Two dominoes on a 2x2 board fit in exactly four ways.
+    counts = Counter(tuple(p.coordinates for p in layout) for layout in FleetGenerator(2, (2, 2), seed=1).batch(4000))
+    assert len(counts) == 4 and max(counts.values()) / min(counts.values()) < 1.3
+
+
+def test_fleets_that_cannot_fit_are_reported():
+    generator = FleetGenerator(3, (3, 3, 3, 3), seed=1)
+    assert generator.sample() is None
+    with pytest.raises(ValueError):
+        next(generator.batch(1))
+    assert FleetGenerator(2, (3,)).sample() is None
+
+
+def test_randomized_boards_use_the_given_rng_and_place_every_ship():
+    first, second = Board(), Board()
+    assert first.randomize_ships(random.Random(3)) and second.randomize_ships(random.Random(3))
+    assert first.grid == second.grid
+    assert first.remaining == sum(ship.length for ship in first.ships)
+    assert all(first.mark_hit(*ship.coordinates[0])[2] == ship.name for ship in first.ships)
+
+
+def test_large_boards_place_fleets_without_a_table():
+    board = Board(size=300)
+    assert board.randomize_ships(random.Random(1))
+    assert board.remaining == 17
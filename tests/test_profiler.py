@@ -0,0 +1,31 @@
+from src.util.profiler import Profiler
+
+
+class Worker:
+    def work(self, n):
+        return sum(range(n))
+
+
+def test_timing_hooks_wrap_targets_only_while_profiling(tmp_path):
+    original = Worker.__dict__['work']
+    profiler = Profiler([(Worker, 'work')], output_dir=str(tmp_path))
+    profiler.start()
+    assert Worker.__dict__['work'] is not original
+    assert Worker().work(10) == 45
+    Worker().work(1000)
+
+    prefix = profiler.stop()
+    assert Worker.__dict__['work'] is original and not profiler.enabled
+    report = open(f"{prefix}.txt").read()
+    assert "Worker.work" in report and " 2 " in report
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    profiler = Profiler([(Worker, 'work')], sample_hz=1000, output_dir=str(tmp_path))
+    profiler.toggle()
+    while profiler.sampler.samples < 5:
+        Worker().work(100_000)
+    prefix = profiler.stop()
+    folded = open(f"{prefix}.folded").read().splitlines()
+    assert folded and all(line.rsplit(" ", 1)[1].isdigit() for line in folded)
+    assert any("work (" in line for line in folded)
@@ -0,0 +1,27 @@
+from src.connection.registry import ConnectionRegistry
+
+
+class Stub:
+    def __init__(self, client_id, fd):
+        self.id = client_id
+        self.fd = fd
+
+
+def test_connections_are_found_by_id_and_fd():
+    registry = ConnectionRegistry()
+    a, b = Stub("a", 3), Stub("b", 4)
+    registry.add(a)
+    registry.add(b)
+    assert registry.get("a") is a and registry.get_by_fd(4) is b
+    assert "a" in registry and len(registry) == 2
+    assert list(registry) == [a, b]
+
+
+def test_remove_keeps_a_newer_connection_on_a_reused_fd():
+    registry = ConnectionRegistry()
+    old, new = Stub("old", 5), Stub("new", 5)
+    registry.add(old)
+    registry.add(new)
+    assert registry.remove("old") is old
+    assert registry.get_by_fd(5) is new
+    assert registry.remove("old") is None
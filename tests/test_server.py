@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from loadtest import LoadGenerator
+from server import AsyncBattleshipServer
+from src.connection.framing import ReceiveBuffer, create_frame
+
+
+class Player:
+    """Raw protocol client over asyncio streams."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.buffer = ReceiveBuffer()
+        self.messages = []
+
+    @classmethod
+    async def connect(cls, port):
+        return cls(*await asyncio.open_connection('localhost', port))
+
+    def send(self, msg):
+        self.writer.write(create_frame(json.dumps(msg).encode('utf-8')))
+
+    async def receive(self, _type):
+        """Returns the next message of the given type, skipping others."""
+        while True:
+            while self.messages:
+                msg = self.messages.pop(0)
+                if msg['type'] == _type:
+                    return msg
+            data = await asyncio.wait_for(self.reader.read(4096), 5)
+            assert data, "server closed the connection"
+            view = self.buffer.writable(len(data))
+            view[:len(data)] = data
+            self.buffer.commit(len(data))
+            self.messages += [json.loads(bytes(payload)) for payload in self.buffer.frames()]
+
+    def close(self):
+        self.writer.close()
+
+
+async def play(scenario):
+    server = AsyncBattleshipServer(port=0, use_uvloop=False)
+    serving = asyncio.ensure_future(server.serve())
+    await asyncio.sleep(0)
+    try:
+        await scenario(server.sock.getsockname()[1])
+    finally:
+        serving.cancel()
+        await asyncio.gather(serving, return_exceptions=True)
+        server.shutdown()
+
+
+def test_asyncio_engine_starts_a_game_between_two_named_players():
+    async def scenario(port):
+        alice, bob = await Player.connect(port), await Player.connect(port)
+        for player, name in ((alice, "alice"), (bob, "bob")):
+            await player.receive('welcome')
+            player.send({'type': 'set_name', 'user': name})
+            assert (await player.receive('set_name'))['success']
+        started = await alice.receive('game_started')
+        assert {started['player1'], started['player2']} == {"alice", "bob"}
+        await bob.receive('game_started')
+
+        bob.close()
+        assert (await alice.receive('quit'))['user'] == "bob"
+        alice.close()
+
+    asyncio.run(play(scenario))
+
+
+def test_load_generator_plays_complete_games():
+    report = {}
+
+    async def scenario(port):
+        report.update(await LoadGenerator(port=port, games=3, concurrency=6, timeout=20, seed=1).run())
+
+    asyncio.run(play(scenario))
+    assert report["games_completed"] == 3 and report["clients_failed"] == 0
+    assert report["moves"] > 0 and report["latency_ms"]["p50"] > 0
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from src.game.placement import ship_placements
+from src.game.simulation import FLEET, BatchSimulation, DensityStrategy, RandomStrategy, _placement_cells, \
+    sample_fleets
+
+
+@pytest.mark.parametrize("size", [10, 17])
+def test_placement_cells_follow_the_ship_positions_order(size):
+    positions = ship_placements(size, 3)
+    cells = _placement_cells(size, 3)
+    assert len(cells) == len(positions)
+    for index in (0, positions.horizontal - 1, positions.horizontal, len(positions) - 1):
+        assert list(cells[index]) == [x * size + y for x, y in positions[index].coordinates]
+
+
+def test_sampled_fleets_place_every_ship_once_without_overlap():
+    fleets = sample_fleets(500, rng=np.random.default_rng(1))
+    for ship, length in enumerate(FLEET):
+        assert ((fleets == ship).sum(axis=1) == length).all()
+    assert ((fleets >= 0).sum(axis=1) == sum(FLEET)).all()
+    with pytest.raises(ValueError):
+        sample_fleets(1, size=2, lengths=(3,))
+
+
+def test_every_game_ends_with_the_winner_having_sunk_the_whole_fleet():
+    result = BatchSimulation(200, (RandomStrategy(), RandomStrategy()), seed=2).run()
+    assert (result.winner >= 0).all()
+    games = np.arange(len(result))
+    winner_sinks = result.sink_order[games, result.winner]
+    assert (np.sort(winner_sinks, axis=1) == np.arange(len(FLEET))).all()
+    assert (result.shots[games, result.winner] >= sum(FLEET)).all()
+    assert (result.shots[games, result.winner] <= 100).all()
+    assert result.summary()['games'] == 200 and sum(result.summary()['wins']) == 200
+
+
+def test_density_targeting_beats_random_fire():
+    summary = BatchSimulation(200, (DensityStrategy(), RandomStrategy()), seed=3).run().summary()
+    assert summary['wins'][0] > 190
+    assert summary['mean_shots_to_win'] < 70
+
+
+def test_runs_are_reproducible_from_a_seed():
+    first = BatchSimulation(50, (DensityStrategy(), RandomStrategy()), seed=4).run()
+    second = BatchSimulation(50, (DensityStrategy(), RandomStrategy()), seed=4).run()
+    assert np.array_equal(first.winner, second.winner) and np.array_equal(first.shots, second.shots)
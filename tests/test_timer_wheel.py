@@ -0,0 +1,73 @@
+from src.util.timer_wheel import TimerWheel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_wheel():
+    clock = Clock()
+    return TimerWheel(clock=clock), clock
+
+
+def test_timers_fire_once_when_due():
+    wheel, clock = make_wheel()
+    fired = []
+    wheel.schedule(1.0, fired.append, "a")
+    wheel.schedule(0.5, fired.append, "b")
+    clock.now = 0.45
+    wheel.advance()
+    assert fired == []
+    clock.now = 1.0
+    wheel.advance()
+    wheel.advance()
+    assert fired == ["b", "a"]
+    assert len(wheel) == 0
+
+
+def test_cancelled_timers_do_not_fire():
+    wheel, clock = make_wheel()
+    fired = []
+    timer = wheel.schedule(1.0, fired.append, "a")
+    wheel.cancel(timer)
+    wheel.cancel(timer)
+    clock.now = 2.0
+    wheel.advance()
+    assert fired == [] and len(wheel) == 0 and not timer.active
+
+
+def test_long_timers_cascade_down_to_their_deadline():
+    wheel, clock = make_wheel()
+    fired = []
+    wheel.schedule(1000.0, fired.append, "late")
+    clock.now = 999.8
+    wheel.advance()
+    assert fired == []
+    clock.now = 1000.0
+    wheel.advance()
+    assert fired == ["late"]
+
+
+def test_next_timeout_reports_the_earliest_live_timer():
+    wheel, clock = make_wheel()
+    assert wheel.next_timeout() is None
+    early = wheel.schedule(2.0, lambda: None)
+    wheel.schedule(5.0, lambda: None)
+    assert abs(wheel.next_timeout() - 2.0) < 1e-9
+    wheel.cancel(early)
+    clock.now = 1.0
+    assert abs(wheel.next_timeout() - 4.0) < 1e-9
+
+
+def test_a_failing_callback_does_not_stop_the_others():
+    wheel, clock = make_wheel()
+    fired = []
+    wheel.schedule(0.1, lambda: 1 / 0)
+    wheel.schedule(0.1, fired.append, "ok")
+    clock.now = 0.1
+    wheel.advance()
+    assert fired == ["ok"]
@@ -0,0 +1,45 @@
+import subprocess
+import sys
+
+import pytest
+
+import tournament
+
+from src.game.simulation import HuntTargetStrategy, RandomStrategy
+from tournament import Tournament, load_strategy, wilson_interval
+
+
+def test_wilson_interval_brackets_the_observed_rate():
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high and abs((0.5 - low) - (high - 0.5)) < 1e-4
+    assert wilson_interval(0, 10)[0] == 0.0 < wilson_interval(0, 10)[1]
+    assert wilson_interval(0, 0) == [0.0, 0.0]
+
+
+def test_strategies_load_by_name_or_path():
+    assert isinstance(load_strategy("hunt"), HuntTargetStrategy)
+    assert isinstance(load_strategy("src.game.simulation:RandomStrategy"), RandomStrategy)
+    for spec in ("nope", "src.game.simulation:Nope", "no.such.module:Strategy"):
+        with pytest.raises(ValueError):
+            load_strategy(spec)
+
+
+def test_reports_do_not_depend_on_the_number_of_workers():
+    reports = [Tournament(["hunt", "random"], games=300, chunk_size=100, workers=workers, seed=5).run()
+               for workers in (1, 2)]
+    assert reports[0]["pairs"] == reports[1]["pairs"]
+    pair = reports[0]["pairs"][0]
+    assert pair["games"] == 300 and pair["unfinished"] == 0
+    hunt, rand = pair["results"]
+    assert hunt["wins"] + rand["wins"] == 300 and hunt["wins"] > rand["wins"]
+    assert hunt["shots_to_win_ci95"][0] < hunt["mean_shots_to_win"] < hunt["shots_to_win_ci95"][1]
+
+
+def test_fleets_that_cannot_fit_are_refused_before_any_worker_starts():
+    with pytest.raises(ValueError):
+        Tournament(["random"], size=3, lengths=(5,))
+
+
+def test_bad_arguments_are_usage_errors():
+    result = subprocess.run([sys.executable, tournament.__file__, "--ships", "5,x"], capture_output=True, text=True)
+    assert result.returncode == 2 and "--ships" in result.stderr and "Traceback" not in result.stderr
@@ -0,0 +1,216 @@
+import argparse
+import importlib
+import itertools
+import json
+import logging
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from src.game.simulation import FLEET, STRATEGIES, BatchSimulation, sample_fleets
+
+Z_95 = 1.959964
+
+
+def load_strategy(spec):
+    """Returns a new strategy for a name in STRATEGIES or a 'package.module:Class' path."""
+    if spec in STRATEGIES:
+        return STRATEGIES[spec]()
+    module, sep, name = spec.partition(':')
+    if not sep:
+        raise ValueError(f"Unknown strategy {spec!r}; use one of {', '.join(STRATEGIES)} or module:Class")
+    try:
+        strategy = getattr(importlib.import_module(module), name)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"Cannot load strategy {spec!r}: {e}") from e
+    return strategy()
+
+
+def wilson_interval(successes, trials):
+    if not trials:
+        return [0.0, 0.0]
+    p = successes / trials
+    denominator = 1 + Z_95 ** 2 / trials
+    centre = (p + Z_95 ** 2 / (2 * trials)) / denominator
+    spread = Z_95 * math.sqrt(p * (1 - p) / trials + Z_95 ** 2 / (4 * trials ** 2)) / denominator
+    return [round(centre - spread, 5), round(centre + spread, 5)]
+
+
+class PairStats:
+    """Running totals for one strategy pair; chunks from any worker merge in any order."""
+
+    def __init__(self, names, cells):
+        self.names = tuple(names)
+        self.games = 0
+        self.unfinished = 0
+        self.first_player_wins = 0
+        self.wins = np.zeros(2, dtype=np.int64)
+        self.shots_to_win = np.zeros((2, cells + 1), dtype=np.int64)  # histogram per winning player
+
+    def add_result(self, result):
+        finished = result.winner >= 0
+        self.games += len(result)
+        self.unfinished += int((~finished).sum())
+        self.first_player_wins += int((result.winner[finished] == result.first[finished]).sum())
+        for player in (0, 1):
+            won = result.winner == player
+            self.wins[player] += int(won.sum())
+            self.shots_to_win[player] += np.bincount(result.shots[won, player], minlength=self.shots_to_win.shape[1])
+
+    def merge(self, other):
+        self.games += other.games
+        self.unfinished += other.unfinished
+        self.first_player_wins += other.first_player_wins
+        self.wins += other.wins
+        self.shots_to_win += other.shots_to_win
+
+    def report(self):
+        finished = self.games - self.unfinished
+        sides = []
+        for player, name in enumerate(self.names):
+            histogram = self.shots_to_win[player]
+            wins = int(self.wins[player])
+            side = {
+                "strategy": name,
+                "wins": wins,
+                "win_rate": round(wins / finished, 5) if finished else 0.0,
+                "win_rate_ci95": wilson_interval(wins, finished),
+            }
+            if wins:
+                shots = np.arange(len(histogram))
+                mean = float((histogram * shots).sum() / wins)
+                spread = math.sqrt(float((histogram * (shots - mean) ** 2).sum()) / max(wins - 1, 1))
+                margin = Z_95 * spread / math.sqrt(wins)
+                cumulative = np.cumsum(histogram)
+                side.update({
+                    "mean_shots_to_win": round(mean, 3),
+                    "shots_to_win_ci95": [round(mean - margin, 3), round(mean + margin, 3)],
+                    "shots_to_win_p50": int(np.searchsorted(cumulative, wins * 0.5)),
+                    "shots_to_win_p99": int(np.searchsorted(cumulative, wins * 0.99)),
+                })
+            sides.append(side)
+        return {
+            "games": self.games,
+            "unfinished": self.unfinished,
+            "first_player_win_rate": round(self.first_player_wins / finished, 5) if finished else 0.0,
+            "results": sides,
+        }
+
+
+def play_chunk(pair, names, games, seed, size, lengths):
+    """Plays one work unit in a worker process and returns only its PairStats."""
+    sim = BatchSimulation(games, [load_strategy(name) for name in names], size, lengths,
+                          rng=np.random.default_rng(seed))
+    stats = PairStats(names, size * size)
+    stats.add_result(sim.run())
+    return pair, stats
+
+
+class Tournament:
+    """Plays every pair of strategies over `games` games, split into chunks across a process pool.
+
+    Chunk seeds are derived from the tournament seed, the pair and the chunk number, so results do
+    not depend on the number of workers or the order chunks finish in.
+    """
+
+    def __init__(self, strategies, games=10000, chunk_size=2000, workers=None, size=10, lengths=FLEET, seed=None):
+        # Fail before starting any workers.
+        for name in strategies:
+            load_strategy(name)
+        if games < 1 or chunk_size < 1:
+            raise ValueError("Games and chunk size must be positive")
+        if size < 1 or not lengths or min(lengths) < 1:
+            raise ValueError("Board size and ship lengths must be positive")
+        sample_fleets(1, size, lengths)
+        self.pairs = list(itertools.combinations(strategies, 2)) if len(strategies) > 1 else [tuple(strategies) * 2]
+        self.games = games
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.size = size
+        self.lengths = tuple(lengths)
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.stats = [PairStats(names, size * size) for names in self.pairs]
+
+    def units(self):
+        for pair, names in enumerate(self.pairs):
+            for chunk, start in enumerate(range(0, self.games, self.chunk_size)):
+                seed = np.random.SeedSequence(self.seed, spawn_key=(pair, chunk))
+                yield pair, names, min(self.chunk_size, self.games - start), seed, self.size, self.lengths
+
+    def results(self):
+        """Yields (pair, stats) for each chunk as it completes, keeping at most two chunks per worker queued."""
+        if self.workers <= 1:
+            for unit in self.units():
+                yield play_chunk(*unit)
+            return
+        with ProcessPoolExecutor(self.workers) as pool:
+            pending = set()
+            for unit in self.units():
+                if len(pending) >= self.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(pool.submit(play_chunk, *unit))
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def run(self):
+        started = time.perf_counter()
+        for pair, stats in self.results():
+            self.stats[pair].merge(stats)
+            total = self.stats[pair]
+            logging.info(f"{' vs '.join(total.names)}: {total.games}/{self.games} games")
+        elapsed = time.perf_counter() - started
+        played = sum(stats.games for stats in self.stats)
+        return {
+            "seed": self.seed,
+            "games_per_pair": self.games,
+            "board_size": self.size,
+            "ships": list(self.lengths),
+            "workers": self.workers,
+            "duration_secs": round(elapsed, 3),
+            "games_per_sec": round(played / elapsed, 1) if elapsed else 0.0,
+            "pairs": [stats.report() for stats in self.stats],
+        }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Play targeting strategies against each other in bulk.')
+    parser.add_argument('strategies', nargs='*', default=['density', 'hunt', 'random'],
+                        help=f"Strategies to pair up: {', '.join(STRATEGIES)} or module:Class "
+                             "(default: all built-in; a single strategy plays itself)")
+    parser.add_argument('-n', '--games', type=int, default=10000, help='Games per pair (default: 10000)')
+    parser.add_argument('--chunk', type=int, default=2000, help='Games per work unit (default: 2000)')
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help='Worker processes, 1 to run in this process (default: CPU count)')
+    parser.add_argument('--size', type=int, default=10, help='Board size (default: 10)')
+    parser.add_argument('--ships', type=str, default=','.join(map(str, FLEET)),
+                        help='Comma-separated ship lengths (default: 5,4,3,3,2)')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for fleets and shots; the report records it')
+    parser.add_argument('-o', '--output', type=str, default=None, help='Write the JSON report to this file')
+    return parser, parser.parse_args()
+
+
+if __name__ == "__main__":
+    parser, args = parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        lengths = [int(length) for length in args.ships.split(',')]
+    except ValueError:
+        parser.error(f"--ships must be comma-separated integers, got {args.ships!r}")
+    try:
+        tournament = Tournament(args.strategies, args.games, args.chunk, args.workers, args.size, lengths, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+    report = tournament.run()
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()